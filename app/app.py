@@ -0,0 +1,288 @@
+from database.config import get_settings
+from database.database import engines, get_database_engine, get_pool_stats
+from database.metrics import merge_snapshots, registry, render
+from services.cache import configure_user_cache
+from services.storage import get_content_store
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from contextlib import asynccontextmanager
+from multiprocessing.connection import wait
+from sqlalchemy import text
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import shutil
+import socket
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL = 5.0 # s
+STALE_AFTER = 3 * HEARTBEAT_INTERVAL # s
+_FIELDS = ("pid", "ready", "heartbeat", "db_ok", "checked_out", "wait_avg_s")
+
+class WorkerBoard:
+    """
+    Health of every worker process in shared memory.
+    
+    Created by the launcher before forking, so every worker can write its
+    own slot and read everyone's; any worker can then answer /health for
+    the whole container.
+    
+    Attributes:
+        workers (int): Number of slots
+    """
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self._values = multiprocessing.get_context("fork").Array("d", workers * len(_FIELDS))
+    
+    def update(self, slot: int, **values: float) -> None:
+        """Overwrite fields of one worker's slot"""
+        with self._values.get_lock():
+            for name, value in values.items():
+                self._values[slot * len(_FIELDS) + _FIELDS.index(name)] = float(value)
+    
+    def clear(self, slot: int) -> None:
+        """Reset a slot, e.g. when its worker exits"""
+        self.update(slot, **{name: 0.0 for name in _FIELDS})
+    
+    def snapshot(self) -> List[Dict[str, float]]:
+        """All slots as dicts"""
+        with self._values.get_lock():
+            values = list(self._values)
+        return [
+            dict(zip(_FIELDS, values[slot * len(_FIELDS):(slot + 1) * len(_FIELDS)]))
+            for slot in range(self.workers)
+        ]
+    
+    def health(self, now: Optional[float] = None) -> Tuple[str, List[Dict]]:
+        """
+        Aggregate health of all workers.
+        
+        A worker is healthy when its heartbeat is fresh, it finished
+        startup and its last database check succeeded.
+        
+        Returns:
+            Tuple[str, List[Dict]]: "ok" if all workers are healthy,
+                "degraded" if some are, "down" if none; and per-worker details
+        """
+        now = time.time() if now is None else now
+        details = []
+        for slot, values in enumerate(self.snapshot()):
+            healthy = bool(values["ready"] and values["db_ok"] and now - values["heartbeat"] <= STALE_AFTER)
+            details.append({
+                "slot": slot,
+                "pid": int(values["pid"]),
+                "healthy": healthy,
+                "heartbeat_age_s": round(now - values["heartbeat"], 3) if values["heartbeat"] else None,
+                "db_ok": bool(values["db_ok"]),
+                "checked_out": int(values["checked_out"]),
+                "wait_avg_s": values["wait_avg_s"]
+            })
+        healthy = sum(worker["healthy"] for worker in details)
+        status = "ok" if healthy == len(details) else "degraded" if healthy else "down"
+        return status, details
+
+# Set in every worker before the server starts
+_board: Optional[WorkerBoard] = None
+_slot = 0
+_launcher: Optional[int] = None
+_metrics_dir: Optional[str] = None  # where workers publish metric snapshots
+
+def _publish_metrics() -> None:
+    """Write this worker's metrics where the other workers can merge them"""
+    path = os.path.join(_metrics_dir, f"{_slot}.json")
+    with open(f"{path}.tmp", "w") as file:
+        json.dump(registry.snapshot(), file)
+    os.replace(f"{path}.tmp", path)
+
+def _read_metrics() -> List[Dict]:
+    """Snapshots of all workers: the others' last published ones and this one's live values"""
+    snapshots = [registry.snapshot()]
+    if _metrics_dir is None:
+        return snapshots
+    for slot in range(_board.workers):
+        if slot == _slot:
+            continue
+        try:
+            with open(os.path.join(_metrics_dir, f"{slot}.json")) as file:
+                snapshots.append(json.load(file))
+        except (OSError, ValueError):
+            continue  # not published yet
+    return snapshots
+
+def _check_database() -> bool:
+    try:
+        with get_database_engine().connect() as connection:
+            connection.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        logger.exception("Database check failed")
+        return False
+
+async def _heartbeat() -> None:
+    """Publish this worker's state to the board until cancelled"""
+    while True:
+        if _launcher is not None and os.getppid() != _launcher:
+            # The launcher died without stopping us, shut down instead of serving orphaned
+            os.kill(os.getpid(), signal.SIGTERM)
+            return
+        db_ok = await asyncio.to_thread(_check_database)
+        pool = get_pool_stats().get("sync")
+        _board.update(
+            _slot,
+            pid=os.getpid(),
+            ready=1,
+            heartbeat=time.time(),
+            db_ok=db_ok,
+            checked_out=pool.checked_out if pool else 0,
+            wait_avg_s=pool.wait_avg_s if pool else 0.0
+        )
+        if _metrics_dir is not None:
+            await asyncio.to_thread(_publish_metrics)
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app: Starlette):
+    """Per-worker startup: runs after fork, so pools and clients are the worker's own"""
+    global _board
+    if _board is None:
+        _board = WorkerBoard(1)  # started without the launcher, e.g. by uvicorn directly
+    settings = get_settings()
+    get_database_engine()
+    configure_user_cache(settings.USER_CACHE_URL, settings.USER_CACHE_TTL)
+    if settings.AUDIO_STORE_DIR:
+        get_content_store()  # uploads are stored there, create it before serving
+    heartbeat = asyncio.create_task(_heartbeat())
+    try:
+        yield
+    finally:
+        heartbeat.cancel()
+        _board.clear(_slot)
+        engines.dispose()
+
+async def health(request: Request) -> JSONResponse:
+    """Health of all workers of the container, for the docker-compose healthcheck"""
+    status, workers = _board.health()
+    return JSONResponse({"status": status, "workers": workers}, status_code=503 if status == "down" else 200)
+
+async def worker_health(request: Request) -> JSONResponse:
+    """Health of the worker that answers, with its pool state"""
+    _, workers = _board.health()
+    worker = workers[_slot]
+    pools = {name: stats.as_dict() for name, stats in get_pool_stats().items()}
+    return JSONResponse({**worker, "pools": pools}, status_code=200 if worker["healthy"] else 503)
+
+async def metrics(request: Request) -> Response:
+    """
+    Prometheus metrics of all workers, summed.
+    
+    Other workers' values are as of their last heartbeat.
+    """
+    snapshot = merge_snapshots(await asyncio.to_thread(_read_metrics))
+    return Response(render(snapshot), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+app = Starlette(
+    routes=[
+        Route("/health", health),
+        Route("/health/worker", worker_health),
+        Route("/metrics", metrics)
+    ],
+    lifespan=lifespan
+)
+
+def _bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def _run_worker(slot: int, board: WorkerBoard, sock: socket.socket, launcher: int, metrics_dir: str) -> None:
+    """Entry point of a worker process"""
+    import uvicorn
+    global _board, _slot, _launcher, _metrics_dir
+    _board, _slot, _launcher, _metrics_dir = board, slot, launcher, metrics_dir
+    # uvicorn re-raises the signal it stopped on, which must not reach the launcher's handler
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    settings = get_settings()
+    config = uvicorn.Config(app, lifespan="on", log_level="debug" if settings.DEBUG else "info")
+    uvicorn.Server(config).run(sockets=[sock])
+
+def serve(host: Optional[str] = None, port: Optional[int] = None, workers: Optional[int] = None) -> None:
+    """
+    Run the API in pre-forked worker processes sharing one listening socket.
+    
+    Every worker gets DB_CONNECTION_BUDGET / workers connections (see
+    database.pool.pool_sizing) and creates its engine and clients on
+    startup, after the fork. Dead workers are restarted; SIGTERM/SIGINT
+    stop all of them gracefully.
+    
+    Args:
+        host: Interface to listen on, defaults to settings.HOST
+        port: Port to listen on, defaults to settings.PORT
+        workers: Number of processes, defaults to settings.WEB_WORKERS or the CPU count
+    """
+    settings = get_settings()
+    host = host or settings.HOST
+    port = port or settings.PORT
+    workers = workers or settings.WEB_WORKERS or os.cpu_count() or 1
+    # Workers read settings again with their share of the connection budget
+    os.environ["DB_POOL_WORKERS"] = str(workers)
+    if not settings.DB_CONNECTION_BUDGET:
+        logger.warning("DB_CONNECTION_BUDGET is not set, each of %s workers sizes its pools on its own", workers)
+    get_settings.cache_clear()
+    
+    sock = _bind(host, port)
+    board = WorkerBoard(workers)
+    metrics_dir = tempfile.mkdtemp(prefix="metrics-")
+    context = multiprocessing.get_context("fork")
+    processes: Dict[int, multiprocessing.Process] = {}
+    stopping = False
+    
+    def start(slot: int) -> None:
+        board.clear(slot)
+        process = context.Process(target=_run_worker, args=(slot, board, sock, os.getpid(), metrics_dir), name=f"api-worker-{slot}")
+        process.start()
+        processes[slot] = process
+    
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for process in processes.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+    
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for slot in range(workers):
+        start(slot)
+    logger.info("Serving on %s:%s with %s workers", host, port, workers)
+    try:
+        while processes:
+            wait([process.sentinel for process in processes.values()])
+            for slot, process in list(processes.items()):
+                if process.is_alive():
+                    continue
+                process.join()
+                del processes[slot]
+                board.clear(slot)
+                if not stopping:
+                    logger.warning("Worker %s (pid %s) exited with %s, restarting", slot, process.pid, process.exitcode)
+                    start(slot)
+    finally:
+        sock.close()
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    serve()
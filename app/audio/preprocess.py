@@ -0,0 +1,326 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Tuple
+import math
+import struct
+import tracemalloc
+import numpy as np
+
+TARGET_RATE = 16000
+BLOCK_SIZE = 16 * 1024  # output samples processed at once
+RESAMPLE_TAPS = 32
+HEADER_SIZE = 64 * 1024
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_FLOAT = 0x0003
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+@dataclass(frozen=True)
+class PcmLayout:
+    """
+    Where and how the samples of a PCM WAV file are stored.
+    
+    Attributes:
+        offset (int): Byte offset of the first sample
+        frames (int): Number of frames (one sample per channel)
+        channels (int): Number of channels
+        sample_rate (int): Sample rate (Hz)
+        sample_width (int): Bytes per sample
+        floating (bool): IEEE float samples instead of integers
+    """
+    offset: int
+    frames: int
+    channels: int
+    sample_rate: int
+    sample_width: int
+    floating: bool
+
+def wav_layout(path: str) -> Optional[PcmLayout]:
+    """
+    Locate the PCM samples of a WAV file.
+    
+    Args:
+        path: Path to the file
+    
+    Returns:
+        Optional[PcmLayout]: Layout, None if the file is not an uncompressed WAV
+    """
+    with open(path, "rb") as file:
+        head = file.read(HEADER_SIZE)
+        file.seek(0, 2)
+        size = file.tell()
+    if len(head) < 12 or head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+        return None
+    offset = 12
+    fmt = None
+    while offset + 8 <= len(head):
+        chunk_id = head[offset:offset + 4]
+        chunk_size = struct.unpack_from("<I", head, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b"fmt " and body + 16 <= len(head):
+            fmt = struct.unpack_from("<HHIIHH", head, body)
+            if fmt[0] == _WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26 and body + 26 <= len(head):
+                fmt = (struct.unpack_from("<H", head, body + 24)[0],) + fmt[1:]
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            tag, channels, sample_rate, _, block_align, bits = fmt
+            width = bits // 8
+            if tag not in (_WAVE_FORMAT_PCM, _WAVE_FORMAT_FLOAT) or not channels or block_align != width * channels:
+                return None
+            if tag == _WAVE_FORMAT_FLOAT and width not in (4, 8):
+                return None
+            if tag == _WAVE_FORMAT_PCM and width not in (1, 2, 3, 4):
+                return None
+            available = size - body
+            if chunk_size not in (0, 0xFFFFFFFF):
+                available = min(chunk_size, available)
+            return PcmLayout(body, available // block_align, channels, sample_rate, width, tag == _WAVE_FORMAT_FLOAT)
+        offset = body + chunk_size + (chunk_size & 1)
+    return None
+
+def map_wav(path: str, layout: Optional[PcmLayout] = None) -> Tuple[np.ndarray, PcmLayout]:
+    """
+    Memory-map the samples of a PCM WAV file without reading them.
+    
+    Args:
+        path: Path to the file
+        layout: Layout from wav_layout, read from the file when omitted
+    
+    Returns:
+        Tuple[np.ndarray, PcmLayout]: Read-only (frames, channels) array, or
+            (frames, channels, 3) bytes for 24-bit files, and the layout
+    """
+    layout = layout or wav_layout(path)
+    if layout is None:
+        raise ValueError("Not an uncompressed PCM WAV file")
+    if layout.sample_width == 3:
+        dtype, shape = np.dtype(np.uint8), (layout.frames, layout.channels, 3)
+    elif layout.floating:
+        dtype, shape = np.dtype(f"<f{layout.sample_width}"), (layout.frames, layout.channels)
+    elif layout.sample_width == 1:
+        dtype, shape = np.dtype(np.uint8), (layout.frames, layout.channels)
+    else:
+        dtype, shape = np.dtype(f"<i{layout.sample_width}"), (layout.frames, layout.channels)
+    if layout.frames == 0:
+        return np.zeros(shape, dtype=dtype), layout
+    frames = np.memmap(path, dtype=dtype, mode="r", offset=layout.offset, shape=shape)
+    return frames, layout
+
+def downmix(frames: np.ndarray, sample_width: int) -> np.ndarray:
+    """
+    Average the channels of raw PCM frames into float32 samples in [-1, 1).
+    
+    Only the block passed in is converted, call it on slices of a mapped
+    file to keep memory bounded.
+    
+    Args:
+        frames: (frames, channels) samples or (frames, channels, 3) bytes of 24-bit audio
+        sample_width: Bytes per sample
+    
+    Returns:
+        np.ndarray: Mono float32 samples
+    """
+    if frames.dtype.kind == "f":
+        return frames.mean(axis=1, dtype=np.float32)
+    if sample_width == 3:
+        # 24-bit little endian: shift the three bytes into the top of an int32
+        packed = frames.astype(np.int32)
+        values = (packed[..., 0] << 8) | (packed[..., 1] << 16) | (packed[..., 2] << 24)
+        return values.mean(axis=1, dtype=np.float32) * np.float32(1.0 / (1 << 31))
+    if sample_width == 1:
+        return (frames.mean(axis=1, dtype=np.float32) - np.float32(128)) * np.float32(1.0 / 128)
+    return frames.mean(axis=1, dtype=np.float32) * np.float32(1.0 / (1 << (8 * sample_width - 1)))
+
+def _resample_kernel(taps: int, src_rate: int, dst_rate: int) -> np.ndarray:
+    """Windowed-sinc weights of shape (phases, taps), one row per output phase"""
+    phases = dst_rate // math.gcd(src_rate, dst_rate)
+    cutoff = min(1.0, dst_rate / src_rate) * 0.95
+    half = taps // 2
+    offsets = np.arange(-half + 1, half + 1, dtype=np.float64)
+    x = offsets[None, :] - (np.arange(phases, dtype=np.float64) / phases)[:, None]
+    weights = cutoff * np.sinc(cutoff * x) * (0.5 + 0.5 * np.cos(np.pi * np.clip(x / half, -1.0, 1.0)))
+    weights /= weights.sum(axis=1, keepdims=True)
+    return weights.astype(np.float32)
+
+def _resample_into(
+    out: np.ndarray,
+    read: Callable[[int, int], np.ndarray],
+    src_frames: int,
+    src_rate: int,
+    dst_rate: int,
+    taps: int = RESAMPLE_TAPS,
+    block_size: int = BLOCK_SIZE
+) -> None:
+    """Fill out with a band-limited resampling of read(start, end) blocks"""
+    # Output sample i sits at input position i * src / dst, its fractional
+    # part repeats with a period of dst / gcd outputs, so the filter is a
+    # small polyphase table indexed by exact integer arithmetic
+    divisor = math.gcd(src_rate, dst_rate)
+    up, down = dst_rate // divisor, src_rate // divisor
+    kernel = _resample_kernel(taps, src_rate, dst_rate)
+    half = taps // 2
+    for start in range(0, len(out), block_size):
+        end = min(start + block_size, len(out))
+        scaled = np.arange(start, end, dtype=np.int64) * down
+        base, phase = np.divmod(scaled, up)
+        lo = int(base[0]) - half + 1
+        hi = int(base[-1]) + half + 1
+        block = read(max(lo, 0), min(hi, src_frames))
+        if lo < 0 or hi > src_frames:
+            block = np.pad(block, (max(-lo, 0), max(hi - src_frames, 0)))
+        index = (base - base[0])[:, None] + np.arange(taps)[None, :]
+        out[start:end] = np.einsum("ij,ij->i", block[index], kernel[phase])
+
+def resample(samples: np.ndarray, src_rate: int, dst_rate: int = TARGET_RATE, taps: int = RESAMPLE_TAPS) -> np.ndarray:
+    """
+    Resample mono float32 samples with a windowed-sinc filter.
+    
+    Args:
+        samples: Mono float32 samples
+        src_rate: Sample rate of samples (Hz)
+        dst_rate: Wanted sample rate (Hz)
+        taps: Filter length, more taps means a sharper cutoff
+    
+    Returns:
+        np.ndarray: Resampled samples, samples itself when the rates match
+    """
+    if src_rate == dst_rate:
+        return samples
+    out = np.empty(int(len(samples) * dst_rate // src_rate), dtype=np.float32)
+    if len(out):
+        _resample_into(out, lambda lo, hi: samples[lo:hi], len(samples), src_rate, dst_rate, taps)
+    return out
+
+def normalize(samples: np.ndarray, peak: float = 0.95) -> np.ndarray:
+    """
+    Remove DC offset and scale to the given peak level in place.
+    
+    Args:
+        samples: Mono float32 samples, modified in place
+        peak: Absolute value of the loudest sample afterwards
+    
+    Returns:
+        np.ndarray: The same array
+    """
+    if not len(samples):
+        return samples
+    samples -= samples.mean(dtype=np.float64)
+    loudest = max(float(samples.max()), -float(samples.min()))
+    if loudest > 0:
+        samples *= np.float32(peak / loudest)
+    return samples
+
+def preprocess_frames(
+    frames: np.ndarray,
+    sample_rate: int,
+    sample_width: int,
+    target_rate: int = TARGET_RATE,
+    peak: Optional[float] = 0.95,
+    block_size: int = BLOCK_SIZE
+) -> np.ndarray:
+    """
+    Turn raw interleaved PCM frames into model input block by block.
+    
+    Only the float32 output and one block of intermediates are allocated,
+    so frames can be a memory map of a file of any length.
+    
+    Args:
+        frames: (frames, channels) samples, see map_wav
+        sample_rate: Sample rate of frames (Hz)
+        sample_width: Bytes per sample
+        target_rate: Sample rate of the result (Hz)
+        peak: Peak level to normalize to, None keeps the original level
+        block_size: Samples converted at once
+    
+    Returns:
+        np.ndarray: Mono float32 samples at target_rate
+    """
+    src_frames = len(frames)
+    read = lambda lo, hi: downmix(frames[lo:hi], sample_width)
+    if sample_rate == target_rate:
+        out = np.empty(src_frames, dtype=np.float32)
+        for start in range(0, src_frames, block_size):
+            out[start:start + block_size] = read(start, min(start + block_size, src_frames))
+    else:
+        out = np.empty(int(src_frames * target_rate // sample_rate), dtype=np.float32)
+        if len(out):
+            _resample_into(out, read, src_frames, sample_rate, target_rate, block_size=block_size)
+    if peak is not None:
+        normalize(out, peak)
+    return out
+
+def preprocess_wav(path: str, target_rate: int = TARGET_RATE, peak: Optional[float] = 0.95) -> np.ndarray:
+    """
+    Load a PCM WAV file as normalized mono float32 samples via a memory map.
+    
+    Args:
+        path: Path to the file
+        target_rate: Sample rate of the result (Hz)
+        peak: Peak level to normalize to, None keeps the original level
+    
+    Returns:
+        np.ndarray: Mono float32 samples at target_rate
+    """
+    frames, layout = map_wav(path)
+    try:
+        return preprocess_frames(frames, layout.sample_rate, layout.sample_width, target_rate, peak)
+    finally:
+        del frames
+
+def preprocess_decoded(path: str, target_rate: int = TARGET_RATE, peak: Optional[float] = 0.95) -> np.ndarray:
+    """
+    Decode any format with pydub/ffmpeg and preprocess it without further copies.
+    
+    The decoded bytes are viewed as an array instead of being converted by
+    AudioSegment.set_channels/set_frame_rate, which copy the whole recording.
+    """
+    from pydub import AudioSegment
+    audio_file = AudioSegment.from_file(path)
+    width = audio_file.sample_width
+    dtype = np.uint8 if width == 1 else np.dtype(f"<i{width}") if width in (2, 4) else None
+    if dtype is None:
+        raise ValueError(f"Unsupported sample width: {width}")
+    frames = np.frombuffer(audio_file.raw_data, dtype=dtype).reshape(-1, audio_file.channels)
+    return preprocess_frames(frames, audio_file.frame_rate, width, target_rate, peak)
+
+def preprocess(path: str, target_rate: int = TARGET_RATE, peak: Optional[float] = 0.95) -> np.ndarray:
+    """
+    Load an audio file as model input: mono float32 at target_rate.
+    
+    Uncompressed WAV files are memory-mapped, everything else is decoded
+    with pydub first.
+    
+    Args:
+        path: Path to the file
+        target_rate: Sample rate of the result (Hz)
+        peak: Peak level to normalize to, None keeps the original level
+    
+    Returns:
+        np.ndarray: Mono float32 samples
+    """
+    if wav_layout(path) is not None:
+        return preprocess_wav(path, target_rate, peak)
+    return preprocess_decoded(path, target_rate, peak)
+
+def measure_peak(func: Callable[..., Any], *args, **kwargs) -> Tuple[Any, int]:
+    """
+    Call func and report the peak of memory allocated while it ran.
+    
+    NumPy reports its buffers to tracemalloc, memory-mapped file pages are
+    not allocations and are not counted.
+    
+    Returns:
+        Tuple[Any, int]: Result of func and peak traced bytes
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        result = func(*args, **kwargs)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        if started:
+            tracemalloc.stop()
+    return result, peak
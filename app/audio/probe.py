@@ -0,0 +1,309 @@
+from dataclasses import dataclass, asdict
+from collections import OrderedDict
+from typing import Optional
+import hashlib
+import json
+import os
+import struct
+import threading
+
+HEAD_SIZE = 64 * 1024
+TAIL_SIZE = 64 * 1024
+HASH_CHUNK_SIZE = 1024 * 1024
+
+@dataclass(frozen=True)
+class AudioInfo:
+    """
+    Audio metadata read from container headers.
+    
+    Attributes:
+        format (str): Container format: wav, flac, mp3, ogg or decoded
+        duration (float): Duration (s)
+        sample_rate (int): Sample rate (Hz)
+        channels (int): Number of channels
+    """
+    format: str
+    duration: float
+    sample_rate: int
+    channels: int
+
+# ---------------------------------------------------------------- WAV
+
+def _parse_wav(head: bytes, size: Optional[int]) -> Optional[AudioInfo]:
+    if len(head) < 12 or head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+        return None
+    offset = 12
+    channels = sample_rate = byte_rate = None
+    while offset + 8 <= len(head):
+        chunk_id = head[offset:offset + 4]
+        chunk_size = struct.unpack_from("<I", head, offset + 4)[0]
+        body = offset + 8
+        if chunk_id == b"fmt " and body + 16 <= len(head):
+            _, channels, sample_rate, byte_rate = struct.unpack_from("<HHII", head, body)
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            if size is not None:
+                chunk_size = min(chunk_size, size - body)
+            elif chunk_size in (0, 0xFFFFFFFF):
+                return None  # streamed WAV, length is unknown until the end
+            return AudioInfo("wav", chunk_size / byte_rate, sample_rate, channels)
+        offset = body + chunk_size + (chunk_size & 1)
+    return None
+
+# ---------------------------------------------------------------- FLAC
+
+def _parse_flac(head: bytes) -> Optional[AudioInfo]:
+    if head[:4] != b"fLaC" or len(head) < 8 + 18:
+        return None
+    if head[4] & 0x7F != 0:  # STREAMINFO must be the first metadata block
+        return None
+    packed = int.from_bytes(head[18:26], "big")
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x07) + 1
+    total_samples = packed & 0xFFFFFFFFF
+    if not sample_rate or not total_samples:
+        return None
+    return AudioInfo("flac", total_samples / sample_rate, sample_rate, channels)
+
+# ---------------------------------------------------------------- MP3
+
+_MP3_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 25: [11025, 12000, 8000]}
+
+def _id3v2_size(head: bytes) -> int:
+    """Length of a leading ID3v2 tag, 0 if there is none"""
+    if len(head) < 10 or head[:3] != b"ID3":
+        return 0
+    size = 0
+    for byte in head[6:10]:
+        size = (size << 7) | (byte & 0x7F)
+    footer = 10 if head[5] & 0x10 else 0
+    return 10 + size + footer
+
+def _mp3_frame(head: bytes, offset: int):
+    """Decode an MPEG audio frame header at offset, None if it is not one"""
+    if offset + 4 > len(head):
+        return None
+    word = struct.unpack_from(">I", head, offset)[0]
+    if word >> 21 != 0x7FF:
+        return None
+    version_bits = (word >> 19) & 3
+    layer_bits = (word >> 17) & 3
+    bitrate_index = (word >> 12) & 15
+    rate_index = (word >> 10) & 3
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    version = {3: 1, 2: 2, 0: 25}[version_bits]
+    layer = 4 - layer_bits
+    bitrate = _MP3_BITRATES[(1 if version == 1 else 2, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    padding = (word >> 9) & 1
+    channels = 1 if (word >> 6) & 3 == 3 else 2
+    if layer == 1:
+        samples, length = 384, (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 3 and version != 1:
+        samples, length = 576, 72 * bitrate // sample_rate + padding
+    else:
+        samples, length = 1152, 144 * bitrate // sample_rate + padding
+    return version, bitrate, sample_rate, channels, samples, length
+
+def _parse_mp3(head: bytes, tail: bytes, size: Optional[int]) -> Optional[AudioInfo]:
+    start = _id3v2_size(head)
+    limit = min(len(head) - 4, start + 8192)
+    offset = start
+    frame = None
+    while offset < limit:
+        frame = _mp3_frame(head, offset)
+        if frame:
+            following = offset + frame[5]
+            # a second header right after the first one rules out a false sync
+            if following + 4 > len(head) or _mp3_frame(head, following):
+                break
+        frame = None
+        offset += 1
+    if frame is None:
+        return None
+    version, bitrate, sample_rate, channels, samples, _ = frame
+    
+    if version == 1:
+        side_info = 17 if channels == 1 else 32
+    else:
+        side_info = 9 if channels == 1 else 17
+    xing = offset + 4 + side_info
+    if head[xing:xing + 4] in (b"Xing", b"Info") and xing + 12 <= len(head):
+        flags = struct.unpack_from(">I", head, xing + 4)[0]
+        if flags & 1:
+            frames = struct.unpack_from(">I", head, xing + 8)[0]
+            return AudioInfo("mp3", frames * samples / sample_rate, sample_rate, channels)
+    vbri = offset + 4 + 32
+    if head[vbri:vbri + 4] == b"VBRI" and vbri + 18 <= len(head):
+        frames = struct.unpack_from(">I", head, vbri + 14)[0]
+        return AudioInfo("mp3", frames * samples / sample_rate, sample_rate, channels)
+    
+    if size is None:
+        return None
+    audio_bytes = size - offset
+    if tail[-128:-125] == b"TAG":
+        audio_bytes -= 128
+    return AudioInfo("mp3", audio_bytes * 8 / bitrate, sample_rate, channels)
+
+# ---------------------------------------------------------------- OGG
+
+def _parse_ogg(head: bytes, tail: bytes) -> Optional[AudioInfo]:
+    if head[:4] != b"OggS" or len(head) < 28:
+        return None
+    packet = 27 + head[26]
+    if head[packet:packet + 7] == b"\x01vorbis" and packet + 16 <= len(head):
+        channels = head[packet + 11]
+        sample_rate = struct.unpack_from("<I", head, packet + 12)[0]
+        pre_skip = 0
+        granule_rate = sample_rate
+    elif head[packet:packet + 8] == b"OpusHead" and packet + 16 <= len(head):
+        channels = head[packet + 9]
+        pre_skip = struct.unpack_from("<H", head, packet + 10)[0]
+        sample_rate = struct.unpack_from("<I", head, packet + 12)[0] or 48000
+        granule_rate = 48000  # Opus granule positions always count 48 kHz samples
+    else:
+        return None
+    last_page = tail.rfind(b"OggS")
+    if last_page < 0 or last_page + 14 > len(tail):
+        return None
+    granule = struct.unpack_from("<q", tail, last_page + 6)[0]
+    if granule <= 0 or not granule_rate:
+        return None
+    return AudioInfo("ogg", max(granule - pre_skip, 0) / granule_rate, sample_rate, channels)
+
+# ---------------------------------------------------------------- public API
+
+def parse_header(head: bytes, tail: bytes = b"", size: Optional[int] = None) -> Optional[AudioInfo]:
+    """
+    Read audio metadata from the first and last bytes of a file.
+    
+    Args:
+        head: First bytes of the file, HEAD_SIZE is enough for common files
+        tail: Last bytes of the file (needed for OGG, and ID3v1 in CBR MP3)
+        size: Total file size in bytes (needed for CBR MP3)
+    
+    Returns:
+        Optional[AudioInfo]: Metadata or None if the headers are not recognized
+    """
+    if not tail and size is not None and len(head) >= size:
+        tail = head
+    skip = _id3v2_size(head)
+    if skip and head[skip:skip + 4] == b"fLaC":
+        return _parse_flac(head[skip:])
+    return (
+        _parse_wav(head, size)
+        or _parse_flac(head)
+        or _parse_ogg(head, tail)
+        or _parse_mp3(head, tail, size)
+    )
+
+def read_header(path: str) -> Optional[AudioInfo]:
+    """Read metadata from headers of the file at path without decoding it"""
+    size = os.path.getsize(path)
+    with open(path, "rb") as file:
+        head = file.read(HEAD_SIZE)
+        tail = b""
+        if size > HEAD_SIZE:
+            file.seek(max(size - TAIL_SIZE, HEAD_SIZE))
+            tail = file.read()
+    return parse_header(head, tail, size)
+
+def decode_info(path: str) -> AudioInfo:
+    """Fallback that fully decodes the file with pydub/ffmpeg"""
+    from pydub import AudioSegment
+    audio_file = AudioSegment.from_file(path)
+    return AudioInfo("decoded", audio_file.duration_seconds, audio_file.frame_rate, audio_file.channels)
+
+def file_digest(path: str) -> str:
+    """Content hash (BLAKE2b, hex) of the file at path"""
+    digest = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ProbeCache:
+    """
+    LRU of AudioInfo keyed by content hash, optionally backed by a directory.
+    
+    Attributes:
+        maxsize (int): Entries kept in memory
+        directory (Optional[str]): Where entries are persisted as JSON files
+    """
+    def __init__(self, maxsize: int = 4096, directory: Optional[str] = None) -> None:
+        self.maxsize = maxsize
+        self.directory = directory
+        self._entries: "OrderedDict[str, AudioInfo]" = OrderedDict()
+        self._lock = threading.Lock()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}.json")
+    
+    def get(self, digest: str) -> Optional[AudioInfo]:
+        with self._lock:
+            info = self._entries.get(digest)
+            if info is not None:
+                self._entries.move_to_end(digest)
+                return info
+        if self.directory and os.path.exists(self._path(digest)):
+            with open(self._path(digest)) as file:
+                info = AudioInfo(**json.load(file))
+            self._remember(digest, info)
+            return info
+        return None
+    
+    def put(self, digest: str, info: AudioInfo) -> None:
+        self._remember(digest, info)
+        if self.directory:
+            temporary = f"{self._path(digest)}.{os.getpid()}.tmp"
+            with open(temporary, "w") as file:
+                json.dump(asdict(info), file)
+            os.replace(temporary, self._path(digest))
+    
+    def _remember(self, digest: str, info: AudioInfo) -> None:
+        with self._lock:
+            self._entries[digest] = info
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+probe_cache = ProbeCache()
+
+def probe(path: str, digest: Optional[str] = None, cache: Optional[ProbeCache] = probe_cache) -> AudioInfo:
+    """
+    Get audio metadata, reading only container headers when possible.
+    
+    Parsing reads at most the first HEAD_SIZE and last TAIL_SIZE bytes.
+    The cache is keyed by the hash of the whole content, the same as the
+    content store's, so without digest a lookup reads the whole file once;
+    pass the known hash (e.g. Request.audio_hash) to skip that.
+    
+    Args:
+        path: Path to the audio file
+        digest: Content hash of the file if already known (see file_digest)
+        cache: Cache to use; None disables caching
+    
+    Returns:
+        AudioInfo: Audio metadata
+    """
+    if cache is not None:
+        digest = digest or file_digest(path)
+        info = cache.get(digest)
+        if info is not None:
+            return info
+    info = read_header(path) or decode_info(path)
+    if cache is not None:
+        cache.put(digest, info)
+    return info
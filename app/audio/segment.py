@@ -0,0 +1,85 @@
+from dataclasses import dataclass
+from typing import List
+import numpy as np
+
+@dataclass(frozen=True)
+class Segment:
+    """
+    Part of a recording sent to the model on its own.
+    
+    Attributes:
+        index (int): Position of the segment in the recording
+        start (int): First sample
+        end (int): Sample after the last one
+    """
+    index: int
+    start: int
+    end: int
+
+def frame_energy(samples: np.ndarray, sample_rate: int, frame_ms: int = 30) -> np.ndarray:
+    """
+    RMS energy of consecutive non-overlapping frames of a mono signal.
+    
+    Args:
+        samples: Mono float samples
+        sample_rate: Sample rate (Hz)
+        frame_ms: Frame length (ms)
+    
+    Returns:
+        np.ndarray: One value per frame (the incomplete last frame is dropped)
+    """
+    frame = max(1, sample_rate * frame_ms // 1000)
+    frames = len(samples) // frame
+    if frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    blocks = samples[:frames * frame].reshape(frames, frame).astype(np.float32, copy=False)
+    return np.sqrt(np.mean(blocks * blocks, axis=1))
+
+def plan_segments(
+    samples: np.ndarray,
+    sample_rate: int,
+    target_s: float = 30.0,
+    max_s: float = 40.0,
+    overlap_s: float = 1.0,
+    search_s: float = 5.0,
+    frame_ms: int = 30
+) -> List[Segment]:
+    """
+    Split a recording into overlapping segments cut at the quietest moments.
+    
+    Every cut is placed at the lowest-energy frame between
+    target_s - search_s and max_s after the segment start, so words are
+    rarely split; the next segment starts overlap_s before the cut so a
+    word that is split anyway appears whole in one of them.
+    
+    Args:
+        samples: Mono float samples
+        sample_rate: Sample rate (Hz)
+        target_s: Preferred segment length (s)
+        max_s: Hard maximum segment length (s)
+        overlap_s: Overlap between neighbouring segments (s)
+        search_s: How far before target_s a cut may be placed (s)
+        frame_ms: Energy frame length (ms)
+    
+    Returns:
+        List[Segment]: Segments covering the whole recording, in order
+    """
+    if not 0 <= overlap_s < target_s - search_s <= target_s <= max_s:
+        raise ValueError("Expected 0 <= overlap_s < target_s - search_s <= target_s <= max_s")
+    total = len(samples)
+    frame = max(1, sample_rate * frame_ms // 1000)
+    energy = frame_energy(samples, sample_rate, frame_ms)
+    overlap = int(overlap_s * sample_rate)
+    
+    segments = []
+    start = 0
+    while True:
+        if total - start <= int(max_s * sample_rate):
+            segments.append(Segment(len(segments), start, total))
+            return segments
+        first = (start + int((target_s - search_s) * sample_rate)) // frame
+        last = min((start + int(max_s * sample_rate)) // frame, len(energy))
+        quietest = first + int(np.argmin(energy[first:last]))
+        cut = quietest * frame + frame // 2
+        segments.append(Segment(len(segments), start, cut))
+        start = cut - overlap
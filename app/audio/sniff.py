@@ -0,0 +1,116 @@
+from typing import BinaryIO, Optional
+import re
+import threading
+
+SNIFF_SIZE = 4096
+
+_local = threading.local()
+
+def _mp3_sync(head: bytes) -> bool:
+    return len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0 and head[1] & 0x06 != 0
+
+# ftyp major brands of audio-only MP4; generic ones (isom, mp42, dash, 3gp*) may be video and go to libmagic
+AUDIO_BRANDS = (b"M4A ", b"M4B ", b"F4A ")
+
+def _m4a(head: bytes) -> bool:
+    return head[4:8] == b"ftyp" and head[8:12] in AUDIO_BRANDS
+
+# First packets of Ogg streams; Theora (b"\x80theora") and other video go to libmagic
+OGG_AUDIO_CODECS = (b"OpusHead", b"\x01vorbis", b"\x7fFLAC", b"Speex   ")
+
+def _ogg_audio(head: bytes) -> bool:
+    """True if every stream starting in head (one BOS page each, before any data page) is audio"""
+    position = 0
+    streams = 0
+    while head[position:position + 4] == b"OggS" and len(head) >= position + 27:
+        if not head[position + 5] & 0x02:
+            break  # past the beginning-of-stream pages
+        segments = head[position + 26]
+        packet = position + 27 + segments
+        if not head[packet:packet + 8].startswith(OGG_AUDIO_CODECS):
+            return False
+        streams += 1
+        position = packet + sum(head[position + 27:packet])
+    return streams > 0
+
+# CodecID elements (0x86, one-byte size) of the Matroska track entries, e.g. A_OPUS or V_VP9
+_CODEC_ID = re.compile(rb"\x86[\x81-\xbf]([AV])_")
+
+def _webm_audio(head: bytes) -> bool:
+    if head[:4] != b"\x1a\x45\xdf\xa3" or b"webm" not in head[:64]:
+        return False
+    kinds = set(_CODEC_ID.findall(head))
+    return kinds == {b"A"}  # any video track, or tracks beyond head, go to libmagic
+
+# (check, mime) pairs for the audio containers accepted by the service
+SIGNATURES = [
+    (lambda head: head[:4] == b"RIFF" and head[8:12] == b"WAVE", "audio/x-wav"),
+    (lambda head: head[:4] == b"fLaC", "audio/flac"),
+    (_ogg_audio, "audio/ogg"),
+    (lambda head: head[:3] == b"ID3", "audio/mpeg"),
+    (_mp3_sync, "audio/mpeg"),
+    (_m4a, "audio/mp4"),
+    (lambda head: head[:4] == b"FORM" and head[8:12] in (b"AIFF", b"AIFC"), "audio/x-aiff"),
+    (lambda head: head[:6] == b"#!AMR\n", "audio/amr"),
+    (_webm_audio, "audio/webm"),
+]
+
+def _magic():
+    """libmagic handle of the current thread, created once per thread"""
+    handle = getattr(_local, "magic", None)
+    if handle is None:
+        import magic
+        handle = _local.magic = magic.Magic(mime=True)
+    return handle
+
+def sniff_mime(head: bytes, use_libmagic: bool = True) -> Optional[str]:
+    """
+    Detect MIME type from the first bytes of a file.
+    
+    Known audio containers are matched against the built-in signature
+    table; anything else goes to libmagic (one handle per thread).
+    
+    Args:
+        head: First bytes of the file, SNIFF_SIZE is enough
+        use_libmagic: Ask libmagic if no signature matched
+    
+    Returns:
+        Optional[str]: MIME type or None if unknown
+    """
+    for check, mime in SIGNATURES:
+        if check(head):
+            return mime
+    if use_libmagic and head:
+        return _magic().from_buffer(head)
+    return None
+
+def sniff_stream(stream: BinaryIO) -> Optional[str]:
+    """Detect MIME type of a binary stream, rewinding it when it is seekable"""
+    position = stream.tell() if stream.seekable() else None
+    head = stream.read(SNIFF_SIZE)
+    if position is not None:
+        stream.seek(position)
+    return sniff_mime(head)
+
+def sniff_file(path: str) -> Optional[str]:
+    """Detect MIME type of the file at path reading only its first bytes"""
+    with open(path, "rb") as file:
+        return sniff_mime(file.read(SNIFF_SIZE))
+
+def validate_audio(head: bytes) -> str:
+    """
+    Check the first bytes of an upload look like audio.
+    
+    Args:
+        head: First bytes of the upload
+    
+    Returns:
+        str: Detected MIME type
+    
+    Raises:
+        ValueError: If the upload is not audio
+    """
+    file_type = sniff_mime(head)
+    if not file_type or 'audio' not in file_type:
+        raise ValueError("Invalid request format. Please upload audio")
+    return file_type
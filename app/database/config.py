@@ -10,6 +10,33 @@ class Settings(BaseSettings):
     DB_PASS: Optional[str] = None
     DB_NAME: Optional[str] = None
     
+    # Connection pool settings
+    DB_POOL_MODE: str = "queue"  # "queue" or "pooler" (PgBouncer in transaction mode)
+    DB_POOL_SIZE: Optional[int] = None  # None sizes the pool from DB_POOL_CONCURRENCY
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 3600
+    DB_POOL_PRE_PING: bool = False
+    DB_POOL_CONCURRENCY: Optional[int] = None  # threads/tasks of one process using the database
+    DB_CONNECTION_BUDGET: Optional[int] = None  # connections all processes may open together
+    DB_POOL_WORKERS: int = 1  # processes sharing DB_CONNECTION_BUDGET
+    DB_PROFILE_QUERIES: bool = False  # log N+1 queries and unread rows per session (debug only)
+    
+    # Job queue settings
+    RABBITMQ_URL: Optional[str] = None
+    
+    # Storage settings
+    AUDIO_STORE_DIR: Optional[str] = None
+    
+    # Cache settings
+    USER_CACHE_URL: Optional[str] = None
+    USER_CACHE_TTL: float = 60.0
+    
+    # Server settings
+    HOST: str = "0.0.0.0"
+    PORT: int = 8080
+    WEB_WORKERS: Optional[int] = None  # None starts one worker per CPU
+    
     # Application settings
     APP_NAME: Optional[str] = None
     DEBUG: Optional[bool] = None
@@ -1,10 +1,22 @@
 from sqlmodel import SQLModel, Session, create_engine 
-from contextlib import contextmanager
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.engine import Engine
+from typing import AsyncIterator, Dict, Optional
 from .config import get_settings
+from .pool import PoolStats, engine_options, pool_stats
+from .metrics import Snapshot, instrument_engine, registry
+from .profiler import QueryProfiler
+import os
+import threading
 
-def get_database_engine():
+def create_database_engine() -> Engine:
     """
-    Create and configure the SQLAlchemy engine.
+    Create and configure a new SQLAlchemy engine with its own pool.
+    
+    Pooling follows the DB_POOL_* settings, see database.pool.engine_options.
+    
+    Most code needs the process-wide engine from get_database_engine instead.
     
     Returns:
         Engine: Configured SQLAlchemy engine
@@ -13,20 +25,174 @@ def get_database_engine():
     
     engine = create_engine(
         url=settings.DATABASE_URL_psycopg,
-        echo=settings.DEBUG,
-        pool_size=5,
-        max_overflow=10,
-        pool_pre_ping=True,
-        pool_recycle=3600
+        **engine_options(settings)
     )
-    return engine
+    return instrument_engine(engine)
 
-engine = get_database_engine()
+def create_async_database_engine() -> AsyncEngine:
+    """
+    Create and configure a new async SQLAlchemy engine (asyncpg driver).
+    
+    Most code needs the process-wide engine from get_async_database_engine instead.
+    
+    Returns:
+        AsyncEngine: Configured async SQLAlchemy engine
+    """
+    settings = get_settings()
+    
+    async_engine = create_async_engine(
+        url=settings.DATABASE_URL_asyncpg,
+        **engine_options(settings, async_driver=True)
+    )
+    instrument_engine(async_engine.sync_engine)
+    return async_engine
+
+class EngineRegistry:
+    """
+    Process-wide engines, created on first use instead of at import.
+    
+    Importing models and services stays cheap and does not read settings;
+    each process opens at most one sync and one async pool. A forked child
+    drops the pools inherited from its parent (without closing the parent's
+    connections) and opens its own on first use.
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._engine: Optional[Engine] = None
+        self._async_engine: Optional[AsyncEngine] = None
+        self._async_session_maker: Optional[async_sessionmaker] = None
+    
+    def engine(self) -> Engine:
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = create_database_engine()
+        return self._engine
+    
+    def async_engine(self) -> AsyncEngine:
+        if self._async_engine is None:
+            with self._lock:
+                if self._async_engine is None:
+                    self._async_engine = create_async_database_engine()
+        return self._async_engine
+    
+    def async_session_maker(self) -> async_sessionmaker:
+        if self._async_session_maker is None:
+            engine = self.async_engine()
+            with self._lock:
+                if self._async_session_maker is None:
+                    self._async_session_maker = async_sessionmaker(
+                        engine,
+                        class_=AsyncSession,
+                        expire_on_commit=False
+                    )
+        return self._async_session_maker
+    
+    def configure(self, engine: Optional[Engine] = None, async_engine: Optional[AsyncEngine] = None) -> None:
+        """Use the given engines, e.g. SQLite engines in tests and CLI tools"""
+        with self._lock:
+            if engine is not None:
+                self._engine = instrument_engine(engine)
+            if async_engine is not None:
+                instrument_engine(async_engine.sync_engine)
+                self._async_engine = async_engine
+                self._async_session_maker = None
+    
+    def dispose(self) -> None:
+        """Close all pooled connections and forget the engines"""
+        with self._lock:
+            if self._engine is not None:
+                self._engine.dispose()
+            if self._async_engine is not None:
+                # the pool of an AsyncEngine is owned by its sync engine
+                self._async_engine.sync_engine.dispose()
+            self._engine = None
+            self._async_engine = None
+            self._async_session_maker = None
+    
+    def _after_fork(self) -> None:
+        # Connections inherited from the parent must not be used or closed
+        # here; dispose(close=False) just gives the engines fresh pools
+        self._lock = threading.Lock()
+        if self._engine is not None:
+            self._engine.dispose(close=False)
+        if self._async_engine is not None:
+            self._async_engine.sync_engine.dispose(close=False)
+
+engines = EngineRegistry()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=engines._after_fork)
+
+def get_database_engine() -> Engine:
+    """Process-wide SQLAlchemy engine, created on first call"""
+    return engines.engine()
+
+def get_async_database_engine() -> AsyncEngine:
+    """Process-wide async SQLAlchemy engine, created on first call"""
+    return engines.async_engine()
+
+def get_async_session_maker() -> async_sessionmaker:
+    """Factory of async sessions bound to the process-wide async engine"""
+    return engines.async_session_maker()
+
+def get_pool_stats() -> Dict[str, PoolStats]:
+    """
+    State and wait times of the pools this process has opened.
+    
+    Returns:
+        Dict[str, PoolStats]: Stats by engine ("sync", "async"); engines not
+            created yet are missing
+    """
+    stats = {}
+    if engines._engine is not None:
+        stats["sync"] = pool_stats(engines._engine.pool)
+    if engines._async_engine is not None:
+        stats["async"] = pool_stats(engines._async_engine.pool)
+    return stats
+
+def _pool_metrics() -> Snapshot:
+    gauges = {
+        "db_pool_size": ("Persistent connections the pool keeps", "size"),
+        "db_pool_checked_out": ("Connections in use", "checked_out"),
+        "db_pool_checked_in": ("Idle pooled connections", "checked_in"),
+        "db_pool_overflow": ("Connections open above the pool size", "overflow")
+    }
+    counters = {
+        "db_pool_checkouts_total": ("Successful checkouts since the pool was created", "checkouts"),
+        "db_pool_timeouts_total": ("Checkouts that failed, mostly pool timeouts", "timeouts")
+    }
+    stats = get_pool_stats()
+    families = {}
+    for kind, metrics in (("gauge", gauges), ("counter", counters)):
+        for name, (help, field) in metrics.items():
+            families[name] = {
+                "type": kind,
+                "help": help,
+                "samples": [[name, {"engine": engine}, getattr(stat, field)] for engine, stat in stats.items()]
+            }
+    return families
+
+registry.add_collector(_pool_metrics)
 
 def get_session():
-    with Session(engine) as session:
-        yield session
-        
+    with Session(get_database_engine()) as session:
+        if not get_settings().DB_PROFILE_QUERIES:
+            yield session
+            return
+        with QueryProfiler(session) as profiler:
+            yield session
+        profiler.log_problems()
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    async with get_async_session_maker()() as session:
+        if not get_settings().DB_PROFILE_QUERIES:
+            yield session
+            return
+        with QueryProfiler(session) as profiler:
+            yield session
+        profiler.log_problems()
+
 def init_db(drop_all: bool = False) -> None:
     """
     Initialize database schema.
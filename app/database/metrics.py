@@ -0,0 +1,385 @@
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from bisect import bisect_left
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import inspect
+import threading
+import time
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # s
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+_OPERATIONS = frozenset(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "COPY"))
+
+# family name -> {"type", "help", "samples": [[sample name, labels, value], ...]}
+Snapshot = Dict[str, Dict[str, Any]]
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class Metric:
+    """
+    Labelled metric kept in process memory.
+    
+    Attributes:
+        name (str): Metric name
+        help (str): Description for # HELP
+        label_names (Tuple[str, ...]): Names of the label values passed on updates
+    """
+    type = "untyped"
+    
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+    
+    def _labels(self, values: Tuple[str, ...], **extra: str) -> Dict[str, str]:
+        labels = dict(zip(self.label_names, values))
+        labels.update(extra)
+        return labels
+    
+    def samples(self) -> List[List[Any]]:
+        raise NotImplementedError
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+class Counter(Metric):
+    """Monotonically increasing total"""
+    type = "counter"
+    
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+    
+    def samples(self) -> List[List[Any]]:
+        with self._lock:
+            values = list(self._values.items())
+        return [[self.name, self._labels(labels), value] for labels, value in values]
+
+class Histogram(Metric):
+    """Distribution of observations in cumulative buckets, with their sum and count"""
+    type = "histogram"
+    
+    def __init__(self, name: str, help: str, label_names: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        super().__init__(name, help, label_names)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value: float, labels: Tuple[str, ...] = ()) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # per-bucket counts (+Inf last), sum
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+    
+    def samples(self) -> List[List[Any]]:
+        with self._lock:
+            values = [(labels, list(series)) for labels, series in self._values.items()]
+        samples = []
+        for labels, series in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                samples.append([f"{self.name}_bucket", self._labels(labels, le=_format_value(bound)), cumulative])
+            samples.append([f"{self.name}_sum", self._labels(labels), series[-1]])
+            samples.append([f"{self.name}_count", self._labels(labels), cumulative])
+        return samples
+
+class MetricsRegistry:
+    """
+    Metrics of one process and collectors read at scrape time.
+    
+    Updates take a lock and a dict lookup, scrapes format text; both are
+    cheap enough to leave on in production.
+    """
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], Snapshot]] = []
+        self._lock = threading.Lock()
+    
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name: str, help: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, label_names))
+    
+    def histogram(self, name: str, help: str, label_names: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, label_names, buckets))
+    
+    def add_collector(self, collector: Callable[[], Snapshot]) -> None:
+        """Register a function returning families computed on every scrape, e.g. pool gauges"""
+        self._collectors.append(collector)
+    
+    def snapshot(self) -> Snapshot:
+        """
+        Current values of all metrics.
+        
+        Returns:
+            Snapshot: JSON-serializable families, see merge_snapshots and render
+        """
+        families = {
+            metric.name: {"type": metric.type, "help": metric.help, "samples": metric.samples()}
+            for metric in list(self._metrics.values())
+        }
+        for collector in self._collectors:
+            families.update(collector())
+        return families
+    
+    def clear(self) -> None:
+        """Reset all metrics, e.g. between tests"""
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+def merge_snapshots(snapshots: Iterable[Snapshot]) -> Snapshot:
+    """
+    Sum the snapshots of several processes into one.
+    
+    Every exported value is a total (counters, histogram buckets, sums and
+    additive gauges), so adding them gives the values of the whole server.
+    """
+    merged: Snapshot = {}
+    for snapshot in snapshots:
+        for name, family in snapshot.items():
+            target = merged.setdefault(name, {"type": family["type"], "help": family["help"], "samples": {}})
+            for sample_name, labels, value in family["samples"]:
+                key = (sample_name, tuple(sorted(labels.items())))
+                target["samples"][key] = target["samples"].get(key, 0.0) + value
+    return {
+        name: {
+            "type": family["type"],
+            "help": family["help"],
+            "samples": [[sample_name, dict(labels), value] for (sample_name, labels), value in family["samples"].items()]
+        }
+        for name, family in merged.items()
+    }
+
+def render(snapshot: Snapshot) -> str:
+    """
+    Format a snapshot in the Prometheus text exposition format (version 0.0.4).
+    
+    Args:
+        snapshot: Families from MetricsRegistry.snapshot or merge_snapshots
+    
+    Returns:
+        str: Response body for a text/plain; version=0.0.4 scrape
+    """
+    lines = []
+    for name in sorted(snapshot):
+        family = snapshot[name]
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for sample_name, labels, value in family["samples"]:
+            if labels:
+                formatted = ",".join(f'{key}="{_escape(str(label))}"' for key, label in labels.items())
+                lines.append(f"{sample_name}{{{formatted}}} {_format_value(value)}")
+            else:
+                lines.append(f"{sample_name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+statement_duration = registry.histogram(
+    "db_statement_duration_seconds", "Time from sending a statement to the database until the cursor returned", ("operation",)
+)
+statement_errors = registry.counter("db_statement_errors_total", "Statements that raised", ("operation",))
+statement_rows = registry.counter("db_statement_rows_total", "Rows returned or affected, as reported by the driver", ("operation",))
+pool_wait = registry.histogram("db_pool_wait_seconds", "Time a checkout waited for a pooled connection")
+pool_hold = registry.histogram("db_pool_connection_hold_seconds", "Time a connection stayed checked out of the pool")
+call_duration = registry.histogram("crud_call_duration_seconds", "Time spent in a CRUD function", ("function",))
+call_errors = registry.counter("crud_call_errors_total", "CRUD calls that raised", ("function",))
+call_statements = registry.histogram(
+    "crud_statements_per_call", "Statements executed by one CRUD call", ("function",), COUNT_BUCKETS
+)
+call_rows = registry.histogram("crud_rows_per_call", "Rows returned or affected by one CRUD call", ("function",), ROW_BUCKETS)
+
+class _CallFrame:
+    __slots__ = ("name", "statements", "rows")
+    
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.statements = 0
+        self.rows = 0
+
+# Instrumented calls in progress, outermost first; a statement counts for all of them
+_frames: ContextVar[Tuple[_CallFrame, ...]] = ContextVar("crud_call_frames", default=())
+
+def current_call() -> Optional[str]:
+    """Name of the innermost instrumented CRUD call in progress, None outside of one"""
+    frames = _frames.get()
+    return frames[-1].name if frames else None
+
+def _operation(statement: str) -> str:
+    verb = statement.lstrip()[:6].upper()
+    return verb if verb in _OPERATIONS else "OTHER"
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    context._metrics_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - context._metrics_started
+    operation = _operation(statement)
+    statement_duration.observe(elapsed, (operation,))
+    rows = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount > 0 else 0
+    if rows:
+        statement_rows.inc((operation,), rows)
+    for frame in _frames.get():
+        frame.statements += 1
+        frame.rows += rows
+
+def _handle_error(exception_context) -> None:
+    statement = exception_context.statement
+    statement_errors.inc((_operation(statement) if statement else "OTHER",))
+    for frame in _frames.get():
+        frame.statements += 1
+
+def _checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+    connection_record.info["metrics_checked_out"] = time.perf_counter()
+
+def _checkin(dbapi_connection, connection_record) -> None:
+    started = connection_record.info.pop("metrics_checked_out", None)
+    if started is not None:
+        pool_hold.observe(time.perf_counter() - started)
+
+def instrument_engine(engine: Engine) -> Engine:
+    """
+    Record statement latency, rows and connection hold times of an engine.
+    
+    Safe to call more than once. For an AsyncEngine pass its sync_engine.
+    Pool wait times are recorded by the Timed* pools of database.pool.
+    
+    Args:
+        engine: Engine to instrument
+    
+    Returns:
+        Engine: The same engine
+    """
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    event.listen(engine, "checkout", _checkout)
+    event.listen(engine, "checkin", _checkin)
+    return engine
+
+def _record_call(name: str, frame: _CallFrame, elapsed: float, failed: bool) -> None:
+    labels = (name,)
+    call_duration.observe(elapsed, labels)
+    call_statements.observe(frame.statements, labels)
+    call_rows.observe(frame.rows, labels)
+    if failed:
+        call_errors.inc(labels)
+
+def instrumented(func: Callable) -> Callable:
+    """
+    Record latency, statements and rows of every call of a CRUD function.
+    
+    Works for functions, coroutines, generators and async generators; the
+    time of a generator is the time spent inside it, not in its consumer.
+    Calls are labelled by module and name, e.g. "crud.user.get_user_by_id".
+    
+    Args:
+        func: CRUD function
+    
+    Returns:
+        Callable: Wrapped function
+    """
+    name = f"{func.__module__.rpartition('services.')[2]}.{func.__name__}"
+    
+    if inspect.isasyncgenfunction(func):
+        @wraps(func)
+        async def async_generator_wrapper(*args, **kwargs):
+            frame, elapsed, failed = _CallFrame(name), 0.0, False
+            generator = func(*args, **kwargs)
+            try:
+                while True:
+                    token = _frames.set(_frames.get() + (frame,))
+                    started = time.perf_counter()
+                    try:
+                        item = await generator.__anext__()
+                    except StopAsyncIteration:
+                        return
+                    finally:
+                        elapsed += time.perf_counter() - started
+                        _frames.reset(token)
+                    yield item
+            except Exception:
+                failed = True
+                raise
+            finally:
+                await generator.aclose()
+                _record_call(name, frame, elapsed, failed)
+        return async_generator_wrapper
+    
+    if inspect.isgeneratorfunction(func):
+        @wraps(func)
+        def generator_wrapper(*args, **kwargs):
+            frame, elapsed, failed = _CallFrame(name), 0.0, False
+            generator = func(*args, **kwargs)
+            try:
+                while True:
+                    token = _frames.set(_frames.get() + (frame,))
+                    started = time.perf_counter()
+                    try:
+                        item = next(generator)
+                    except StopIteration:
+                        return
+                    finally:
+                        elapsed += time.perf_counter() - started
+                        _frames.reset(token)
+                    yield item
+            except Exception:
+                failed = True
+                raise
+            finally:
+                generator.close()
+                _record_call(name, frame, elapsed, failed)
+        return generator_wrapper
+    
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def coroutine_wrapper(*args, **kwargs):
+            frame, failed = _CallFrame(name), False
+            token = _frames.set(_frames.get() + (frame,))
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                _frames.reset(token)
+                _record_call(name, frame, time.perf_counter() - started, failed)
+        return coroutine_wrapper
+    
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        frame, failed = _CallFrame(name), False
+        token = _frames.set(_frames.get() + (frame,))
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            _frames.reset(token)
+            _record_call(name, frame, time.perf_counter() - started, failed)
+    return wrapper
@@ -0,0 +1,168 @@
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool, QueuePool
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Tuple
+from uuid import uuid4
+from .metrics import pool_wait
+import threading
+import time
+
+POOL_MODE_QUEUE = "queue"
+POOL_MODE_POOLER = "pooler"  # PgBouncer/pgcat in transaction mode
+DEFAULT_POOL_SIZE = 5
+
+class _TimedPoolMixin:
+    """Measures how long checkouts wait for a connection; dispose() starts a new pool with zeroed counters"""
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._timing_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+    
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            with self._timing_lock:
+                self.timeouts += 1
+            raise
+        waited = time.perf_counter() - started
+        with self._timing_lock:
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        pool_wait.observe(waited)
+        return connection
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    """QueuePool that records checkout wait times"""
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records checkout wait times"""
+
+class TimedNullPool(_TimedPoolMixin, NullPool):
+    """NullPool that records connect times (every checkout opens a connection)"""
+
+@dataclass(frozen=True)
+class PoolStats:
+    """
+    Snapshot of a connection pool.
+    
+    Attributes:
+        pool (str): Pool class
+        size (int): Configured persistent connections (0 without pooling)
+        checked_out (int): Connections in use
+        checked_in (int): Idle pooled connections
+        overflow (int): Connections open above size
+        checkouts (int): Successful checkouts since the pool was created
+        timeouts (int): Checkouts that failed, mostly pool timeouts
+        wait_avg_s (float): Mean time a checkout waited (s)
+        wait_max_s (float): Longest time a checkout waited (s)
+    """
+    pool: str
+    size: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    wait_avg_s: float
+    wait_max_s: float
+    
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+def pool_stats(pool: Pool) -> PoolStats:
+    """
+    Read the state and wait-time counters of a pool.
+    
+    Args:
+        pool: engine.pool, or async_engine.pool
+    
+    Returns:
+        PoolStats: Snapshot
+    """
+    queue = isinstance(pool, QueuePool)
+    checkouts = getattr(pool, "checkouts", 0)
+    return PoolStats(
+        pool=type(pool).__name__,
+        size=pool.size() if queue else 0,
+        checked_out=pool.checkedout() if queue else 0,
+        checked_in=pool.checkedin() if queue else 0,
+        overflow=max(pool.overflow(), 0) if queue else 0,
+        checkouts=checkouts,
+        timeouts=getattr(pool, "timeouts", 0),
+        wait_avg_s=getattr(pool, "wait_total", 0.0) / checkouts if checkouts else 0.0,
+        wait_max_s=getattr(pool, "wait_max", 0.0)
+    )
+
+def pool_sizing(settings, async_driver: bool = False) -> Tuple[int, int]:
+    """
+    Pool size and overflow of one engine.
+    
+    DB_POOL_SIZE wins when set; otherwise the pool matches the process's
+    concurrency (DB_POOL_CONCURRENCY, e.g. worker threads). With
+    DB_CONNECTION_BUDGET every one of DB_POOL_WORKERS processes gets an
+    equal share of the budget, split between its sync and async engine
+    (the sync engine gets the odd connection), and both numbers are
+    capped to the engine's part.
+    
+    Args:
+        settings: Settings
+        async_driver: Sizing of the async engine instead of the sync one
+    
+    Returns:
+        Tuple[int, int]: (pool_size, max_overflow)
+    """
+    size = settings.DB_POOL_SIZE or settings.DB_POOL_CONCURRENCY or DEFAULT_POOL_SIZE
+    overflow = settings.DB_MAX_OVERFLOW
+    if settings.DB_CONNECTION_BUDGET:
+        process_share = settings.DB_CONNECTION_BUDGET // max(1, settings.DB_POOL_WORKERS)
+        share = max(1, process_share // 2 if async_driver else process_share - process_share // 2)
+        size = min(size, share)
+        overflow = max(0, min(overflow, share - size))
+    return size, overflow
+
+def engine_options(settings, async_driver: bool = False) -> Dict[str, Any]:
+    """
+    Keyword arguments for create_engine/create_async_engine from settings.
+    
+    In pooler mode connections are not kept by SQLAlchemy (NullPool, the
+    external pooler does the pooling) and server-side prepared statements
+    are disabled, since a transaction-mode pooler may run consecutive
+    statements of a session on different server connections.
+    
+    Args:
+        settings: Settings
+        async_driver: Options for asyncpg instead of psycopg
+    
+    Returns:
+        Dict[str, Any]: Engine options
+    """
+    options: Dict[str, Any] = {"echo": settings.DEBUG}
+    if settings.DB_POOL_MODE == POOL_MODE_POOLER:
+        options["poolclass"] = TimedNullPool
+        if async_driver:
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__"
+            }
+        else:
+            options["connect_args"] = {"prepare_threshold": None}
+        return options
+    if settings.DB_POOL_MODE != POOL_MODE_QUEUE:
+        raise ValueError(f"DB_POOL_MODE must be {POOL_MODE_QUEUE!r} or {POOL_MODE_POOLER!r}")
+    size, overflow = pool_sizing(settings, async_driver)
+    options.update(
+        poolclass=TimedAsyncQueuePool if async_driver else TimedQueuePool,
+        pool_size=size,
+        max_overflow=overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_use_lifo=True
+    )
+    return options
@@ -0,0 +1,362 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import InstrumentedAttribute, Session
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from .metrics import current_call
+import logging
+import re
+import threading
+import time
+import weakref
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPEAT_THRESHOLD = 3
+
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<![:\w]):\w+|\?")
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_VALUES_LIST = re.compile(r"\(\?\.\.\.\)(?:\s*,\s*\(\?\.\.\.\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+def statement_shape(statement: str) -> str:
+    """
+    Statement text with parameters and parameter lists collapsed.
+    
+    Statements that differ only in their parameters, or in the length of
+    an IN (...) or multi-row VALUES list, get the same shape.
+    """
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _PLACEHOLDER_LIST.sub("?...", shape)
+    shape = shape.replace("(?)", "(?...)")
+    return _VALUES_LIST.sub("(?...)...", shape)
+
+class QueryBudgetExceeded(AssertionError):
+    """More statements than a budget allows, see assert_max_queries"""
+
+@dataclass(frozen=True)
+class ProfiledStatement:
+    """
+    A statement executed on a profiled session.
+    
+    Attributes:
+        statement (str): SQL as sent to the driver
+        shape (str): statement_shape of the SQL
+        operation (Optional[str]): Innermost instrumented CRUD call, e.g. "crud.user.get_user_by_id"
+        duration_s (float): Execution time (s)
+        rows (int): Rows affected or returned, as reported by the driver (0 when unknown)
+    """
+    statement: str
+    shape: str
+    operation: Optional[str]
+    duration_s: float
+    rows: int
+
+@dataclass(frozen=True)
+class RepeatedShape:
+    """
+    A statement shape executed repeatedly, typically a query per row (N+1).
+    
+    Attributes:
+        shape (str): statement_shape
+        count (int): Executions
+        operations (Tuple[str, ...]): CRUD calls that executed it
+    """
+    shape: str
+    count: int
+    operations: Tuple[str, ...]
+
+@dataclass(frozen=True)
+class UnusedLoad:
+    """
+    Rows or relationships loaded without ever being read.
+    
+    Attributes:
+        entity (str): Model, e.g. "Transaction", or relationship, e.g. "User.requests"
+        loaded (int): Instances (or collections) loaded
+        unused (int): Of those never read
+    """
+    entity: str
+    loaded: int
+    unused: int
+
+# Profilers tracking attribute reads by Session.hash_key of their session.
+# InstrumentedAttribute.__get__ is only replaced while there is at least
+# one; the dict is replaced, never changed, so readers need no lock.
+_tracking: Dict[int, Tuple["QueryProfiler", ...]] = {}
+_tracking_lock = threading.Lock()
+_original_get = InstrumentedAttribute.__get__
+
+def _tracking_get(self, instance, owner):
+    if instance is not None:
+        state = instance.__dict__.get("_sa_instance_state")
+        if state is not None and state.session_id in _tracking:
+            for profiler in _tracking.get(state.session_id, ()):
+                profiler._read(instance, self.key)
+    return _original_get(self, instance, owner)
+
+def _start_tracking(profiler: "QueryProfiler") -> None:
+    global _tracking
+    with _tracking_lock:
+        key = profiler._session.hash_key
+        tracking = dict(_tracking)
+        tracking[key] = tracking.get(key, ()) + (profiler,)
+        _tracking = tracking
+        InstrumentedAttribute.__get__ = _tracking_get
+
+def _stop_tracking(profiler: "QueryProfiler") -> None:
+    global _tracking
+    with _tracking_lock:
+        key = profiler._session.hash_key
+        tracking = dict(_tracking)
+        remaining = tuple(other for other in tracking.get(key, ()) if other is not profiler)
+        if remaining:
+            tracking[key] = remaining
+        else:
+            tracking.pop(key, None)
+        _tracking = tracking
+        if not tracking:
+            InstrumentedAttribute.__get__ = _original_get
+
+class QueryProfiler:
+    """
+    Records the statements of one session and how their rows are used.
+    
+    Meant for tests and debugging: it counts statements per CRUD call,
+    finds statement shapes repeated often enough to suggest a query per
+    row (N+1), and with track_access finds loaded rows and relationships
+    that were never read, e.g. collections fetched by selectin loading.
+    Reading is tracked by wrapping mapped attribute access in the process
+    while a tracking profiler is active; only instances of the profiled
+    session are recorded, and they are held by weak references, so objects
+    the caller drops are not kept alive (they are counted as rows then, not
+    for their relationships). Still, keep it out of production.
+    
+    Works with Session and AsyncSession; only statements on connections
+    of the profiled session are recorded.
+    
+    Example:
+        with QueryProfiler(session) as profiler:
+            get_all_users(session)
+        print(profiler.report())
+    
+    Attributes:
+        statements (List[ProfiledStatement]): Statements in execution order
+        repeat_threshold (int): Executions of one shape that count as repeated
+        track_access (bool): Track which loaded rows are read
+    """
+    def __init__(self, session, repeat_threshold: int = DEFAULT_REPEAT_THRESHOLD, track_access: bool = True) -> None:
+        self._session: Session = getattr(session, "sync_session", session)
+        self.repeat_threshold = repeat_threshold
+        self.track_access = track_access
+        self.statements: List[ProfiledStatement] = []
+        self._engine = None
+        self._connections: Set[Connection] = set()
+        self._loaded: Dict[int, Tuple[weakref.ref, str]] = {}
+        self._reads: Dict[int, Set[str]] = defaultdict(set)
+        self._collected: Dict[str, List[int]] = defaultdict(lambda: [0, 0])  # rows of dropped instances
+        self._lock = threading.RLock()  # weakref callbacks may run while it is held
+    
+    def __enter__(self) -> "QueryProfiler":
+        self.start()
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+    
+    @property
+    def count(self) -> int:
+        """Statements executed so far"""
+        return len(self.statements)
+    
+    def start(self) -> None:
+        """Begin recording; a transaction already open on the session is included"""
+        self._engine = self._session.get_bind()
+        try:
+            if self._session.in_transaction():
+                self._connections.add(self._session.connection())
+            event.listen(self._session, "after_begin", self._after_begin)
+            event.listen(self._session, "loaded_as_persistent", self._loaded_as_persistent)
+            event.listen(self._engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(self._engine, "after_cursor_execute", self._after_cursor_execute)
+            if self.track_access:
+                _start_tracking(self)
+        except BaseException:
+            self.stop()
+            raise
+    
+    def stop(self) -> None:
+        """Stop recording and restore attribute access; results stay available"""
+        if self._engine is None:
+            return
+        for target, name, listener in (
+            (self._session, "after_begin", self._after_begin),
+            (self._session, "loaded_as_persistent", self._loaded_as_persistent),
+            (self._engine, "before_cursor_execute", self._before_cursor_execute),
+            (self._engine, "after_cursor_execute", self._after_cursor_execute)
+        ):
+            if event.contains(target, name, listener):
+                event.remove(target, name, listener)
+        if self.track_access:
+            _stop_tracking(self)
+        self._engine = None
+    
+    def _after_begin(self, session, transaction, connection) -> None:
+        self._connections.add(connection)
+    
+    def _loaded_as_persistent(self, session, instance) -> None:
+        key = id(instance)
+        with self._lock:
+            self._reads.pop(key, None)
+            self._loaded[key] = (weakref.ref(instance, lambda _: self._collect(key)), type(instance).__name__)
+    
+    def _collect(self, key: int) -> None:
+        """An instance was garbage collected: keep its row counts only"""
+        with self._lock:
+            entry = self._loaded.pop(key, None)
+            reads = self._reads.pop(key, None)
+            if entry is not None:
+                counts = self._collected[entry[1]]
+                counts[0] += 1
+                counts[1] += not reads
+    
+    def _read(self, instance, key: str) -> None:
+        if id(instance) in self._loaded:
+            self._reads[id(instance)].add(key)
+    
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if conn in self._connections:
+            context._profiler_started = time.perf_counter()
+    
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if conn not in self._connections:
+            return
+        elapsed = time.perf_counter() - context._profiler_started
+        rows = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount > 0 else 0
+        with self._lock:
+            self.statements.append(
+                ProfiledStatement(statement, statement_shape(statement), current_call(), elapsed, rows)
+            )
+    
+    def by_operation(self) -> Dict[Optional[str], int]:
+        """
+        Statements per CRUD call.
+        
+        Returns:
+            Dict[Optional[str], int]: Counts by innermost CRUD call; None for
+                statements outside of one, e.g. lazy loads in the caller
+        """
+        return dict(Counter(statement.operation for statement in self.statements))
+    
+    def repeated_shapes(self) -> List[RepeatedShape]:
+        """
+        Shapes executed at least repeat_threshold times, most frequent first.
+        
+        Returns:
+            List[RepeatedShape]: Likely N+1 loops
+        """
+        counts = Counter(statement.shape for statement in self.statements)
+        operations: Dict[str, Set[str]] = defaultdict(set)
+        for statement in self.statements:
+            if statement.operation is not None:
+                operations[statement.shape].add(statement.operation)
+        return [
+            RepeatedShape(shape, count, tuple(sorted(operations[shape])))
+            for shape, count in counts.most_common()
+            if count >= self.repeat_threshold
+        ]
+    
+    def unused_loads(self) -> List[UnusedLoad]:
+        """
+        Loaded rows never read and loaded relationships never read.
+        
+        Only meaningful with track_access; call after the loaded objects
+        have been used.
+        
+        Returns:
+            List[UnusedLoad]: Over-fetched models and relationships
+        """
+        with self._lock:
+            rows: Dict[str, List[int]] = defaultdict(lambda: [0, 0], {name: list(counts) for name, counts in self._collected.items()})
+            loaded = [(key, reference()) for key, (reference, _) in self._loaded.items()]
+        relationships: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        for key, instance in loaded:
+            if instance is None:
+                continue
+            state = inspect(instance)
+            reads = self._reads.get(key, set())
+            name = type(instance).__name__
+            rows[name][0] += 1
+            rows[name][1] += not reads
+            for relationship in state.mapper.relationships:
+                if relationship.key in state.dict:
+                    entity = f"{name}.{relationship.key}"
+                    relationships[entity][0] += 1
+                    relationships[entity][1] += relationship.key not in reads
+        return [
+            UnusedLoad(entity, loaded, unused)
+            for entity, (loaded, unused) in sorted({**rows, **relationships}.items())
+            if unused
+        ]
+    
+    def report(self) -> str:
+        """Human-readable summary: counts per CRUD call, repeated shapes and unused loads"""
+        lines = [f"{self.count} statements, {sum(s.duration_s for s in self.statements) * 1000:.1f} ms"]
+        for operation, count in sorted(self.by_operation().items(), key=lambda item: -item[1]):
+            lines.append(f"  {count:4d}  {operation or '(outside CRUD calls)'}")
+        for repeated in self.repeated_shapes():
+            operations = ", ".join(repeated.operations) or "outside CRUD calls"
+            lines.append(f"Repeated {repeated.count}x in {operations}: {repeated.shape}")
+        if self.track_access:
+            for unused in self.unused_loads():
+                lines.append(f"Loaded but never read: {unused.entity} ({unused.unused} of {unused.loaded})")
+        return "\n".join(lines)
+    
+    def log_problems(self, log: logging.Logger = logger) -> bool:
+        """
+        Log repeated shapes and unused loads as warnings.
+        
+        Returns:
+            bool: True if there was anything to log
+        """
+        problems = self.repeated_shapes() or (self.track_access and self.unused_loads())
+        if problems:
+            log.warning("Query profile of session:\n%s", self.report())
+        return bool(problems)
+
+@contextmanager
+def assert_max_queries(session, max_queries: int, max_repeats: Optional[int] = None) -> Iterator[QueryProfiler]:
+    """
+    Fail when the block executes more statements than a budget allows.
+    
+    Example:
+        with assert_max_queries(session, max_queries=2):
+            get_user_by_email("user@example.com", session)
+    
+    Args:
+        session: Session or AsyncSession the block uses
+        max_queries: Most statements allowed
+        max_repeats: Most executions allowed for any one statement shape
+    
+    Yields:
+        QueryProfiler: Profiler of the block
+    
+    Raises:
+        QueryBudgetExceeded: Budget exceeded; the message has the profile report
+    """
+    profiler = QueryProfiler(session, track_access=False)
+    with profiler:
+        yield profiler
+    if profiler.count > max_queries:
+        raise QueryBudgetExceeded(
+            f"{profiler.count} statements executed, budget is {max_queries}\n{profiler.report()}"
+        )
+    if max_repeats is not None:
+        shapes = Counter(statement.shape for statement in profiler.statements)
+        if shapes and max(shapes.values()) > max_repeats:
+            raise QueryBudgetExceeded(
+                f"A statement shape ran {max(shapes.values())} times, budget is {max_repeats}\n{profiler.report()}"
+            )
@@ -5,6 +5,8 @@ from sqlmodel import Session
 from models.user import User
 from models.request import Request
 from models.transaction import Transaction
+from models.hold import CreditHold
+from models.transcript import RequestTranscript
 
 
 if __name__ == "__main__":
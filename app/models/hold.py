@@ -0,0 +1,35 @@
+from datetime import datetime
+from enum import Enum
+from sqlmodel import SQLModel, Field
+from typing import Optional
+
+class HoldStatus(str, Enum):
+    """Lifecycle of a credit hold"""
+    HELD = "held"
+    SETTLED = "settled"
+    RELEASED = "released"
+
+class CreditHold(SQLModel, table=True):
+    """
+    Credits reserved from a user's balance for an in-flight transcription.
+    
+    The amount is already subtracted from User.actual_balance while the hold
+    is open; settling charges the final cost and returns the rest, releasing
+    returns the whole amount.
+    
+    Attributes:
+        id (Optional[int]): Primary key
+        user_id (int): Foreign key to User
+        request_id (Optional[int]): Foreign key to Request
+        amount (float): Reserved credits
+        status (str): One of HoldStatus values
+        created_at (datetime): Hold creation timestamp
+    """
+    __tablename__ = "credit_hold"
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    request_id: Optional[int] = Field(default=None, foreign_key="request.id", index=True)
+    amount: float = Field(..., gt = 0)
+    status: str = Field(default=HoldStatus.HELD.value, max_length=16)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -1,14 +1,18 @@
 from datetime import datetime
 from sqlmodel import SQLModel, Field, Relationship
 from typing import Optional, List, TYPE_CHECKING
-from pydub import AudioSegment
-import magic
+from audio.probe import probe
+from audio.sniff import SNIFF_SIZE, validate_audio
 import math
 
 if TYPE_CHECKING:
     from models.user import User
     from models.transaction import Transaction
 
+MIN_DURATION = 5 # s
+MAX_DURATION = 600 # s
+PRICE_PER_SECOND = 0.25 # cr. for 1 second of audio
+
 class RequestsBase(SQLModel):
     """
     Base requests model with common fields.
@@ -17,30 +21,42 @@ class RequestsBase(SQLModel):
         audio(str): path to file with audio recording
         duration(float): audio recording duration (s)
         cost(float): cost of request
-        transript(str): result of transcription
+    
+    The transcript is stored compressed in RequestTranscript, see
+    services.crud.transcript.
     """
     audio: str = Field(...)
-    duration: float = Field(..., min = 5, max = 600)
+    duration: float = Field(..., ge = MIN_DURATION, le = MAX_DURATION)
     cost: float = Field(...)
-    transcript: str = Field(..., max_length = 30000)
 
     def _validate_request(self) -> None:
-        """Validate uploaded file"""
-        mime = magic.Magic(mime=True)
-        file_type = mime.from_file(audio)
-        if 'audio' not in file_type:
-            raise ValueError("Invalid request format. Please upload audio")
+        """Validate uploaded file by its first bytes"""
+        with open(self.audio, 'rb') as file:
+            validate_audio(file.read(SNIFF_SIZE))
+        
+    def get_duration(self, audio: Optional[str] = None) -> float:
+        """
+        Determines duration of uploaded audio recording.
         
-    def get_duration(self, audio) -> None:
-        """Determines duration of uploaded audio recording"""
-        audio_file = AudioSegment.from_file(audio)
-        dur_audio = audio_file.duration_seconds
+        Reads container headers only (decodes just unknown formats), results
+        are cached by file content hash; the stored audio_hash saves hashing
+        the file again.
+        """
+        digest = getattr(self, "audio_hash", None) if audio is None else None
+        dur_audio = probe(audio or self.audio, digest).duration
         return dur_audio
 
-    def get_price(self) -> None:
+    def check_duration(self, audio: Optional[str] = None) -> float:
+        """Determines duration and checks it is within MIN_DURATION..MAX_DURATION"""
+        dur_audio = self.get_duration(audio)
+        if not MIN_DURATION <= dur_audio <= MAX_DURATION:
+            raise ValueError(f"Audio must be from {MIN_DURATION} to {MAX_DURATION} s long")
+        return dur_audio
+
+    def get_price(self) -> float:
         """Determines request cost"""
         duration_audio = self.get_duration()
-        price = duration_audio * 0,25 # 0,25 cr. is cost of 1 second audio 
+        price = duration_audio * PRICE_PER_SECOND
         return price
 
 class Request(RequestsBase, table=True):
@@ -53,20 +69,26 @@ class Request(RequestsBase, table=True):
         user (Optional[User]): Relationship to User
         transaction_id (Optional[int]): Foreign key to Transaction
         transaction (Optional[Transaction]): Relationship to Transaction
+        audio_hash (Optional[str]): Content hash of the audio in the content store
+        model_version (Optional[str]): Version of the model that produced the transcript
         created_at (datetime): Event creation timestamp
     """
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: Optional[int] = Field(default=None, foreign_key="user.id")
+    user_id: Optional[int] = Field(default=None, foreign_key="user.id", index=True)
     user: Optional["User"] = Relationship(
         back_populates="requests",
-        sa_relationship_kwargs={"lazy": "selectin"}
+        sa_relationship_kwargs={"lazy": "raise_on_sql"}
     )
     transaction_id: Optional[int] = Field(default=None, foreign_key="transaction.id")
     transaction: Optional["Transaction"] = Relationship(
-        back_populates="requests",
-        sa_relationship_kwargs={"lazy": "selectin"}
+        sa_relationship_kwargs={
+            "foreign_keys": "[Request.transaction_id]",
+            "lazy": "raise_on_sql"
+        }
     )
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    audio_hash: Optional[str] = Field(default=None, index=True, max_length=64)
+    model_version: Optional[str] = Field(default=None, max_length=64)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     
 
     def __str__(self) -> str:
@@ -14,13 +14,16 @@ class TransactionsBase(SQLModel):
         transaction_size (float): size of transaction
         actual_balance (float): user current balance
     """
-    transaction_size: float = Field(..., min = 0.01, max = 999.99)
-    actual_balance: float = Field(..., min = 0.00)
+    transaction_size: float = Field(..., ge = 0.01, le = 999.99)
+    actual_balance: float = Field(..., ge = 0.00)
 
 class Transaction(TransactionsBase, table=True):
     """
     Transaction model representing transactions in the system.
     
+    Unlike TransactionCreate, stored rows are signed: services.ledger
+    records charges with a negative transaction_size.
+    
     Attributes:
         id (Optional[int]): Primary key
         user_id (Optional[int]): Foreign key to User
@@ -30,17 +33,20 @@ class Transaction(TransactionsBase, table=True):
         created_at (datetime): Event creation timestamp
     """
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: Optional[int] = Field(default=None, foreign_key="user.id")
+    transaction_size: float = Field(..., ge = -999.99, le = 999.99)
+    user_id: Optional[int] = Field(default=None, foreign_key="user.id", index=True)
     user: Optional["User"] = Relationship(
         back_populates="transactions",
-        sa_relationship_kwargs={"lazy": "selectin"}
+        sa_relationship_kwargs={"lazy": "raise_on_sql"}
     )
     request_id: Optional[int] = Field(default=None, foreign_key="request.id")
     request: Optional["Request"] = Relationship(
-        back_populates="transactions",
-        sa_relationship_kwargs={"lazy": "selectin"}
+        sa_relationship_kwargs={
+            "foreign_keys": "[Transaction.request_id]",
+            "lazy": "raise_on_sql"
+        }
     )
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
 
     def get_actual_balance(self, transaction_size, balance) -> float:
         balance += transaction_size
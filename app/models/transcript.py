@@ -0,0 +1,81 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field, Column, LargeBinary, Text
+from sqlalchemy import Index, UniqueConstraint
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from typing import Optional
+from services.compression import compress_text, decompress_text
+
+MAX_TRANSCRIPT_LENGTH = 30000 # characters
+
+class RequestTranscript(SQLModel, table=True):
+    """
+    Compressed transcript of a request, kept out of the request table.
+    
+    Request rows stay narrow, so listing and billing queries never carry
+    the text; it is read only through services.crud.transcript.
+    
+    Attributes:
+        request_id (int): Primary key and foreign key to Request
+        codec (str): Compression codec of data, see services.compression
+        length (int): Transcript length (characters)
+        data (bytes): Compressed UTF-8 text
+        search_vector (Optional[str]): Full-text search document (PostgreSQL
+            tsvector with a GIN index, unused elsewhere), see services.search
+        created_at (datetime): Transcript creation timestamp
+    """
+    __tablename__ = "request_transcript"
+    __table_args__ = (
+        Index("ix_request_transcript_search_vector", "search_vector", postgresql_using="gin"),
+    )
+    
+    request_id: int = Field(foreign_key="request.id", primary_key=True, ondelete="CASCADE")
+    codec: str = Field(max_length=8)
+    length: int = Field(ge=0, le=MAX_TRANSCRIPT_LENGTH)
+    data: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    search_vector: Optional[str] = Field(
+        default=None,
+        sa_column=Column(TSVECTOR().with_variant(Text(), "sqlite"), nullable=True)
+    )
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    @classmethod
+    def pack(cls, request_id: int, text: str) -> "RequestTranscript":
+        """Build a row holding text compressed with the default codec"""
+        if len(text) > MAX_TRANSCRIPT_LENGTH:
+            raise ValueError(f"Transcript must be at most {MAX_TRANSCRIPT_LENGTH} characters long")
+        codec, data = compress_text(text)
+        return cls(request_id=request_id, codec=codec, length=len(text), data=data)
+    
+    @property
+    def text(self) -> str:
+        """Decompressed transcript"""
+        return decompress_text(self.codec, self.data)
+
+class TranscriptSegment(SQLModel, table=True):
+    """
+    Partial transcript of one segment, stored as soon as the segment is done.
+    
+    Lets clients read a long recording's text while it is still being
+    transcribed; the final RequestTranscript is written at the end.
+    
+    Attributes:
+        id (Optional[int]): Primary key
+        request_id (int): Foreign key to Request
+        index (int): Position of the segment in the recording
+        start_s (float): Segment start (s)
+        end_s (float): Segment end (s)
+        text (str): Words the segment adds to the transcript
+        created_at (datetime): Segment completion timestamp
+    """
+    __tablename__ = "transcript_segment"
+    __table_args__ = (
+        UniqueConstraint("request_id", "index", name="uq_transcript_segment_request_index"),
+    )
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    request_id: int = Field(foreign_key="request.id", index=True, ondelete="CASCADE")
+    index: int = Field(ge=0)
+    start_s: float = Field(ge=0)
+    end_s: float = Field(ge=0)
+    text: str = Field(max_length=MAX_TRANSCRIPT_LENGTH)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
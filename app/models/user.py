@@ -5,8 +5,8 @@ from passlib.hash import bcrypt
 import re
 
 if TYPE_CHECKING:
-    from models.requests import Request
-    from models.transactions import Transaction
+    from models.request import Request
+    from models.transaction import Transaction
 
 class User(SQLModel, table=True): 
     """
@@ -36,14 +36,14 @@ class User(SQLModel, table=True):
         back_populates="user",
         sa_relationship_kwargs={
             "cascade": "all, delete-orphan",
-            "lazy": "selectin"
+            "lazy": "raise_on_sql"
         }
     )
     requests: List["Request"] = Relationship(
         back_populates="user",
         sa_relationship_kwargs={
             "cascade": "all, delete-orphan",
-            "lazy": "selectin"
+            "lazy": "raise_on_sql"
         }
     )
 
@@ -92,12 +92,22 @@ class User(SQLModel, table=True):
     
     @property
     def requests_count(self) -> int:
-        """Number of requests associated with user"""
+        """
+        Number of requests associated with user.
+        
+        Needs User.requests to be loaded; for lists of users use
+        services.crud.user.get_users_with_counts, which counts in SQL.
+        """
         return len(self.requests)
     
     @property
     def transactions_count(self) -> int:
-        """Number of transactions associated with user"""
+        """
+        Number of transactions associated with user.
+        
+        Needs User.transactions to be loaded; for lists of users use
+        services.crud.user.get_users_with_counts, which counts in SQL.
+        """
         return len(self.transactions) 
 
     class Config:
@@ -110,3 +120,44 @@ class User(SQLModel, table=True):
         if is_admin == True:
             change = input(int('Введите сумму, на которую необходимо изменить баланс. Если Вы хотите уменьшить баланс, введите сумму со знаком "-"'))
             user_balance[id] += change
+
+class UserSummary(SQLModel):
+    """
+    User row with request and transaction counts computed in SQL.
+    
+    Attributes:
+        id (int): User ID
+        email (str): User's email address
+        created_at (datetime): Account creation timestamp
+        actual_balance (float): User's balance
+        is_admin (bool): user's administrator rights
+        requests_count (int): Number of user's requests
+        transactions_count (int): Number of user's transactions
+    """
+    id: int
+    email: str
+    created_at: datetime
+    actual_balance: float
+    is_admin: bool
+    requests_count: int = 0
+    transactions_count: int = 0
+
+
+class UserIdentity(SQLModel):
+    """
+    User's identity and balance, the part of User needed by auth and balance checks.
+    
+    Cached by services.cache.UserCache.
+    
+    Attributes:
+        id (int): User ID
+        email (str): User's email address
+        is_admin (bool): user's administrator rights
+        actual_balance (float): User's balance
+        created_at (datetime): Account creation timestamp
+    """
+    id: int
+    email: str
+    is_admin: bool
+    actual_balance: float
+    created_at: datetime
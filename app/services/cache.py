@@ -0,0 +1,306 @@
+from models.user import UserIdentity
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+import asyncio
+import threading
+import time
+
+class CacheBackend:
+    """Key-value store with per-entry expiry shared by UserCache instances"""
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+    
+    def set(self, key: str, value: str, ttl: float) -> None:
+        raise NotImplementedError
+    
+    def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+    
+    def close(self) -> None:
+        pass
+
+class TTLCache:
+    """
+    Thread-safe LRU with per-entry expiry, kept in process memory.
+    
+    Attributes:
+        max_entries (int): Entries kept before the least recently used are evicted
+        ttl (float): Default lifetime of an entry (s)
+    """
+    def __init__(self, max_entries: int = 10000, ttl: float = 30.0) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def delete(self, *keys: Hashable) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+class LocalCacheBackend(CacheBackend):
+    """In-process stand-in for a shared backend, for tests and single-process runs"""
+    def __init__(self, max_entries: int = 100000) -> None:
+        self._cache = TTLCache(max_entries)
+    
+    def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+    
+    def set(self, key: str, value: str, ttl: float) -> None:
+        self._cache.set(key, value, ttl)
+    
+    def delete(self, *keys: str) -> None:
+        self._cache.delete(*keys)
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache shared by all processes and hosts, stored in Redis.
+    
+    Attributes:
+        url (str): Redis URL, e.g. redis://redis:6379/0
+    """
+    def __init__(self, url: str) -> None:
+        import redis
+        self.url = url
+        self._client = redis.Redis.from_url(url)
+    
+    def get(self, key: str) -> Optional[str]:
+        value = self._client.get(key)
+        return None if value is None else value.decode("utf-8")
+    
+    def set(self, key: str, value: str, ttl: float) -> None:
+        self._client.set(key, value, px=max(1, int(ttl * 1000)))
+    
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self._client.delete(*keys)
+    
+    def close(self) -> None:
+        self._client.close()
+
+def connect_cache_backend(url: Optional[str]) -> CacheBackend:
+    """
+    Create the shared cache backend for a URL.
+    
+    Args:
+        url: redis:// URL; None or local:// gives an in-process LocalCacheBackend
+    
+    Returns:
+        CacheBackend: Backend
+    """
+    if url is None or url.startswith("local://"):
+        return LocalCacheBackend()
+    return RedisCacheBackend(url)
+
+class UserCache:
+    """
+    Read-through cache of user identity and balance, by id and by email.
+    
+    A small in-process TTL LRU sits in front of an optional shared backend.
+    Writes that change a user (creation, deletion, ledger operations)
+    invalidate both; other processes' in-process entries expire after
+    local_ttl, which bounds how stale a balance can get there.
+    
+    Attributes:
+        local (TTLCache): In-process entries
+        shared (Optional[CacheBackend]): Backend shared between processes
+        ttl (float): Lifetime of shared entries (s)
+        hits (int): Lookups answered by the in-process cache
+        shared_hits (int): Lookups answered by the shared backend
+        misses (int): Lookups that went to the database
+        invalidations (int): Invalidated users
+    """
+    def __init__(
+        self,
+        shared: Optional[CacheBackend] = None,
+        max_entries: int = 10000,
+        local_ttl: float = 5.0,
+        ttl: float = 60.0
+    ) -> None:
+        self.local = TTLCache(max_entries, local_ttl)
+        self.shared = shared
+        self.ttl = ttl
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _id_key(user_id: int) -> str:
+        return f"user:id:{user_id}"
+    
+    @staticmethod
+    def _email_key(email: str) -> str:
+        return f"user:email:{email.lower()}"
+    
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+    
+    def _local_user(self, key: str) -> Optional[UserIdentity]:
+        user = self.local.get(key)
+        if user is not None:
+            self._count("hits")
+        return user
+    
+    def _shared_user(self, key: str, value: Optional[str]) -> Optional[UserIdentity]:
+        if value is None:
+            return None
+        user = UserIdentity.model_validate_json(value)
+        self.local.set(key, user)
+        self._count("shared_hits")
+        return user
+    
+    def _checked_email(self, user: Optional[UserIdentity], email: str) -> Optional[UserIdentity]:
+        if user is not None and user.email.lower() != email.lower():
+            return None  # the email now belongs to someone else
+        return user
+    
+    def _shared_entries(self, user: UserIdentity) -> None:
+        self.shared.set(self._id_key(user.id), user.model_dump_json(), self.ttl)
+        self.shared.set(self._email_key(user.email), str(user.id), self.ttl)
+    
+    def _invalidate_local(self, user_id: int, email: Optional[str]) -> List[str]:
+        """Drop a user's in-process entries and return the keys to drop from the shared backend"""
+        keys = [self._id_key(user_id)]
+        if email is not None:
+            keys.append(self._email_key(email))
+        self.local.delete(*keys)
+        self._count("invalidations")
+        return keys
+    
+    def get(self, user_id: int) -> Optional[UserIdentity]:
+        """Cached user or None on a miss"""
+        key = self._id_key(user_id)
+        user = self._local_user(key)
+        if user is None and self.shared is not None:
+            user = self._shared_user(key, self.shared.get(key))
+        if user is None:
+            self._count("misses")
+        return user
+    
+    async def get_async(self, user_id: int) -> Optional[UserIdentity]:
+        """get for coroutines: the shared backend is queried in a thread"""
+        key = self._id_key(user_id)
+        user = self._local_user(key)
+        if user is None and self.shared is not None:
+            user = self._shared_user(key, await asyncio.to_thread(self.shared.get, key))
+        if user is None:
+            self._count("misses")
+        return user
+    
+    def get_by_email(self, email: str) -> Optional[UserIdentity]:
+        """Cached user or None on a miss; emails map to ids, so both lookups share entries"""
+        key = self._email_key(email)
+        user_id = self.local.get(key)
+        if user_id is None and self.shared is not None:
+            value = self.shared.get(key)
+            user_id = None if value is None else int(value)
+        if user_id is None:
+            self._count("misses")
+            return None
+        return self._checked_email(self.get(user_id), email)
+    
+    async def get_by_email_async(self, email: str) -> Optional[UserIdentity]:
+        """get_by_email for coroutines: the shared backend is queried in a thread"""
+        key = self._email_key(email)
+        user_id = self.local.get(key)
+        if user_id is None and self.shared is not None:
+            value = await asyncio.to_thread(self.shared.get, key)
+            user_id = None if value is None else int(value)
+        if user_id is None:
+            self._count("misses")
+            return None
+        return self._checked_email(await self.get_async(user_id), email)
+    
+    def put(self, user: UserIdentity) -> None:
+        """Store a user read from the database"""
+        self.local.set(self._id_key(user.id), user)
+        self.local.set(self._email_key(user.email), user.id)
+        if self.shared is not None:
+            self._shared_entries(user)
+    
+    async def put_async(self, user: UserIdentity) -> None:
+        """put for coroutines: the shared backend is written in a thread"""
+        self.local.set(self._id_key(user.id), user)
+        self.local.set(self._email_key(user.email), user.id)
+        if self.shared is not None:
+            await asyncio.to_thread(self._shared_entries, user)
+    
+    def invalidate(self, user_id: int, email: Optional[str] = None) -> None:
+        """Forget a user after a write; the email entry self-heals if omitted"""
+        keys = self._invalidate_local(user_id, email)
+        if self.shared is not None:
+            self.shared.delete(*keys)
+    
+    async def invalidate_async(self, user_id: int, email: Optional[str] = None) -> None:
+        """invalidate for coroutines: the shared backend is written in a thread"""
+        keys = self._invalidate_local(user_id, email)
+        if self.shared is not None:
+            await asyncio.to_thread(self.shared.delete, *keys)
+    
+    def clear(self) -> None:
+        """Drop the in-process entries"""
+        self.local.clear()
+    
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and the overall hit ratio"""
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+                "local_entries": len(self.local)
+            }
+
+user_cache = UserCache()
+
+def configure_user_cache(url: Optional[str], ttl: Optional[float] = None) -> UserCache:
+    """
+    Attach the module-level user_cache to a shared backend.
+    
+    Args:
+        url: Backend URL, see connect_cache_backend
+        ttl: Lifetime of shared entries (s); None keeps the current one
+    
+    Returns:
+        UserCache: The configured user_cache
+    """
+    if user_cache.shared is not None:
+        user_cache.shared.close()
+    user_cache.shared = connect_cache_backend(url)
+    if ttl is not None:
+        user_cache.ttl = ttl
+    user_cache.clear()
+    return user_cache
@@ -0,0 +1,68 @@
+from typing import Optional, Tuple
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional dependency, gzip is always available
+    zstandard = None
+
+CODEC_NONE = "none"
+CODEC_GZIP = "gzip"
+CODEC_ZSTD = "zstd"
+DEFAULT_CODEC = CODEC_ZSTD if zstandard is not None else CODEC_GZIP
+MIN_COMPRESS_SIZE = 128  # bytes, shorter texts are stored as is
+
+def compress_text(text: str, codec: Optional[str] = None, level: int = 6) -> Tuple[str, bytes]:
+    """
+    Encode text as UTF-8 and compress it.
+    
+    Short texts, or texts that do not get smaller, are stored uncompressed.
+    
+    Args:
+        text: Text to compress
+        codec: CODEC_ZSTD or CODEC_GZIP; None picks zstd when installed
+        level: Compression level
+    
+    Returns:
+        Tuple[str, bytes]: Codec actually used and the payload
+    """
+    raw = text.encode("utf-8")
+    if len(raw) < MIN_COMPRESS_SIZE:
+        return CODEC_NONE, raw
+    codec = codec or DEFAULT_CODEC
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("zstd codec requires the zstandard package")
+        data = zstandard.ZstdCompressor(level=level).compress(raw)
+    elif codec == CODEC_GZIP:
+        # zlib stream with a gzip header, same as gzip.compress but without mtime
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        data = compressor.compress(raw) + compressor.flush()
+    else:
+        raise ValueError(f"Unknown codec: {codec}")
+    if len(data) >= len(raw):
+        return CODEC_NONE, raw
+    return codec, data
+
+def decompress_text(codec: str, data: bytes) -> str:
+    """
+    Restore text stored by compress_text.
+    
+    Args:
+        codec: Codec returned by compress_text
+        data: Payload returned by compress_text
+    
+    Returns:
+        str: Original text
+    """
+    if codec == CODEC_NONE:
+        raw = data
+    elif codec == CODEC_GZIP:
+        raw = zlib.decompress(data, 16 + zlib.MAX_WBITS)
+    elif codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("zstd codec requires the zstandard package")
+        raw = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        raise ValueError(f"Unknown codec: {codec}")
+    return bytes(raw).decode("utf-8")
@@ -0,0 +1,186 @@
+from sqlmodel import SQLModel, Session
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import InstrumentedAttribute
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Type
+from database.metrics import instrumented
+
+def iter_chunks(items: Iterable[SQLModel], chunk_size: int) -> Iterator[List[SQLModel]]:
+    """
+    Split an iterable of models into lists of at most chunk_size items.
+    
+    Args:
+        items: Models to split
+        chunk_size: Maximum chunk length
+    
+    Yields:
+        List[SQLModel]: Next chunk of models
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def insert_columns(model: Type[SQLModel]) -> List[str]:
+    """Names of the table columns filled by bulk inserts (everything except the primary key)"""
+    return [column.name for column in model.__table__.columns if not column.primary_key]
+
+def row_values(item: SQLModel, columns: List[str]) -> Dict[str, object]:
+    """Column values of a single model; relationships are not included"""
+    return {column: getattr(item, column) for column in columns}
+
+def _copy_chunk(model: Type[SQLModel], chunk: List[SQLModel], columns: List[str], session: Session) -> None:
+    """Stream a chunk into the table with psycopg COPY FROM STDIN"""
+    table = model.__table__
+    column_list = ", ".join(f'"{column}"' for column in columns)
+    raw_connection = session.connection().connection.driver_connection
+    with raw_connection.cursor() as cursor:
+        with cursor.copy(f'COPY "{table.name}" ({column_list}) FROM STDIN') as copy:
+            for item in chunk:
+                copy.write_row([getattr(item, column) for column in columns])
+
+@instrumented
+def bulk_insert(
+    model: Type[SQLModel],
+    items: Iterable[SQLModel],
+    session: Session,
+    chunk_size: int = 1000,
+    copy_threshold: Optional[int] = None
+) -> int:
+    """
+    Insert many rows of one model, committing once per chunk.
+    
+    Chunks are written with a single multi-row INSERT ... RETURNING id and
+    the generated ids are assigned back to the passed models. Chunks with at
+    least copy_threshold rows go through psycopg COPY instead, which is the
+    fastest path but does not return ids. Relationship collections of the
+    models are ignored: only the model's own columns are written.
+    
+    Args:
+        model: Table model class
+        items: Models to insert
+        session: Database session
+        chunk_size: Number of rows per INSERT/COPY and per commit
+        copy_threshold: Minimal chunk length to use COPY; None disables COPY
+    
+    Returns:
+        int: Number of inserted rows
+    
+    Raises:
+        Exception: Any database-related exception; chunks committed before
+            the failure stay in the database
+    """
+    table = model.__table__
+    columns = insert_columns(model)
+    statement = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+    count = 0
+    try:
+        for chunk in iter_chunks(items, chunk_size):
+            if copy_threshold is not None and len(chunk) >= copy_threshold:
+                _copy_chunk(model, chunk, columns, session)
+            else:
+                result = session.execute(statement, [row_values(item, columns) for item in chunk])
+                for item, item_id in zip(chunk, result.scalars()):
+                    item.id = item_id
+            session.commit()
+            count += len(chunk)
+        return count
+    except Exception as e:
+        session.rollback()
+        raise
+
+@instrumented
+def nullify_references(
+    referenced_by: Sequence[InstrumentedAttribute],
+    ids,
+    session: Session
+) -> None:
+    """
+    Set foreign keys pointing at soon-to-be-deleted rows to NULL.
+    
+    Mirrors what the ORM does for children of a deleted parent without
+    delete cascade, but as one UPDATE per referencing column.
+    
+    Args:
+        referenced_by: Foreign key attributes referencing the deleted rows
+        ids: List of ids or a SELECT of ids of the deleted rows
+        session: Database session
+    """
+    for column in referenced_by:
+        statement = update(column.class_).where(column.in_(ids)).values({column.key: None})
+        session.execute(statement.execution_options(synchronize_session=False))
+
+@instrumented
+def delete_references(
+    dependents: Sequence[InstrumentedAttribute],
+    ids,
+    session: Session
+) -> None:
+    """
+    Delete rows whose foreign keys point at soon-to-be-deleted rows.
+    
+    Mirrors what the ORM does for children of a deleted parent with
+    delete cascade, but as one DELETE per referencing column.
+    
+    Args:
+        dependents: Foreign key attributes of rows deleted together with the referenced ones
+        ids: List of ids or a SELECT of ids of the deleted rows
+        session: Database session
+    """
+    for column in dependents:
+        statement = delete(column.class_).where(column.in_(ids))
+        session.execute(statement.execution_options(synchronize_session=False))
+
+@instrumented
+def bulk_delete(
+    model: Type[SQLModel],
+    session: Session,
+    *whereclause,
+    referenced_by: Sequence[InstrumentedAttribute] = (),
+    dependents: Sequence[InstrumentedAttribute] = (),
+    batch_size: Optional[int] = None
+) -> int:
+    """
+    Delete rows matching whereclause without loading them into the session.
+    
+    Without batch_size everything runs as single UPDATE/DELETE statements
+    and the caller owns the commit. With batch_size rows are deleted in
+    id-ordered batches, each committed separately, so locks and WAL are
+    released while a large table is being cleared.
+    
+    Args:
+        model: Table model class
+        session: Database session
+        whereclause: Filter of rows to delete; none deletes every row
+        referenced_by: Foreign key attributes to set NULL before deleting
+        dependents: Foreign key attributes whose rows are deleted along with the matched rows
+        batch_size: Rows per committed batch; None deletes in one statement
+    
+    Returns:
+        int: Number of deleted rows
+    """
+    if batch_size is None:
+        nullify_references(referenced_by, select(model.id).where(*whereclause), session)
+        delete_references(dependents, select(model.id).where(*whereclause), session)
+        statement = delete(model).where(*whereclause)
+        result = session.execute(statement.execution_options(synchronize_session=False))
+        return result.rowcount
+    
+    if batch_size < 1:
+        raise ValueError("batch_size must be positive")
+    count = 0
+    while True:
+        statement = select(model.id).where(*whereclause).order_by(model.id).limit(batch_size)
+        ids = session.execute(statement).scalars().all()
+        if not ids:
+            return count
+        nullify_references(referenced_by, ids, session)
+        delete_references(dependents, ids, session)
+        statement = delete(model).where(model.id.in_(ids))
+        result = session.execute(statement.execution_options(synchronize_session=False))
+        session.commit()
+        count += result.rowcount
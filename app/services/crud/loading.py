@@ -0,0 +1,59 @@
+from models.user import User
+from models.request import Request
+from models.transaction import Transaction
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+from enum import Enum
+from typing import List
+
+class LoadingProfile(str, Enum):
+    """
+    Which relationships a CRUD read loads together with the rows.
+    
+    Relationships are declared with lazy="raise_on_sql", so anything that is
+    not loaded by the chosen profile raises on access instead of silently
+    issuing one more query per row (N+1).
+    
+    Attributes:
+        SUMMARY: Only the row's own columns
+        WITH_HISTORY: Users with their requests and transactions;
+            requests and transactions with their user
+        FULL: WITH_HISTORY plus the request <-> transaction links
+    """
+    SUMMARY = "summary"
+    WITH_HISTORY = "with_history"
+    FULL = "full"
+
+def user_options(profile: LoadingProfile) -> List:
+    """Loader options for select(User) under the given profile"""
+    profile = LoadingProfile(profile)
+    if profile == LoadingProfile.SUMMARY:
+        return [raiseload("*")]
+    if profile == LoadingProfile.WITH_HISTORY:
+        return [
+            selectinload(User.requests),
+            selectinload(User.transactions),
+            raiseload("*")
+        ]
+    return [
+        selectinload(User.requests).joinedload(Request.transaction),
+        selectinload(User.transactions).joinedload(Transaction.request),
+        raiseload("*")
+    ]
+
+def request_options(profile: LoadingProfile) -> List:
+    """Loader options for select(Request) under the given profile"""
+    profile = LoadingProfile(profile)
+    if profile == LoadingProfile.SUMMARY:
+        return [raiseload("*")]
+    if profile == LoadingProfile.WITH_HISTORY:
+        return [joinedload(Request.user), raiseload("*")]
+    return [joinedload(Request.user), joinedload(Request.transaction), raiseload("*")]
+
+def transaction_options(profile: LoadingProfile) -> List:
+    """Loader options for select(Transaction) under the given profile"""
+    profile = LoadingProfile(profile)
+    if profile == LoadingProfile.SUMMARY:
+        return [raiseload("*")]
+    if profile == LoadingProfile.WITH_HISTORY:
+        return [joinedload(Transaction.user), raiseload("*")]
+    return [joinedload(Transaction.user), joinedload(Transaction.request), raiseload("*")]
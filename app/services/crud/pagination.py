@@ -0,0 +1,71 @@
+from sqlmodel import SQLModel, select
+from sqlalchemy.orm import raiseload
+from datetime import datetime
+from typing import List, Optional, Type
+
+MAX_PAGE_SIZE = 1000
+
+def window_filters(
+    model: Type[SQLModel],
+    after_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None
+) -> List:
+    """
+    Build keyset and created_at window conditions for a model.
+    
+    Args:
+        model: Table model class with id and created_at columns
+        after_id: Only rows with id greater than this one
+        created_from: Only rows created at or after this moment
+        created_to: Only rows created before this moment
+    
+    Returns:
+        List: SQL conditions to pass to where()
+    """
+    filters = []
+    if after_id is not None:
+        filters.append(model.id > after_id)
+    if created_from is not None:
+        filters.append(model.created_at >= created_from)
+    if created_to is not None:
+        filters.append(model.created_at < created_to)
+    return filters
+
+def page_statement(model: Type[SQLModel], limit: int, *whereclause):
+    """
+    SELECT of one keyset page ordered by id.
+    
+    Args:
+        model: Table model class
+        limit: Page size, from 1 to MAX_PAGE_SIZE
+        whereclause: Filters, usually from window_filters
+    
+    Raises:
+        ValueError: If limit is out of range
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return select(model).where(*whereclause).order_by(model.id).limit(limit)
+
+def stream_statement(model: Type[SQLModel], batch_size: int, *whereclause):
+    """
+    SELECT for streaming a table through a server-side cursor.
+    
+    Rows come back in batches of batch_size, relationships are not loaded
+    (accessing them raises), so memory stays bounded by one batch.
+    
+    Args:
+        model: Table model class
+        batch_size: Rows fetched per round-trip
+        whereclause: Filters, usually from window_filters
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be positive")
+    return (
+        select(model)
+        .where(*whereclause)
+        .order_by(model.id)
+        .options(raiseload("*"))
+        .execution_options(yield_per=batch_size)
+    )
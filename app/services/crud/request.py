@@ -1,87 +1,288 @@
 from models.request import Request
-from sqlmodel import Session, select
-from typing import List, Optional
+from models.transaction import Transaction
+from models.hold import CreditHold
+from sqlmodel import Session, select, update
+from typing import Iterable, Iterator, List, Optional
 from datetime import datetime
+from services.crud.loading import LoadingProfile, request_options
+from services.crud.pagination import window_filters, page_statement, stream_statement
+from services.crud.bulk import bulk_insert, bulk_delete
+from services.jobs.broker import Broker, TranscriptionJob
+from services.storage import TranscriptCache, transcript_cache
+from models.transcript import RequestTranscript, TranscriptSegment
+from services.crud.transcript import find_transcript_by_audio, write_transcript
+from services.search import discard_documents
+from database.metrics import instrumented
 
-def get_all_requests(session: Session) -> List[Request]:
+@instrumented
+def get_all_requests(session: Session, profile: LoadingProfile = LoadingProfile.SUMMARY) -> List[Request]:
     """
     Retrieve all requests.
     
     Args:
         session: Database session
+        profile: Relationships to load with the requests, see LoadingProfile
     
     Returns:
         List[Request]: List of all requests
     """
     try:
-        statement = select(Request)
+        statement = select(Request).options(*request_options(profile))
         requests = session.exec(statement).all()
         return requests
     except Exception as e:
         raise
 
-def get_request_by_id(request_id: int, session: Session) -> Optional[Request]:
+@instrumented
+def iter_requests(
+    session: Session,
+    batch_size: int = 1000,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    user_id: Optional[int] = None
+) -> Iterator[Request]:
+    """
+    Iterate over requests ordered by id through a server-side cursor.
+    
+    Relationships are not loaded; memory is bounded by one batch.
+    
+    Args:
+        session: Database session
+        batch_size: Rows fetched per round-trip
+        created_from: Only requests created at or after this moment
+        created_to: Only requests created before this moment
+        user_id: Only requests of this user
+    
+    Yields:
+        Request: Next request
+    """
+    filters = window_filters(Request, None, created_from, created_to)
+    if user_id is not None:
+        filters.append(Request.user_id == user_id)
+    statement = stream_statement(Request, batch_size, *filters)
+    yield from session.exec(statement)
+
+@instrumented
+def get_requests_page(
+    session: Session,
+    after_id: Optional[int] = None,
+    limit: int = 100,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    profile: LoadingProfile = LoadingProfile.SUMMARY
+) -> List[Request]:
+    """
+    Get one keyset-paginated page of requests ordered by id.
+    
+    Pass the id of the last request of a page as after_id to get the next one.
+    
+    Args:
+        session: Database session
+        after_id: Id of the last request of the previous page
+        limit: Page size
+        created_from: Only requests created at or after this moment
+        created_to: Only requests created before this moment
+        user_id: Only requests of this user
+        profile: Relationships to load with the requests, see LoadingProfile
+    
+    Returns:
+        List[Request]: Up to limit requests
+    """
+    try:
+        filters = window_filters(Request, after_id, created_from, created_to)
+        if user_id is not None:
+            filters.append(Request.user_id == user_id)
+        statement = page_statement(Request, limit, *filters).options(*request_options(profile))
+        requests = session.exec(statement).all()
+        return requests
+    except Exception as e:
+        raise
+
+@instrumented
+def get_request_by_id(request_id: int, session: Session, profile: LoadingProfile = LoadingProfile.SUMMARY) -> Optional[Request]:
     """
     Get request by ID.
     
     Args:
         request_id: Request ID to find
         session: Database session
+        profile: Relationships to load with the request, see LoadingProfile
     
     Returns:
         Optional[Request]: Found request or None
     """
     try:
-        statement = select(Request).where(Request.id == request_id)
+        statement = select(Request).where(Request.id == request_id).options(*request_options(profile))
         request = session.exec(statement).first()
         return request
     except Exception as e:
         raise
 
-def create_request(request: Request, session: Session) -> Request:
+@instrumented
+def find_cached_transcript(
+    audio_hash: str,
+    model_version: str,
+    session: Session,
+    cache: Optional[TranscriptCache] = transcript_cache
+) -> Optional[str]:
+    """
+    Find a transcript of the same audio made by the same model version.
+    
+    Looks into the in-memory cache first, then into earlier requests.
+    
+    Args:
+        audio_hash: Content hash of the audio
+        model_version: Model version
+        session: Database session
+        cache: In-memory transcript cache; None skips it
+    
+    Returns:
+        Optional[str]: Transcript or None if the audio was not transcribed yet
+    """
+    try:
+        if cache is not None:
+            transcript = cache.get(audio_hash, model_version)
+            if transcript is not None:
+                return transcript
+        transcript = find_transcript_by_audio(audio_hash, model_version, session)
+        if transcript is not None and cache is not None:
+            cache.put(audio_hash, model_version, transcript)
+        return transcript
+    except Exception as e:
+        raise
+
+@instrumented
+def create_request(
+    request: Request,
+    session: Session,
+    broker: Optional[Broker] = None,
+    model_version: Optional[str] = None
+) -> Request:
     """
     Create new request.
     
     Args:
         request: Request to create
         session: Database session
+        broker: If given, a transcription job is published after commit
+        model_version: Current model version; if the same audio (by
+            request.audio_hash) was transcribed by it, the transcript is
+            reused and no job is published
     
     Returns:
         Request: Created request with ID
     """
     try:
+        transcript = None
+        if request.audio_hash and model_version:
+            transcript = find_cached_transcript(request.audio_hash, model_version, session)
+            if transcript is not None:
+                request.model_version = model_version
+                broker = None
         session.add(request)
+        if transcript is not None:
+            session.flush()
+            write_transcript(request.id, transcript, session)
         session.commit()
         session.refresh(request)
+        if broker is not None:
+            broker.publish(TranscriptionJob.from_request(request))
         return request
     except Exception as e:
         session.rollback()
         raise
+
+@instrumented
+def create_requests_bulk(
+    requests: Iterable[Request],
+    session: Session,
+    chunk_size: int = 1000,
+    copy_threshold: Optional[int] = None
+) -> int:
+    """
+    Create many requests with multi-row inserts, committing once per chunk.
     
-def delete_all_requests(session: Session) -> int:
+    Args:
+        requests: Requests to create
+        session: Database session
+        chunk_size: Number of rows per insert and per commit
+        copy_threshold: Minimal chunk length to load with COPY; None disables COPY
+    
+    Returns:
+        int: Number of created requests
     """
-    Delete all requests.
+    return bulk_insert(Request, requests, session, chunk_size, copy_threshold)
+
+@instrumented
+def set_request_result(
+    request_id: int,
+    transcript: str,
+    cost: float,
+    session: Session,
+    model_version: Optional[str] = None
+) -> bool:
+    """
+    Store transcription result without loading the request.
+    
+    Cost and model version are set with one UPDATE, the transcript is
+    written compressed to RequestTranscript in the same transaction.
     
     Args:
+        request_id: Transcribed request
+        transcript: Transcription text
+        cost: Request cost
         session: Database session
+        model_version: Version of the model that produced the transcript
+    
+    Returns:
+        bool: True if updated, False if not found
+    """
+    try:
+        statement = update(Request).where(Request.id == request_id).values(
+            cost=cost, model_version=model_version
+        )
+        result = session.execute(statement.execution_options(synchronize_session=False))
+        if result.rowcount == 0:
+            session.rollback()
+            return False
+        write_transcript(request_id, transcript, session)
+        session.commit()
+        return True
+    except Exception as e:
+        session.rollback()
+        raise
+    
+@instrumented
+def delete_all_requests(session: Session, batch_size: Optional[int] = None) -> int:
+    """
+    Delete all requests with set-based statements.
+    
+    Transactions and credit holds referencing deleted requests are kept with request_id set to NULL,
+    transcripts and partial transcripts are deleted with them.
+    
+    Args:
+        session: Database session
+        batch_size: Rows per committed batch; None deletes in one statement
     
     Returns:
         int: Number of deleted requests
     """
     try:
-        statement = select(Request)
-        requests = session.exec(statement).all()
-        count = len(requests)
-        
-        for request in requests:
-            session.delete(request)
-        
+        discard_documents(None, session)
+        count = bulk_delete(
+            Request, session,
+            referenced_by=[Transaction.request_id, CreditHold.request_id],
+            dependents=[RequestTranscript.request_id, TranscriptSegment.request_id],
+            batch_size=batch_size
+        )
         session.commit()
         return count
     except Exception as e:
         session.rollback()
         raise
     
+@instrumented
 def delete_request(request_id: int, session: Session) -> bool:
     """
     Delete request by ID.
@@ -94,14 +295,14 @@ def delete_request(request_id: int, session: Session) -> bool:
         bool: True if deleted, False if not found
     """
     try:
-        request = get_request_by_id(request_id, session)
-        if not request:
-            return False
-            
-        session.delete(request)
+        discard_documents([request_id], session)
+        count = bulk_delete(
+            Request, session, Request.id == request_id,
+            referenced_by=[Transaction.request_id, CreditHold.request_id],
+            dependents=[RequestTranscript.request_id, TranscriptSegment.request_id]
+        )
         session.commit()
-        return True
+        return count > 0
     except Exception as e:
         session.rollback()
         raise
-
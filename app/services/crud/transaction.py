@@ -1,43 +1,119 @@
 from models.transaction import Transaction
+from models.request import Request
 from sqlmodel import Session, select
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional
 from datetime import datetime
+from services.crud.loading import LoadingProfile, transaction_options
+from services.crud.pagination import window_filters, page_statement, stream_statement
+from services.crud.bulk import bulk_insert, bulk_delete
+from database.metrics import instrumented
 
-def get_all_transactions(session: Session) -> List[Transaction]:
+@instrumented
+def get_all_transactions(session: Session, profile: LoadingProfile = LoadingProfile.SUMMARY) -> List[Transaction]:
     """
     Retrieve all transactions.
     
     Args:
         session: Database session
+        profile: Relationships to load with the transactions, see LoadingProfile
     
     Returns:
         List[Transaction]: List of all transactions
     """
     try:
-        statement = select(Transaction)
+        statement = select(Transaction).options(*transaction_options(profile))
         transactions = session.exec(statement).all()
         return transactions
     except Exception as e:
         raise
 
-def get_transaction_by_id(transaction_id: int, session: Session) -> Optional[Transaction]:
+@instrumented
+def iter_transactions(
+    session: Session,
+    batch_size: int = 1000,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    user_id: Optional[int] = None
+) -> Iterator[Transaction]:
+    """
+    Iterate over transactions ordered by id through a server-side cursor.
+    
+    Relationships are not loaded; memory is bounded by one batch.
+    
+    Args:
+        session: Database session
+        batch_size: Rows fetched per round-trip
+        created_from: Only transactions created at or after this moment
+        created_to: Only transactions created before this moment
+        user_id: Only transactions of this user
+    
+    Yields:
+        Transaction: Next transaction
+    """
+    filters = window_filters(Transaction, None, created_from, created_to)
+    if user_id is not None:
+        filters.append(Transaction.user_id == user_id)
+    statement = stream_statement(Transaction, batch_size, *filters)
+    yield from session.exec(statement)
+
+@instrumented
+def get_transactions_page(
+    session: Session,
+    after_id: Optional[int] = None,
+    limit: int = 100,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    profile: LoadingProfile = LoadingProfile.SUMMARY
+) -> List[Transaction]:
+    """
+    Get one keyset-paginated page of transactions ordered by id.
+    
+    Pass the id of the last transaction of a page as after_id to get the next one.
+    
+    Args:
+        session: Database session
+        after_id: Id of the last transaction of the previous page
+        limit: Page size
+        created_from: Only transactions created at or after this moment
+        created_to: Only transactions created before this moment
+        user_id: Only transactions of this user
+        profile: Relationships to load with the transactions, see LoadingProfile
+    
+    Returns:
+        List[Transaction]: Up to limit transactions
+    """
+    try:
+        filters = window_filters(Transaction, after_id, created_from, created_to)
+        if user_id is not None:
+            filters.append(Transaction.user_id == user_id)
+        statement = page_statement(Transaction, limit, *filters).options(*transaction_options(profile))
+        transactions = session.exec(statement).all()
+        return transactions
+    except Exception as e:
+        raise
+
+@instrumented
+def get_transaction_by_id(transaction_id: int, session: Session, profile: LoadingProfile = LoadingProfile.SUMMARY) -> Optional[Transaction]:
     """
     Get transaction by ID.
     
     Args:
         transaction_id: Transactions ID to find
         session: Database session
+        profile: Relationships to load with the transaction, see LoadingProfile
     
     Returns:
         Optional[Transaction]: Found transaction or None
     """
     try:
-        statement = select(Transaction).where(Transaction.id == transaction_id)
+        statement = select(Transaction).where(Transaction.id == transaction_id).options(*transaction_options(profile))
         transaction = session.exec(statement).first()
         return transaction
     except Exception as e:
         raise
 
+@instrumented
 def create_transaction(transaction: Transaction, session: Session) -> Transaction:
     """
     Create new transaction.
@@ -57,31 +133,55 @@ def create_transaction(transaction: Transaction, session: Session) -> Transactio
     except Exception as e:
         session.rollback()
         raise
+
+@instrumented
+def create_transactions_bulk(
+    transactions: Iterable[Transaction],
+    session: Session,
+    chunk_size: int = 1000,
+    copy_threshold: Optional[int] = None
+) -> int:
+    """
+    Create many transactions with multi-row inserts, committing once per chunk.
+    
+    Args:
+        transactions: Transactions to create
+        session: Database session
+        chunk_size: Number of rows per insert and per commit
+        copy_threshold: Minimal chunk length to load with COPY; None disables COPY
     
-def delete_all_transactions(session: Session) -> int:
+    Returns:
+        int: Number of created transactions
+    """
+    return bulk_insert(Transaction, transactions, session, chunk_size, copy_threshold)
+
+@instrumented
+def delete_all_transactions(session: Session, batch_size: Optional[int] = None) -> int:
     """
-    Delete all transactions.
+    Delete all transactions with set-based statements.
+    
+    Requests referencing deleted transactions are kept with transaction_id set to NULL.
     
     Args:
         session: Database session
+        batch_size: Rows per committed batch; None deletes in one statement
     
     Returns:
         int: Number of deleted transactions
     """
     try:
-        statement = select(Transaction)
-        transactions = session.exec(statement).all()
-        count = len(transactions)
-        
-        for transaction in transactions:
-            session.delete(transaction)
-        
+        count = bulk_delete(
+            Transaction, session,
+            referenced_by=[Request.transaction_id],
+            batch_size=batch_size
+        )
         session.commit()
         return count
     except Exception as e:
         session.rollback()
         raise
     
+@instrumented
 def delete_transaction(transaction_id: int, session: Session) -> bool:
     """
     Delete transaction by ID.
@@ -94,14 +194,12 @@ def delete_transaction(transaction_id: int, session: Session) -> bool:
         bool: True if deleted, False if not found
     """
     try:
-        transaction = get_transaction_by_id(transaction_id, session)
-        if not transaction:
-            return False
-            
-        session.delete(transaction)
+        count = bulk_delete(
+            Transaction, session, Transaction.id == transaction_id,
+            referenced_by=[Request.transaction_id]
+        )
         session.commit()
-        return True
+        return count > 0
     except Exception as e:
         session.rollback()
         raise
-
@@ -0,0 +1,272 @@
+from models.request import Request
+from models.transcript import RequestTranscript, TranscriptSegment
+from services.compression import decompress_text
+from sqlmodel import Session, select, delete, update
+from sqlalchemy import insert
+from typing import Dict, Iterable, List, Optional
+from services.search import (
+    SearchHit, check_page, local_hits, owners_statement,
+    prepare_document, search_statement, transcript_index, uses_postgres
+)
+from database.metrics import instrumented
+
+@instrumented
+def write_transcript(request_id: int, transcript: str, session: Session) -> None:
+    """
+    Replace the stored transcript of a request without committing.
+    
+    Used inside bigger transactions, e.g. together with the request's
+    cost update; the caller owns the commit. The full-text search index is
+    updated by the same INSERT, or without PostgreSQL on commit, see
+    services.search.
+    
+    Args:
+        request_id: Transcribed request
+        transcript: Transcription text
+        session: Database session
+    """
+    row = RequestTranscript.pack(request_id, transcript)
+    search_vector = prepare_document(request_id, transcript, session)
+    session.execute(
+        delete(RequestTranscript)
+        .where(RequestTranscript.request_id == request_id)
+        .execution_options(synchronize_session=False)
+    )
+    session.execute(insert(RequestTranscript).values(
+        request_id=row.request_id, codec=row.codec, length=row.length,
+        data=row.data, search_vector=search_vector, created_at=row.created_at
+    ))
+
+@instrumented
+def save_transcript(request_id: int, transcript: str, session: Session) -> None:
+    """
+    Store the transcript of a request compressed, replacing an earlier one.
+    
+    Args:
+        request_id: Transcribed request
+        transcript: Transcription text
+        session: Database session
+    """
+    try:
+        write_transcript(request_id, transcript, session)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise
+
+@instrumented
+def get_transcript(request_id: int, session: Session) -> Optional[str]:
+    """
+    Load and decompress the transcript of a request.
+    
+    Args:
+        request_id: Request ID
+        session: Database session
+    
+    Returns:
+        Optional[str]: Transcript or None if the request is not transcribed
+    """
+    try:
+        statement = select(RequestTranscript.codec, RequestTranscript.data).where(
+            RequestTranscript.request_id == request_id
+        )
+        row = session.exec(statement).first()
+        return decompress_text(*row) if row else None
+    except Exception as e:
+        raise
+
+@instrumented
+def get_transcripts(request_ids: Iterable[int], session: Session) -> Dict[int, str]:
+    """
+    Load the transcripts of several requests with one query.
+    
+    Args:
+        request_ids: Request IDs
+        session: Database session
+    
+    Returns:
+        Dict[int, str]: Transcripts by request ID; untranscribed requests are missing
+    """
+    try:
+        statement = select(
+            RequestTranscript.request_id, RequestTranscript.codec, RequestTranscript.data
+        ).where(RequestTranscript.request_id.in_(list(request_ids)))
+        return {
+            request_id: decompress_text(codec, data)
+            for request_id, codec, data in session.exec(statement)
+        }
+    except Exception as e:
+        raise
+
+@instrumented
+def find_transcript_by_audio(audio_hash: str, model_version: str, session: Session) -> Optional[str]:
+    """
+    Find a stored transcript of the same audio made by the same model version.
+    
+    Args:
+        audio_hash: Content hash of the audio
+        model_version: Model version
+        session: Database session
+    
+    Returns:
+        Optional[str]: Transcript or None
+    """
+    try:
+        statement = (
+            select(RequestTranscript.codec, RequestTranscript.data)
+            .join(Request, Request.id == RequestTranscript.request_id)
+            .where(
+                Request.audio_hash == audio_hash,
+                Request.model_version == model_version
+            )
+            .limit(1)
+        )
+        row = session.exec(statement).first()
+        return decompress_text(*row) if row else None
+    except Exception as e:
+        raise
+
+@instrumented
+def save_segment(
+    request_id: int,
+    index: int,
+    start_s: float,
+    end_s: float,
+    text: str,
+    session: Session
+) -> None:
+    """
+    Store a finished segment's partial transcript, replacing an earlier one.
+    
+    Args:
+        request_id: Request being transcribed
+        index: Position of the segment in the recording
+        start_s: Segment start (s)
+        end_s: Segment end (s)
+        text: Words the segment adds to the transcript
+        session: Database session
+    """
+    try:
+        session.execute(
+            delete(TranscriptSegment)
+            .where(TranscriptSegment.request_id == request_id, TranscriptSegment.index == index)
+            .execution_options(synchronize_session=False)
+        )
+        session.execute(insert(TranscriptSegment).values(
+            request_id=request_id, index=index, start_s=start_s, end_s=end_s, text=text
+        ))
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        raise
+
+@instrumented
+def get_segments(request_id: int, session: Session, after_index: Optional[int] = None) -> List[TranscriptSegment]:
+    """
+    Get stored partial transcripts of a request in recording order.
+    
+    Args:
+        request_id: Request ID
+        session: Database session
+        after_index: Only segments after this one
+    
+    Returns:
+        List[TranscriptSegment]: Segments
+    """
+    try:
+        statement = select(TranscriptSegment).where(TranscriptSegment.request_id == request_id)
+        if after_index is not None:
+            statement = statement.where(TranscriptSegment.index > after_index)
+        segments = session.exec(statement.order_by(TranscriptSegment.index)).all()
+        return segments
+    except Exception as e:
+        raise
+
+@instrumented
+def transcript_ready(request_id: int, session: Session) -> bool:
+    """True if the final transcript of the request is stored"""
+    try:
+        statement = select(RequestTranscript.request_id).where(RequestTranscript.request_id == request_id)
+        return session.exec(statement).first() is not None
+    except Exception as e:
+        raise
+
+@instrumented
+def search_transcripts(
+    query: str,
+    session: Session,
+    user_id: Optional[int] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> List[SearchHit]:
+    """
+    Full-text search over transcripts, best matches first.
+    
+    On PostgreSQL the query runs against the GIN-indexed tsvector column,
+    elsewhere against the in-process index from services.search.
+    
+    Args:
+        query: Search query
+        session: Database session
+        user_id: Only requests of this user; None searches all users (admin)
+        limit: Page size
+        offset: Hits to skip
+    
+    Returns:
+        List[SearchHit]: One page of matching requests
+    """
+    check_page(limit, offset)
+    try:
+        if uses_postgres(session):
+            rows = session.exec(search_statement(query, user_id, limit, offset))
+            return [SearchHit(request_id, owner_id, rank) for request_id, owner_id, rank in rows]
+        ranked = transcript_index.search(query)
+        owners = dict(session.exec(owners_statement(request_id for request_id, _ in ranked)).all())
+        return local_hits(ranked, owners, user_id, limit, offset)
+    except Exception as e:
+        raise
+
+@instrumented
+def reindex_transcripts(session: Session, batch_size: int = 500, only_missing: bool = True) -> int:
+    """
+    Rebuild the search documents of stored transcripts.
+    
+    Transcripts are compressed, so the documents are computed in Python
+    batch by batch, each batch committed separately.
+    
+    Args:
+        session: Database session
+        batch_size: Transcripts per batch
+        only_missing: On PostgreSQL skip transcripts that already have a document
+    
+    Returns:
+        int: Number of reindexed transcripts
+    """
+    postgres = uses_postgres(session)
+    count = 0
+    after_id = None
+    try:
+        while True:
+            statement = select(RequestTranscript.request_id, RequestTranscript.codec, RequestTranscript.data)
+            if after_id is not None:
+                statement = statement.where(RequestTranscript.request_id > after_id)
+            if postgres and only_missing:
+                statement = statement.where(RequestTranscript.search_vector.is_(None))
+            rows = session.exec(statement.order_by(RequestTranscript.request_id).limit(batch_size)).all()
+            if not rows:
+                return count
+            for request_id, codec, data in rows:
+                search_vector = prepare_document(request_id, decompress_text(codec, data), session)
+                if postgres:
+                    session.execute(
+                        update(RequestTranscript)
+                        .where(RequestTranscript.request_id == request_id)
+                        .values(search_vector=search_vector)
+                        .execution_options(synchronize_session=False)
+                    )
+            session.commit()
+            count += len(rows)
+            after_id = rows[-1][0]
+    except Exception as e:
+        session.rollback()
+        raise
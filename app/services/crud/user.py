@@ -1,77 +1,306 @@
-from models.user import User
+from models.user import User, UserIdentity, UserSummary
 from models.request import Request
+from models.transcript import RequestTranscript, TranscriptSegment
 from models.transaction import Transaction
-from sqlmodel import Session, select
-from sqlalchemy.orm import selectinload
-from typing import List, Optional
+from models.hold import CreditHold
+from sqlmodel import Session, select, func
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Tuple
+from services.crud.loading import LoadingProfile, user_options
+from services.crud.pagination import window_filters, page_statement, stream_statement
+from services.crud.bulk import bulk_insert, bulk_delete
+from services.cache import UserCache, user_cache
+from services.search import discard_documents, uses_postgres
+from database.metrics import instrumented
 
-def get_all_users(session: Session) -> List[User]:
+@instrumented
+def get_all_users(session: Session, profile: LoadingProfile = LoadingProfile.WITH_HISTORY) -> List[User]:
     """
     Retrieve all users with their events.
     
     Args:
         session: Database session
+        profile: Relationships to load with the users, see LoadingProfile
     
     Returns:
         List[User]: List of all users
     """
     try:
-        statement = select(User).options(
-            selectinload(User.Request).selectinload(Request.user).
-            selectinload(User.Transaction).selectinload(Transaction.user)
-        )
+        statement = select(User).options(*user_options(profile))
+        users = session.exec(statement).all()
+        return users
+    except Exception as e:
+        raise
+
+@instrumented
+def iter_users(
+    session: Session,
+    batch_size: int = 1000,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None
+) -> Iterator[User]:
+    """
+    Iterate over users ordered by id through a server-side cursor.
+    
+    Relationships are not loaded; memory is bounded by one batch.
+    
+    Args:
+        session: Database session
+        batch_size: Rows fetched per round-trip
+        created_from: Only users created at or after this moment
+        created_to: Only users created before this moment
+    
+    Yields:
+        User: Next user
+    """
+    filters = window_filters(User, None, created_from, created_to)
+    statement = stream_statement(User, batch_size, *filters)
+    yield from session.exec(statement)
+
+@instrumented
+def get_users_page(
+    session: Session,
+    after_id: Optional[int] = None,
+    limit: int = 100,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    profile: LoadingProfile = LoadingProfile.SUMMARY
+) -> List[User]:
+    """
+    Get one keyset-paginated page of users ordered by id.
+    
+    Pass the id of the last user of a page as after_id to get the next one.
+    
+    Args:
+        session: Database session
+        after_id: Id of the last user of the previous page
+        limit: Page size
+        created_from: Only users created at or after this moment
+        created_to: Only users created before this moment
+        profile: Relationships to load with the users, see LoadingProfile
+    
+    Returns:
+        List[User]: Up to limit users
+    """
+    try:
+        filters = window_filters(User, after_id, created_from, created_to)
+        statement = page_statement(User, limit, *filters).options(*user_options(profile))
         users = session.exec(statement).all()
         return users
     except Exception as e:
         raise
 
-def get_user_by_id(user_id: int, session: Session) -> Optional[User]:
+@instrumented
+def get_user_by_id(user_id: int, session: Session, profile: LoadingProfile = LoadingProfile.WITH_HISTORY) -> Optional[User]:
     """
     Get user by ID.
     
+    Auth and balance checks should use get_user_identity, which is cached.
+    
     Args:
         user_id: User ID to find
         session: Database session
+        profile: Relationships to load with the user, see LoadingProfile
     
     Returns:
         Optional[User]: Found user or None
     """
     try:
         statement = select(User).where(User.id == user_id).options(
-            selectinload(User.requests).selectionload(User.transaction)
+            *user_options(profile)
         )
         user = session.exec(statement).first()
         return user
     except Exception as e:
         raise
 
-def get_user_by_email(email: str, session: Session) -> Optional[User]:
+@instrumented
+def get_user_by_email(email: str, session: Session, profile: LoadingProfile = LoadingProfile.WITH_HISTORY) -> Optional[User]:
     """
     Get user by email.
     
+    Auth and balance checks should use get_user_identity_by_email, which is cached.
+    
     Args:
         email: Email to search for
         session: Database session
+        profile: Relationships to load with the user, see LoadingProfile
     
     Returns:
         Optional[User]: Found user or None
     """
     try:
         statement = select(User).where(User.email == email).options(
-            selectinload(User.requests).selectionload(User.transaction)
+            *user_options(profile)
         )
         user = session.exec(statement).first()
         return user
     except Exception as e:
         raise
 
-def create_user(user: User, session: Session) -> User:
+def user_identity_statement(*whereclause):
+    """SELECT of UserIdentity columns only, no relationships"""
+    return select(
+        User.id, User.email, User.is_admin, User.actual_balance, User.created_at
+    ).where(*whereclause)
+
+@instrumented
+def get_user_identity(
+    user_id: int,
+    session: Session,
+    cache: Optional[UserCache] = user_cache
+) -> Optional[UserIdentity]:
+    """
+    Get user's identity and balance, read through the user cache.
+    
+    Meant for auth and balance checks on every API call: a cache hit costs
+    no query, a miss reads the user's own columns without relationships.
+    
+    Args:
+        user_id: User ID to find
+        session: Database session
+        cache: User cache; None always reads the database
+    
+    Returns:
+        Optional[UserIdentity]: Found user or None
+    """
+    try:
+        if cache is not None:
+            user = cache.get(user_id)
+            if user is not None:
+                return user
+        statement = user_identity_statement(User.id == user_id)
+        row = session.exec(statement).first()
+        if row is None:
+            return None
+        user = UserIdentity(**row._mapping)
+        if cache is not None:
+            cache.put(user)
+        return user
+    except Exception as e:
+        raise
+
+@instrumented
+def get_user_identity_by_email(
+    email: str,
+    session: Session,
+    cache: Optional[UserCache] = user_cache
+) -> Optional[UserIdentity]:
+    """
+    Get user's identity and balance by email, read through the user cache.
+    
+    Args:
+        email: Email to search for
+        session: Database session
+        cache: User cache; None always reads the database
+    
+    Returns:
+        Optional[UserIdentity]: Found user or None
+    """
+    try:
+        if cache is not None:
+            user = cache.get_by_email(email)
+            if user is not None:
+                return user
+        statement = user_identity_statement(User.email == email)
+        row = session.exec(statement).first()
+        if row is None:
+            return None
+        user = UserIdentity(**row._mapping)
+        if cache is not None:
+            cache.put(user)
+        return user
+    except Exception as e:
+        raise
+
+def user_summary_statement(*whereclause):
+    """
+    SELECT of UserSummary columns with counts as correlated COUNT subqueries.
+    
+    Each count is an index lookup on request.user_id / transaction.user_id,
+    so a page of users costs one query and no relationship loading.
+    
+    Args:
+        whereclause: Filters on User
+    """
+    requests_count = (
+        select(func.count(Request.id))
+        .where(Request.user_id == User.id)
+        .correlate(User)
+        .scalar_subquery()
+    )
+    transactions_count = (
+        select(func.count(Transaction.id))
+        .where(Transaction.user_id == User.id)
+        .correlate(User)
+        .scalar_subquery()
+    )
+    return (
+        select(
+            User.id, User.email, User.created_at, User.actual_balance, User.is_admin,
+            requests_count.label("requests_count"),
+            transactions_count.label("transactions_count")
+        )
+        .where(*whereclause)
+        .order_by(User.id)
+    )
+
+@instrumented
+def get_users_with_counts(
+    session: Session,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = 100
+) -> List[UserSummary]:
+    """
+    Get users with their request and transaction counts in one query.
+    
+    Args:
+        session: Database session
+        after_id: Id of the last user of the previous page
+        limit: Page size; None returns all remaining users
+    
+    Returns:
+        List[UserSummary]: Users with counts ordered by id
+    """
+    try:
+        statement = user_summary_statement(*window_filters(User, after_id))
+        if limit is not None:
+            statement = statement.limit(limit)
+        rows = session.exec(statement).all()
+        return [UserSummary(**row._mapping) for row in rows]
+    except Exception as e:
+        raise
+
+@instrumented
+def get_user_counts(user_id: int, session: Session) -> Optional[Tuple[int, int]]:
+    """
+    Count user's requests and transactions in SQL.
+    
+    Args:
+        user_id: User ID
+        session: Database session
+    
+    Returns:
+        Optional[Tuple[int, int]]: (requests_count, transactions_count) or None if user not found
+    """
+    try:
+        statement = user_summary_statement(User.id == user_id)
+        row = session.exec(statement).first()
+        if row is None:
+            return None
+        return row.requests_count, row.transactions_count
+    except Exception as e:
+        raise
+
+@instrumented
+def create_user(user: User, session: Session, cache: Optional[UserCache] = user_cache) -> User:
     """
     Create new user.
     
     Args:
         user: User to create
         session: Database session
+        cache: User cache to invalidate
     
     Returns:
         User: Created user with ID
@@ -80,29 +309,68 @@ def create_user(user: User, session: Session) -> User:
         session.add(user)
         session.commit()
         session.refresh(user)
+        if cache is not None:
+            cache.invalidate(user.id, user.email)
         return user
     except Exception as e:
         session.rollback()
         raise
 
-def delete_user(user_id: int, session: Session) -> bool:
+@instrumented
+def create_users_bulk(
+    users: Iterable[User],
+    session: Session,
+    chunk_size: int = 1000,
+    copy_threshold: Optional[int] = None
+) -> int:
     """
-    Delete user by ID.
+    Create many users with multi-row inserts, committing once per chunk.
+    
+    Args:
+        users: Users to create
+        session: Database session
+        chunk_size: Number of rows per insert and per commit
+        copy_threshold: Minimal chunk length to load with COPY; None disables COPY
+    
+    Returns:
+        int: Number of created users
+    """
+    return bulk_insert(User, users, session, chunk_size, copy_threshold)
+
+@instrumented
+def delete_user(user_id: int, session: Session, cache: Optional[UserCache] = user_cache) -> bool:
+    """
+    Delete user by ID together with the user's requests, transactions and credit holds.
+    
+    Keeps the delete-orphan cascade of User.requests and User.transactions
+    but runs it as set-based statements instead of loading the object graph.
     
     Args:
         user_id: User ID to delete
         session: Database session
+        cache: User cache to invalidate
     
     Returns:
         bool: True if deleted, False if not found
     """
     try:
-        user = get_user_by_id(user_id, session)
-        if user:
-            session.delete(user)
-            session.commit()
-            return True
-        return False
+        if not uses_postgres(session):
+            discard_documents(session.exec(select(Request.id).where(Request.user_id == user_id)).all(), session)
+        bulk_delete(
+            Transaction, session, Transaction.user_id == user_id,
+            referenced_by=[Request.transaction_id]
+        )
+        bulk_delete(
+            Request, session, Request.user_id == user_id,
+            referenced_by=[Transaction.request_id, CreditHold.request_id],
+            dependents=[RequestTranscript.request_id, TranscriptSegment.request_id]
+        )
+        bulk_delete(CreditHold, session, CreditHold.user_id == user_id)
+        count = bulk_delete(User, session, User.id == user_id)
+        session.commit()
+        if cache is not None:
+            cache.invalidate(user_id)
+        return count > 0
     except Exception as e:
         session.rollback()
-        raise
\ No newline at end of file
+        raise
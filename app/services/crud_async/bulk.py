@@ -0,0 +1,128 @@
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import InstrumentedAttribute
+from typing import Iterable, Optional, Sequence, Type
+from services.crud.bulk import iter_chunks, insert_columns, row_values
+from database.metrics import instrumented
+
+@instrumented
+async def bulk_insert(
+    model: Type[SQLModel],
+    items: Iterable[SQLModel],
+    session: AsyncSession,
+    chunk_size: int = 1000
+) -> int:
+    """
+    Insert many rows of one model, committing once per chunk.
+    
+    Each chunk is a single multi-row INSERT ... RETURNING id; generated ids
+    are assigned back to the passed models. Relationship collections are ignored.
+    
+    Args:
+        model: Table model class
+        items: Models to insert
+        session: Async database session
+        chunk_size: Number of rows per INSERT and per commit
+    
+    Returns:
+        int: Number of inserted rows
+    """
+    table = model.__table__
+    columns = insert_columns(model)
+    statement = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+    count = 0
+    try:
+        for chunk in iter_chunks(items, chunk_size):
+            result = await session.execute(statement, [row_values(item, columns) for item in chunk])
+            for item, item_id in zip(chunk, result.scalars()):
+                item.id = item_id
+            await session.commit()
+            count += len(chunk)
+        return count
+    except Exception as e:
+        await session.rollback()
+        raise
+
+@instrumented
+async def nullify_references(
+    referenced_by: Sequence[InstrumentedAttribute],
+    ids,
+    session: AsyncSession
+) -> None:
+    """
+    Set foreign keys pointing at soon-to-be-deleted rows to NULL.
+    
+    Args:
+        referenced_by: Foreign key attributes referencing the deleted rows
+        ids: List of ids or a SELECT of ids of the deleted rows
+        session: Async database session
+    """
+    for column in referenced_by:
+        statement = update(column.class_).where(column.in_(ids)).values({column.key: None})
+        await session.execute(statement.execution_options(synchronize_session=False))
+
+@instrumented
+async def delete_references(
+    dependents: Sequence[InstrumentedAttribute],
+    ids,
+    session: AsyncSession
+) -> None:
+    """
+    Delete rows whose foreign keys point at soon-to-be-deleted rows.
+    
+    Args:
+        dependents: Foreign key attributes of rows deleted together with the referenced ones
+        ids: List of ids or a SELECT of ids of the deleted rows
+        session: Async database session
+    """
+    for column in dependents:
+        statement = delete(column.class_).where(column.in_(ids))
+        await session.execute(statement.execution_options(synchronize_session=False))
+
+@instrumented
+async def bulk_delete(
+    model: Type[SQLModel],
+    session: AsyncSession,
+    *whereclause,
+    referenced_by: Sequence[InstrumentedAttribute] = (),
+    dependents: Sequence[InstrumentedAttribute] = (),
+    batch_size: Optional[int] = None
+) -> int:
+    """
+    Delete rows matching whereclause without loading them into the session.
+    
+    See services.crud.bulk.bulk_delete for the batching and commit rules.
+    
+    Args:
+        model: Table model class
+        session: Async database session
+        whereclause: Filter of rows to delete; none deletes every row
+        referenced_by: Foreign key attributes to set NULL before deleting
+        dependents: Foreign key attributes whose rows are deleted along with the matched rows
+        batch_size: Rows per committed batch; None deletes in one statement
+    
+    Returns:
+        int: Number of deleted rows
+    """
+    if batch_size is None:
+        await nullify_references(referenced_by, select(model.id).where(*whereclause), session)
+        await delete_references(dependents, select(model.id).where(*whereclause), session)
+        statement = delete(model).where(*whereclause)
+        result = await session.execute(statement.execution_options(synchronize_session=False))
+        return result.rowcount
+    
+    if batch_size < 1:
+        raise ValueError("batch_size must be positive")
+    count = 0
+    while True:
+        statement = select(model.id).where(*whereclause).order_by(model.id).limit(batch_size)
+        ids = (await session.execute(statement)).scalars().all()
+        if not ids:
+            return count
+        await nullify_references(referenced_by, ids, session)
+        await delete_references(dependents, ids, session)
+        statement = delete(model).where(model.id.in_(ids))
+        result = await session.execute(statement.execution_options(synchronize_session=False))
+        await session.commit()
+        count += result.rowcount
@@ -0,0 +1,308 @@
+from models.request import Request
+from models.transaction import Transaction
+from models.hold import CreditHold
+from sqlmodel import select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import AsyncIterator, Iterable, List, Optional
+from datetime import datetime
+from services.crud.loading import LoadingProfile, request_options
+from services.crud.pagination import window_filters, page_statement, stream_statement
+from services.crud_async.bulk import bulk_insert, bulk_delete
+from services.jobs.broker import Broker, TranscriptionJob
+from services.storage import TranscriptCache, transcript_cache
+from models.transcript import RequestTranscript, TranscriptSegment
+from services.crud_async.transcript import find_transcript_by_audio, write_transcript
+from services.search import discard_documents
+from database.metrics import instrumented
+
+@instrumented
+async def get_all_requests(session: AsyncSession, profile: LoadingProfile = LoadingProfile.SUMMARY) -> List[Request]:
+    """
+    Retrieve all requests.
+    
+    Args:
+        session: Async database session
+        profile: Relationships to load with the requests, see LoadingProfile
+    
+    Returns:
+        List[Request]: List of all requests
+    """
+    try:
+        statement = select(Request).options(*request_options(profile))
+        requests = (await session.exec(statement)).all()
+        return requests
+    except Exception as e:
+        raise
+
+@instrumented
+async def stream_requests(
+    session: AsyncSession,
+    batch_size: int = 1000,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    user_id: Optional[int] = None
+) -> AsyncIterator[Request]:
+    """
+    Stream requests ordered by id through a server-side cursor.
+    
+    Relationships are not loaded; memory is bounded by one batch.
+    
+    Args:
+        session: Async database session
+        batch_size: Rows fetched per round-trip
+        created_from: Only requests created at or after this moment
+        created_to: Only requests created before this moment
+        user_id: Only requests of this user
+    
+    Yields:
+        Request: Next request
+    """
+    filters = window_filters(Request, None, created_from, created_to)
+    if user_id is not None:
+        filters.append(Request.user_id == user_id)
+    statement = stream_statement(Request, batch_size, *filters)
+    async for request in await session.stream_scalars(statement):
+        yield request
+
+@instrumented
+async def get_requests_page(
+    session: AsyncSession,
+    after_id: Optional[int] = None,
+    limit: int = 100,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    profile: LoadingProfile = LoadingProfile.SUMMARY
+) -> List[Request]:
+    """
+    Get one keyset-paginated page of requests ordered by id.
+    
+    Pass the id of the last request of a page as after_id to get the next one.
+    
+    Args:
+        session: Async database session
+        after_id: Id of the last request of the previous page
+        limit: Page size
+        created_from: Only requests created at or after this moment
+        created_to: Only requests created before this moment
+        user_id: Only requests of this user
+        profile: Relationships to load with the requests, see LoadingProfile
+    
+    Returns:
+        List[Request]: Up to limit requests
+    """
+    try:
+        filters = window_filters(Request, after_id, created_from, created_to)
+        if user_id is not None:
+            filters.append(Request.user_id == user_id)
+        statement = page_statement(Request, limit, *filters).options(*request_options(profile))
+        requests = (await session.exec(statement)).all()
+        return requests
+    except Exception as e:
+        raise
+
+@instrumented
+async def get_request_by_id(request_id: int, session: AsyncSession, profile: LoadingProfile = LoadingProfile.SUMMARY) -> Optional[Request]:
+    """
+    Get request by ID.
+    
+    Args:
+        request_id: Request ID to find
+        session: Async database session
+        profile: Relationships to load with the request, see LoadingProfile
+    
+    Returns:
+        Optional[Request]: Found request or None
+    """
+    try:
+        statement = select(Request).where(Request.id == request_id).options(*request_options(profile))
+        request = (await session.exec(statement)).first()
+        return request
+    except Exception as e:
+        raise
+
+@instrumented
+async def find_cached_transcript(
+    audio_hash: str,
+    model_version: str,
+    session: AsyncSession,
+    cache: Optional[TranscriptCache] = transcript_cache
+) -> Optional[str]:
+    """
+    Find a transcript of the same audio made by the same model version.
+    
+    Looks into the in-memory cache first, then into earlier requests.
+    
+    Args:
+        audio_hash: Content hash of the audio
+        model_version: Model version
+        session: Async database session
+        cache: In-memory transcript cache; None skips it
+    
+    Returns:
+        Optional[str]: Transcript or None if the audio was not transcribed yet
+    """
+    try:
+        if cache is not None:
+            transcript = cache.get(audio_hash, model_version)
+            if transcript is not None:
+                return transcript
+        transcript = await find_transcript_by_audio(audio_hash, model_version, session)
+        if transcript is not None and cache is not None:
+            cache.put(audio_hash, model_version, transcript)
+        return transcript
+    except Exception as e:
+        raise
+
+@instrumented
+async def create_request(
+    request: Request,
+    session: AsyncSession,
+    broker: Optional[Broker] = None,
+    model_version: Optional[str] = None
+) -> Request:
+    """
+    Create new request.
+    
+    Args:
+        request: Request to create
+        session: Async database session
+        broker: If given, a transcription job is published after commit
+        model_version: Current model version; if the same audio (by
+            request.audio_hash) was transcribed by it, the transcript is
+            reused and no job is published
+    
+    Returns:
+        Request: Created request with ID
+    """
+    try:
+        transcript = None
+        if request.audio_hash and model_version:
+            transcript = await find_cached_transcript(request.audio_hash, model_version, session)
+            if transcript is not None:
+                request.model_version = model_version
+                broker = None
+        session.add(request)
+        if transcript is not None:
+            await session.flush()
+            await write_transcript(request.id, transcript, session)
+        await session.commit()
+        await session.refresh(request)
+        if broker is not None:
+            await broker.publish_async(TranscriptionJob.from_request(request))
+        return request
+    except Exception as e:
+        await session.rollback()
+        raise
+
+@instrumented
+async def create_requests_bulk(
+    requests: Iterable[Request],
+    session: AsyncSession,
+    chunk_size: int = 1000
+) -> int:
+    """
+    Create many requests with multi-row inserts, committing once per chunk.
+    
+    Args:
+        requests: Requests to create
+        session: Async database session
+        chunk_size: Number of rows per insert and per commit
+    
+    Returns:
+        int: Number of created requests
+    """
+    return await bulk_insert(Request, requests, session, chunk_size)
+
+@instrumented
+async def set_request_result(
+    request_id: int,
+    transcript: str,
+    cost: float,
+    session: AsyncSession,
+    model_version: Optional[str] = None
+) -> bool:
+    """
+    Store transcription result without loading the request.
+    
+    Cost and model version are set with one UPDATE, the transcript is
+    written compressed to RequestTranscript in the same transaction.
+    
+    Args:
+        request_id: Transcribed request
+        transcript: Transcription text
+        cost: Request cost
+        session: Async database session
+        model_version: Version of the model that produced the transcript
+    
+    Returns:
+        bool: True if updated, False if not found
+    """
+    try:
+        statement = update(Request).where(Request.id == request_id).values(
+            cost=cost, model_version=model_version
+        )
+        result = await session.execute(statement.execution_options(synchronize_session=False))
+        if result.rowcount == 0:
+            await session.rollback()
+            return False
+        await write_transcript(request_id, transcript, session)
+        await session.commit()
+        return True
+    except Exception as e:
+        await session.rollback()
+        raise
+    
+@instrumented
+async def delete_all_requests(session: AsyncSession, batch_size: Optional[int] = None) -> int:
+    """
+    Delete all requests with set-based statements.
+    
+    Transactions and credit holds referencing deleted requests are kept with request_id set to NULL,
+    transcripts and partial transcripts are deleted with them.
+    
+    Args:
+        session: Async database session
+        batch_size: Rows per committed batch; None deletes in one statement
+    
+    Returns:
+        int: Number of deleted requests
+    """
+    try:
+        discard_documents(None, session)
+        count = await bulk_delete(
+            Request, session,
+            referenced_by=[Transaction.request_id, CreditHold.request_id],
+            dependents=[RequestTranscript.request_id, TranscriptSegment.request_id],
+            batch_size=batch_size
+        )
+        await session.commit()
+        return count
+    except Exception as e:
+        await session.rollback()
+        raise
+    
+@instrumented
+async def delete_request(request_id: int, session: AsyncSession) -> bool:
+    """
+    Delete request by ID.
+    
+    Args:
+        request_id: Request ID to delete
+        session: Async database session
+    
+    Returns:
+        bool: True if deleted, False if not found
+    """
+    try:
+        discard_documents([request_id], session)
+        count = await bulk_delete(
+            Request, session, Request.id == request_id,
+            referenced_by=[Transaction.request_id, CreditHold.request_id],
+            dependents=[RequestTranscript.request_id, TranscriptSegment.request_id]
+        )
+        await session.commit()
+        return count > 0
+    except Exception as e:
+        await session.rollback()
+        raise
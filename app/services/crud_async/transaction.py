@@ -0,0 +1,205 @@
+from models.transaction import Transaction
+from models.request import Request
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import AsyncIterator, Iterable, List, Optional
+from datetime import datetime
+from services.crud.loading import LoadingProfile, transaction_options
+from services.crud.pagination import window_filters, page_statement, stream_statement
+from services.crud_async.bulk import bulk_insert, bulk_delete
+from database.metrics import instrumented
+
+@instrumented
+async def get_all_transactions(session: AsyncSession, profile: LoadingProfile = LoadingProfile.SUMMARY) -> List[Transaction]:
+    """
+    Retrieve all transactions.
+    
+    Args:
+        session: Async database session
+        profile: Relationships to load with the transactions, see LoadingProfile
+    
+    Returns:
+        List[Transaction]: List of all transactions
+    """
+    try:
+        statement = select(Transaction).options(*transaction_options(profile))
+        transactions = (await session.exec(statement)).all()
+        return transactions
+    except Exception as e:
+        raise
+
+@instrumented
+async def stream_transactions(
+    session: AsyncSession,
+    batch_size: int = 1000,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    user_id: Optional[int] = None
+) -> AsyncIterator[Transaction]:
+    """
+    Stream transactions ordered by id through a server-side cursor.
+    
+    Relationships are not loaded; memory is bounded by one batch.
+    
+    Args:
+        session: Async database session
+        batch_size: Rows fetched per round-trip
+        created_from: Only transactions created at or after this moment
+        created_to: Only transactions created before this moment
+        user_id: Only transactions of this user
+    
+    Yields:
+        Transaction: Next transaction
+    """
+    filters = window_filters(Transaction, None, created_from, created_to)
+    if user_id is not None:
+        filters.append(Transaction.user_id == user_id)
+    statement = stream_statement(Transaction, batch_size, *filters)
+    async for transaction in await session.stream_scalars(statement):
+        yield transaction
+
+@instrumented
+async def get_transactions_page(
+    session: AsyncSession,
+    after_id: Optional[int] = None,
+    limit: int = 100,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    profile: LoadingProfile = LoadingProfile.SUMMARY
+) -> List[Transaction]:
+    """
+    Get one keyset-paginated page of transactions ordered by id.
+    
+    Pass the id of the last transaction of a page as after_id to get the next one.
+    
+    Args:
+        session: Async database session
+        after_id: Id of the last transaction of the previous page
+        limit: Page size
+        created_from: Only transactions created at or after this moment
+        created_to: Only transactions created before this moment
+        user_id: Only transactions of this user
+        profile: Relationships to load with the transactions, see LoadingProfile
+    
+    Returns:
+        List[Transaction]: Up to limit transactions
+    """
+    try:
+        filters = window_filters(Transaction, after_id, created_from, created_to)
+        if user_id is not None:
+            filters.append(Transaction.user_id == user_id)
+        statement = page_statement(Transaction, limit, *filters).options(*transaction_options(profile))
+        transactions = (await session.exec(statement)).all()
+        return transactions
+    except Exception as e:
+        raise
+
+@instrumented
+async def get_transaction_by_id(transaction_id: int, session: AsyncSession, profile: LoadingProfile = LoadingProfile.SUMMARY) -> Optional[Transaction]:
+    """
+    Get transaction by ID.
+    
+    Args:
+        transaction_id: Transactions ID to find
+        session: Async database session
+        profile: Relationships to load with the transaction, see LoadingProfile
+    
+    Returns:
+        Optional[Transaction]: Found transaction or None
+    """
+    try:
+        statement = select(Transaction).where(Transaction.id == transaction_id).options(*transaction_options(profile))
+        transaction = (await session.exec(statement)).first()
+        return transaction
+    except Exception as e:
+        raise
+
+@instrumented
+async def create_transaction(transaction: Transaction, session: AsyncSession) -> Transaction:
+    """
+    Create new transaction.
+    
+    Args:
+        transaction: Transactions to create
+        session: Async database session
+    
+    Returns:
+        Transaction: Created transaction with ID
+    """
+    try:
+        session.add(transaction)
+        await session.commit()
+        await session.refresh(transaction)
+        return transaction
+    except Exception as e:
+        await session.rollback()
+        raise
+
+@instrumented
+async def create_transactions_bulk(
+    transactions: Iterable[Transaction],
+    session: AsyncSession,
+    chunk_size: int = 1000
+) -> int:
+    """
+    Create many transactions with multi-row inserts, committing once per chunk.
+    
+    Args:
+        transactions: Transactions to create
+        session: Async database session
+        chunk_size: Number of rows per insert and per commit
+    
+    Returns:
+        int: Number of created transactions
+    """
+    return await bulk_insert(Transaction, transactions, session, chunk_size)
+
+@instrumented
+async def delete_all_transactions(session: AsyncSession, batch_size: Optional[int] = None) -> int:
+    """
+    Delete all transactions with set-based statements.
+    
+    Requests referencing deleted transactions are kept with transaction_id set to NULL.
+    
+    Args:
+        session: Async database session
+        batch_size: Rows per committed batch; None deletes in one statement
+    
+    Returns:
+        int: Number of deleted transactions
+    """
+    try:
+        count = await bulk_delete(
+            Transaction, session,
+            referenced_by=[Request.transaction_id],
+            batch_size=batch_size
+        )
+        await session.commit()
+        return count
+    except Exception as e:
+        await session.rollback()
+        raise
+    
+@instrumented
+async def delete_transaction(transaction_id: int, session: AsyncSession) -> bool:
+    """
+    Delete transaction by ID.
+    
+    Args:
+        transaction_id: Transactions ID to delete
+        session: Async database session
+    
+    Returns:
+        bool: True if deleted, False if not found
+    """
+    try:
+        count = await bulk_delete(
+            Transaction, session, Transaction.id == transaction_id,
+            referenced_by=[Request.transaction_id]
+        )
+        await session.commit()
+        return count > 0
+    except Exception as e:
+        await session.rollback()
+        raise
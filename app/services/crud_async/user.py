@@ -0,0 +1,340 @@
+from models.user import User, UserIdentity, UserSummary
+from models.request import Request
+from models.transcript import RequestTranscript, TranscriptSegment
+from models.transaction import Transaction
+from models.hold import CreditHold
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from datetime import datetime
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
+from services.crud.loading import LoadingProfile, user_options
+from services.crud.user import user_identity_statement, user_summary_statement
+from services.crud.pagination import window_filters, page_statement, stream_statement
+from services.crud_async.bulk import bulk_insert, bulk_delete
+from services.cache import UserCache, user_cache
+from services.search import discard_documents, uses_postgres
+from database.metrics import instrumented
+
+@instrumented
+async def get_all_users(session: AsyncSession, profile: LoadingProfile = LoadingProfile.WITH_HISTORY) -> List[User]:
+    """
+    Retrieve all users with their requests and transactions.
+    
+    Args:
+        session: Async database session
+        profile: Relationships to load with the users, see LoadingProfile
+    
+    Returns:
+        List[User]: List of all users
+    """
+    try:
+        statement = select(User).options(*user_options(profile))
+        users = (await session.exec(statement)).all()
+        return users
+    except Exception as e:
+        raise
+
+@instrumented
+async def stream_users(
+    session: AsyncSession,
+    batch_size: int = 1000,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None
+) -> AsyncIterator[User]:
+    """
+    Stream users ordered by id through a server-side cursor.
+    
+    Relationships are not loaded; memory is bounded by one batch.
+    
+    Args:
+        session: Async database session
+        batch_size: Rows fetched per round-trip
+        created_from: Only users created at or after this moment
+        created_to: Only users created before this moment
+    
+    Yields:
+        User: Next user
+    """
+    filters = window_filters(User, None, created_from, created_to)
+    statement = stream_statement(User, batch_size, *filters)
+    async for user in await session.stream_scalars(statement):
+        yield user
+
+@instrumented
+async def get_users_page(
+    session: AsyncSession,
+    after_id: Optional[int] = None,
+    limit: int = 100,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    profile: LoadingProfile = LoadingProfile.SUMMARY
+) -> List[User]:
+    """
+    Get one keyset-paginated page of users ordered by id.
+    
+    Pass the id of the last user of a page as after_id to get the next one.
+    
+    Args:
+        session: Async database session
+        after_id: Id of the last user of the previous page
+        limit: Page size
+        created_from: Only users created at or after this moment
+        created_to: Only users created before this moment
+        profile: Relationships to load with the users, see LoadingProfile
+    
+    Returns:
+        List[User]: Up to limit users
+    """
+    try:
+        filters = window_filters(User, after_id, created_from, created_to)
+        statement = page_statement(User, limit, *filters).options(*user_options(profile))
+        users = (await session.exec(statement)).all()
+        return users
+    except Exception as e:
+        raise
+
+@instrumented
+async def get_user_by_id(user_id: int, session: AsyncSession, profile: LoadingProfile = LoadingProfile.WITH_HISTORY) -> Optional[User]:
+    """
+    Get user by ID.
+    
+    Auth and balance checks should use get_user_identity, which is cached.
+    
+    Args:
+        user_id: User ID to find
+        session: Async database session
+        profile: Relationships to load with the user, see LoadingProfile
+    
+    Returns:
+        Optional[User]: Found user or None
+    """
+    try:
+        statement = select(User).where(User.id == user_id).options(
+            *user_options(profile)
+        )
+        user = (await session.exec(statement)).first()
+        return user
+    except Exception as e:
+        raise
+
+@instrumented
+async def get_user_by_email(email: str, session: AsyncSession, profile: LoadingProfile = LoadingProfile.WITH_HISTORY) -> Optional[User]:
+    """
+    Get user by email.
+    
+    Auth and balance checks should use get_user_identity_by_email, which is cached.
+    
+    Args:
+        email: Email to search for
+        session: Async database session
+        profile: Relationships to load with the user, see LoadingProfile
+    
+    Returns:
+        Optional[User]: Found user or None
+    """
+    try:
+        statement = select(User).where(User.email == email).options(
+            *user_options(profile)
+        )
+        user = (await session.exec(statement)).first()
+        return user
+    except Exception as e:
+        raise
+
+@instrumented
+async def get_user_identity(
+    user_id: int,
+    session: AsyncSession,
+    cache: Optional[UserCache] = user_cache
+) -> Optional[UserIdentity]:
+    """
+    Get user's identity and balance, read through the user cache.
+    
+    Meant for auth and balance checks on every API call: a cache hit costs
+    no query, a miss reads the user's own columns without relationships.
+    
+    Args:
+        user_id: User ID to find
+        session: Async database session
+        cache: User cache; None always reads the database
+    
+    Returns:
+        Optional[UserIdentity]: Found user or None
+    """
+    try:
+        if cache is not None:
+            user = await cache.get_async(user_id)
+            if user is not None:
+                return user
+        statement = user_identity_statement(User.id == user_id)
+        row = (await session.exec(statement)).first()
+        if row is None:
+            return None
+        user = UserIdentity(**row._mapping)
+        if cache is not None:
+            await cache.put_async(user)
+        return user
+    except Exception as e:
+        raise
+
+@instrumented
+async def get_user_identity_by_email(
+    email: str,
+    session: AsyncSession,
+    cache: Optional[UserCache] = user_cache
+) -> Optional[UserIdentity]:
+    """
+    Get user's identity and balance by email, read through the user cache.
+    
+    Args:
+        email: Email to search for
+        session: Async database session
+        cache: User cache; None always reads the database
+    
+    Returns:
+        Optional[UserIdentity]: Found user or None
+    """
+    try:
+        if cache is not None:
+            user = await cache.get_by_email_async(email)
+            if user is not None:
+                return user
+        statement = user_identity_statement(User.email == email)
+        row = (await session.exec(statement)).first()
+        if row is None:
+            return None
+        user = UserIdentity(**row._mapping)
+        if cache is not None:
+            await cache.put_async(user)
+        return user
+    except Exception as e:
+        raise
+
+@instrumented
+async def get_users_with_counts(
+    session: AsyncSession,
+    after_id: Optional[int] = None,
+    limit: Optional[int] = 100
+) -> List[UserSummary]:
+    """
+    Get users with their request and transaction counts in one query.
+    
+    Args:
+        session: Async database session
+        after_id: Id of the last user of the previous page
+        limit: Page size; None returns all remaining users
+    
+    Returns:
+        List[UserSummary]: Users with counts ordered by id
+    """
+    try:
+        statement = user_summary_statement(*window_filters(User, after_id))
+        if limit is not None:
+            statement = statement.limit(limit)
+        rows = (await session.exec(statement)).all()
+        return [UserSummary(**row._mapping) for row in rows]
+    except Exception as e:
+        raise
+
+@instrumented
+async def get_user_counts(user_id: int, session: AsyncSession) -> Optional[Tuple[int, int]]:
+    """
+    Count user's requests and transactions in SQL.
+    
+    Args:
+        user_id: User ID
+        session: Async database session
+    
+    Returns:
+        Optional[Tuple[int, int]]: (requests_count, transactions_count) or None if user not found
+    """
+    try:
+        statement = user_summary_statement(User.id == user_id)
+        row = (await session.exec(statement)).first()
+        if row is None:
+            return None
+        return row.requests_count, row.transactions_count
+    except Exception as e:
+        raise
+
+@instrumented
+async def create_user(user: User, session: AsyncSession, cache: Optional[UserCache] = user_cache) -> User:
+    """
+    Create new user.
+    
+    Args:
+        user: User to create
+        session: Async database session
+        cache: User cache to invalidate
+    
+    Returns:
+        User: Created user with ID
+    """
+    try:
+        session.add(user)
+        await session.commit()
+        await session.refresh(user)
+        if cache is not None:
+            await cache.invalidate_async(user.id, user.email)
+        return user
+    except Exception as e:
+        await session.rollback()
+        raise
+
+@instrumented
+async def create_users_bulk(
+    users: Iterable[User],
+    session: AsyncSession,
+    chunk_size: int = 1000
+) -> int:
+    """
+    Create many users with multi-row inserts, committing once per chunk.
+    
+    Args:
+        users: Users to create
+        session: Async database session
+        chunk_size: Number of rows per insert and per commit
+    
+    Returns:
+        int: Number of created users
+    """
+    return await bulk_insert(User, users, session, chunk_size)
+
+@instrumented
+async def delete_user(user_id: int, session: AsyncSession, cache: Optional[UserCache] = user_cache) -> bool:
+    """
+    Delete user by ID together with the user's requests, transactions and credit holds.
+    
+    Keeps the delete-orphan cascade of User.requests and User.transactions
+    but runs it as set-based statements instead of loading the object graph.
+    
+    Args:
+        user_id: User ID to delete
+        session: Async database session
+        cache: User cache to invalidate
+    
+    Returns:
+        bool: True if deleted, False if not found
+    """
+    try:
+        if not uses_postgres(session):
+            request_ids = await session.exec(select(Request.id).where(Request.user_id == user_id))
+            discard_documents(request_ids.all(), session)
+        await bulk_delete(
+            Transaction, session, Transaction.user_id == user_id,
+            referenced_by=[Request.transaction_id]
+        )
+        await bulk_delete(
+            Request, session, Request.user_id == user_id,
+            referenced_by=[Transaction.request_id, CreditHold.request_id],
+            dependents=[RequestTranscript.request_id, TranscriptSegment.request_id]
+        )
+        await bulk_delete(CreditHold, session, CreditHold.user_id == user_id)
+        count = await bulk_delete(User, session, User.id == user_id)
+        await session.commit()
+        if cache is not None:
+            await cache.invalidate_async(user_id)
+        return count > 0
+    except Exception as e:
+        await session.rollback()
+        raise
@@ -0,0 +1,170 @@
+from audio.probe import HEAD_SIZE, TAIL_SIZE, AudioInfo, ProbeCache, decode_info, parse_header, probe_cache
+from audio.sniff import SNIFF_SIZE, validate_audio
+from models.request import MAX_DURATION, MIN_DURATION
+from services.storage import ContentStore, get_content_store, new_hasher
+from dataclasses import dataclass
+from typing import AsyncIterable, Iterable, Optional
+import os
+
+MAX_UPLOAD_BYTES = 200 * 1024 * 1024
+
+class UploadRejected(ValueError):
+    """Raised when an upload is not acceptable audio; the partial file is removed"""
+
+@dataclass(frozen=True)
+class IngestedUpload:
+    """
+    Upload stored in the content store together with what was learned on the way.
+    
+    Attributes:
+        digest (str): Content hash
+        path (str): Stored file
+        size (int): Size in bytes
+        mime (str): Sniffed MIME type
+        info (AudioInfo): Audio metadata
+        created (bool): False if the same content was already stored
+    """
+    digest: str
+    path: str
+    size: int
+    mime: str
+    info: AudioInfo
+    created: bool
+
+class UploadIngestor:
+    """
+    Single pass over an upload: write to disk, hash, sniff MIME and probe duration.
+    
+    The MIME type is checked as soon as the first SNIFF_SIZE bytes arrived,
+    the duration as soon as the headers allow it (WAV, FLAC), and the size
+    on every chunk, so bad uploads are rejected before they are fully received.
+    
+    Attributes:
+        store (ContentStore): Where the upload is stored, defaults to get_content_store()
+        max_bytes (int): Largest accepted upload
+        min_duration (float): Shortest accepted audio (s)
+        max_duration (float): Longest accepted audio (s)
+        cache (Optional[ProbeCache]): Receives the metadata under the content hash
+    """
+    def __init__(
+        self,
+        store: Optional[ContentStore] = None,
+        max_bytes: int = MAX_UPLOAD_BYTES,
+        min_duration: float = MIN_DURATION,
+        max_duration: float = MAX_DURATION,
+        cache: Optional[ProbeCache] = probe_cache
+    ) -> None:
+        self.store = store or get_content_store()
+        self.max_bytes = max_bytes
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.cache = cache
+        
+        self._hasher = new_hasher()
+        self._head = bytearray()
+        self._tail = bytearray()
+        self._size = 0
+        self._mime: Optional[str] = None
+        self._early_info: Optional[AudioInfo] = None
+        self._header_checked = False
+        descriptor, self._path = self.store.temporary()
+        self._file = os.fdopen(descriptor, "wb")
+    
+    def feed(self, chunk: bytes) -> None:
+        """
+        Consume the next chunk of the upload.
+        
+        Raises:
+            UploadRejected: If the upload is too large, not audio or too long
+        """
+        try:
+            self._size += len(chunk)
+            if self._size > self.max_bytes:
+                raise UploadRejected(f"Upload is larger than {self.max_bytes} bytes")
+            self._hasher.update(chunk)
+            self._file.write(chunk)
+            if len(self._head) < HEAD_SIZE:
+                self._head += chunk[:HEAD_SIZE - len(self._head)]
+            self._tail += chunk
+            del self._tail[:-TAIL_SIZE]
+            
+            if self._mime is None and len(self._head) >= SNIFF_SIZE:
+                self._check_mime()
+            if self._mime is not None and not self._header_checked:
+                self._early_info = parse_header(bytes(self._head))
+                self._header_checked = self._early_info is not None or len(self._head) >= HEAD_SIZE
+                if self._early_info is not None and self._early_info.duration > self.max_duration:
+                    raise UploadRejected(f"Audio must be from {self.min_duration} to {self.max_duration} s long")
+        except BaseException:
+            self.abort()
+            raise
+    
+    def finish(self) -> IngestedUpload:
+        """
+        Complete the upload and move it into the content store.
+        
+        Raises:
+            UploadRejected: If the upload is not acceptable audio
+        """
+        try:
+            self._file.close()
+            if self._mime is None:
+                self._check_mime()
+            info = parse_header(bytes(self._head), bytes(self._tail), self._size) or decode_info(self._path)
+            if not self.min_duration <= info.duration <= self.max_duration:
+                raise UploadRejected(f"Audio must be from {self.min_duration} to {self.max_duration} s long")
+            blob = self.store.commit(self._path, self._hasher.hexdigest(), self._size)
+        except BaseException:
+            self.abort()
+            raise
+        if self.cache is not None:
+            self.cache.put(blob.digest, info)
+        return IngestedUpload(blob.digest, blob.path, blob.size, self._mime, info, blob.created)
+    
+    def abort(self) -> None:
+        """Drop the partial upload"""
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self._path):
+            os.remove(self._path)
+    
+    def _check_mime(self) -> None:
+        try:
+            self._mime = validate_audio(bytes(self._head[:SNIFF_SIZE]))
+        except ValueError as e:
+            raise UploadRejected(str(e)) from e
+
+def ingest_upload(chunks: Iterable[bytes], store: Optional[ContentStore] = None, **limits) -> IngestedUpload:
+    """
+    Store an upload given as chunks in one pass, validating it on the way.
+    
+    Args:
+        chunks: Upload content
+        store: Content store, defaults to get_content_store()
+        limits: max_bytes, min_duration, max_duration, cache (see UploadIngestor)
+    
+    Returns:
+        IngestedUpload: Stored upload with its hash, MIME type and metadata
+    
+    Raises:
+        UploadRejected: If the upload is too large, not audio or of wrong duration
+    """
+    ingestor = UploadIngestor(store, **limits)
+    try:
+        for chunk in chunks:
+            ingestor.feed(chunk)
+    except BaseException:
+        ingestor.abort()
+        raise
+    return ingestor.finish()
+
+async def ingest_upload_async(chunks: AsyncIterable[bytes], store: Optional[ContentStore] = None, **limits) -> IngestedUpload:
+    """Same as ingest_upload for async streams, e.g. starlette Request.stream()"""
+    ingestor = UploadIngestor(store, **limits)
+    try:
+        async for chunk in chunks:
+            ingestor.feed(chunk)
+    except BaseException:
+        ingestor.abort()
+        raise
+    return ingestor.finish()
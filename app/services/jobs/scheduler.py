@@ -0,0 +1,239 @@
+from services.jobs.broker import INTAKE_QUEUE, Broker, Consumer, Delivery, TranscriptionJob, connect_broker
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+import heapq
+import itertools
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+def _percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(share * (len(ordered) - 1))))
+    return ordered[index]
+
+class FairDispatcher:
+    """
+    Job queue ordering transcriptions by duration, user share and age.
+    
+    Jobs not longer than short_s go to a shortest-job-first lane. Longer
+    jobs go to a weighted fair lane: every user gets a virtual clock that
+    advances by duration / weight per job, so a user with a batch of
+    10-minute files only gets their share of the workers. When both lanes
+    have work the long lane is served on long_share of picks. Aging lowers
+    a job's key by aging_rate for every second it waits, so no job starves.
+    
+    Implements the queue.Queue methods LocalBroker uses (put/get/qsize), so
+    it can be passed to LocalBroker(dispatcher=...); with RabbitMQ it runs
+    in the dispatcher stage, see run_dispatcher.
+    
+    Attributes:
+        short_s (float): Longest duration served by the SJF lane (s)
+        long_share (float): Share of picks given to the long lane under contention
+        aging_rate (float): Key decrease per second of waiting
+        weights (Dict[int, float]): Weight of each user_id, 1.0 by default
+        maxsize (int): Queued jobs above which put blocks; 0 is unbounded
+        buckets (Sequence[float]): Upper duration bounds of wait-time buckets (s)
+    """
+    def __init__(
+        self,
+        short_s: float = 30.0,
+        long_share: float = 0.25,
+        aging_rate: float = 1.0,
+        weights: Optional[Dict[int, float]] = None,
+        maxsize: int = 0,
+        buckets: Sequence[float] = (30.0, 120.0, 300.0, 600.0),
+        samples_per_bucket: int = 10000
+    ) -> None:
+        if not 0 < long_share < 1:
+            raise ValueError("long_share must be between 0 and 1")
+        self.short_s = short_s
+        self.long_share = long_share
+        self.aging_rate = aging_rate
+        self.weights = dict(weights or {})
+        self.maxsize = maxsize
+        self.buckets = tuple(sorted(buckets))
+        
+        self._short: List[Tuple[float, int, float, TranscriptionJob]] = []
+        self._long: List[Tuple[float, int, float, float, TranscriptionJob]] = []
+        self._order = itertools.count()
+        self._virtual_time = 0.0
+        # Virtual finish of each user's last long job; at or below _virtual_time an entry means nothing
+        self._user_finish: Dict[Optional[int], float] = {}
+        self._user_queued: Dict[Optional[int], int] = {}
+        self._long_credit = 0.0
+        self._condition = threading.Condition()
+        self._waits: Dict[str, Deque[float]] = {
+            label: deque(maxlen=samples_per_bucket) for label in self._labels()
+        }
+    
+    def _labels(self) -> List[str]:
+        bounds = [0.0, *self.buckets]
+        labels = [f"{int(low)}-{int(high)}s" for low, high in zip(bounds, bounds[1:])]
+        return labels + [f">{int(self.buckets[-1])}s"]
+    
+    def _bucket(self, duration: float) -> str:
+        labels = self._labels()
+        for bound, label in zip(self.buckets, labels):
+            if duration <= bound:
+                return label
+        return labels[-1]
+    
+    def qsize(self) -> int:
+        with self._condition:
+            return len(self._short) + len(self._long)
+    
+    def put(self, job: TranscriptionJob, block: bool = True, timeout: Optional[float] = None) -> None:
+        """
+        Enqueue job.
+        
+        Raises:
+            queue.Full: If the dispatcher stayed full for timeout seconds
+        """
+        with self._condition:
+            if self.maxsize > 0:
+                if not self._condition.wait_for(lambda: len(self._short) + len(self._long) < self.maxsize, timeout if block else 0):
+                    raise queue.Full
+            now = time.monotonic()
+            aging = self.aging_rate * now
+            if job.duration <= self.short_s:
+                heapq.heappush(self._short, (job.duration + aging, next(self._order), now, job))
+            else:
+                weight = self.weights.get(job.user_id, 1.0)
+                start = max(self._virtual_time, self._user_finish.get(job.user_id, 0.0))
+                finish = start + job.duration / weight
+                self._user_finish[job.user_id] = finish
+                self._user_queued[job.user_id] = self._user_queued.get(job.user_id, 0) + 1
+                heapq.heappush(self._long, (finish + aging, next(self._order), start, now, job))
+            self._condition.notify_all()
+    
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> TranscriptionJob:
+        """
+        Take the next job to run.
+        
+        Raises:
+            queue.Empty: If nothing was queued within timeout seconds
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._short or self._long, timeout if block else 0):
+                raise queue.Empty
+            use_long = not self._short
+            if self._short and self._long:
+                self._long_credit += self.long_share
+                use_long = self._long_credit >= 1.0
+            if use_long:
+                self._long_credit = max(0.0, self._long_credit - 1.0)
+                _, _, start, enqueued, job = heapq.heappop(self._long)
+                self._virtual_time = max(self._virtual_time, start)
+                self._user_queued[job.user_id] -= 1
+                if not self._user_queued[job.user_id]:
+                    del self._user_queued[job.user_id]
+                if not self._long:
+                    # Idle lane: virtual time catches up with every user, the clocks carry no information
+                    self._virtual_time = max([self._virtual_time, *self._user_finish.values()])
+                    self._user_finish.clear()
+                elif len(self._user_finish) > 2 * len(self._long) + 64:
+                    self._prune_users()
+            else:
+                _, _, enqueued, job = heapq.heappop(self._short)
+            self._waits[self._bucket(job.duration)].append(time.monotonic() - enqueued)
+            self._condition.notify_all()
+            return job
+    
+    def _prune_users(self) -> None:
+        """
+        Forget the clocks of users without queued long jobs.
+        
+        Keeps memory proportional to the queue; a pruned user whose finish
+        was still ahead of _virtual_time loses at most one job of debt.
+        """
+        self._user_finish = {
+            user_id: finish for user_id, finish in self._user_finish.items() if user_id in self._user_queued
+        }
+    
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """
+        Queue wait per duration bucket.
+        
+        Returns:
+            Dict[str, Dict[str, float]]: For every bucket: count, p50_s and p99_s
+                over the last dispatched jobs
+        """
+        with self._condition:
+            result = {}
+            for label, waits in self._waits.items():
+                values = list(waits)
+                result[label] = {
+                    "count": len(values),
+                    "p50_s": _percentile(values, 0.50) if values else 0.0,
+                    "p99_s": _percentile(values, 0.99) if values else 0.0,
+                }
+            result["queued"] = {"short": len(self._short), "long": len(self._long), "users": len(self._user_finish)}
+            return result
+
+def run_dispatcher(
+    intake: Consumer,
+    outlet: Broker,
+    dispatcher: FairDispatcher,
+    window: int = 1,
+    stop=None,
+    poll_timeout: float = 0.1,
+    stats_interval: float = 60.0
+) -> int:
+    """
+    Feed the worker queue from the intake queue in FairDispatcher order.
+    
+    Jobs published to the intake queue are held by the dispatcher; one is
+    forwarded to the worker queue whenever it has fewer than window ready
+    jobs, so workers always run what the dispatcher picks next. Intake
+    deliveries are acked after the job is published to the worker queue
+    (at-least-once, like the workers). Only as many jobs as the intake
+    consumer's prefetch are reordered at a time.
+    
+    Args:
+        intake: Consumer of the intake queue, with a large prefetch
+        outlet: Broker of the worker queue
+        dispatcher: Orders the held jobs
+        window: Ready jobs kept in the worker queue, e.g. the number of workers
+        stop: Event that ends the loop
+        poll_timeout: How long to wait for an intake job (s)
+        stats_interval: Seconds between logging dispatcher.stats()
+    
+    Returns:
+        int: Number of forwarded jobs
+    """
+    held: Dict[int, Delivery] = {}
+    forwarded = 0
+    next_stats = time.monotonic() + stats_interval
+    while not (stop is not None and stop.is_set()):
+        if dispatcher.qsize():
+            for _ in range(window - outlet.qsize()):
+                job = dispatcher.get(block=False)
+                outlet.publish(job)
+                intake.ack(held.pop(id(job)))
+                forwarded += 1
+                if not dispatcher.qsize():
+                    break
+        delivery = intake.get(timeout=poll_timeout)
+        if delivery is not None:
+            held[id(delivery.job)] = delivery
+            dispatcher.put(delivery.job)
+        if time.monotonic() >= next_stats:
+            logger.info("Queue wait by duration: %s", dispatcher.stats())
+            next_stats = time.monotonic() + stats_interval
+    return forwarded
+
+def _dispatcher_main(broker_url: str, window: int, intake_prefetch: int, stop, options: Dict[str, Any]) -> None:
+    """Entry point of the dispatcher process"""
+    intake_broker = connect_broker(broker_url, INTAKE_QUEUE)
+    outlet = connect_broker(broker_url)
+    intake = intake_broker.consumer(intake_prefetch)
+    try:
+        run_dispatcher(intake, outlet, FairDispatcher(**options), window, stop)
+    finally:
+        intake.close()
+        intake_broker.close()
+        outlet.close()
@@ -0,0 +1,217 @@
+from models.request import PRICE_PER_SECOND
+from services.crud.request import find_cached_transcript, set_request_result
+from services.crud.transcript import save_segment
+from services.storage import ContentStore, get_content_store, transcript_cache
+from services.jobs.broker import Consumer, TranscriptionJob, connect_broker
+from services.jobs.scheduler import _dispatcher_main
+from sqlmodel import Session
+from multiprocessing import Event, Process
+from typing import Any, Callable, Dict, List, Optional, Union
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 5.0 # s, multiplied by the attempt number
+
+FileTranscriber = Callable[[str], str]
+# Takes the audio path and a callback receiving every finished segment
+SegmentedTranscriber = Callable[[str, Callable], str]
+
+def process_job(
+    job: TranscriptionJob,
+    transcribe: Union[FileTranscriber, SegmentedTranscriber],
+    session: Session,
+    model_version: Optional[str] = None,
+    segmented: bool = False,
+    store: Optional[ContentStore] = None
+) -> bool:
+    """
+    Transcribe one job and write transcript and cost back with a single UPDATE.
+    
+    Audio already transcribed by the same model version (same content
+    hash) reuses the earlier transcript instead of running inference.
+    With a content store the audio is read from the store by its hash, so
+    the worker does not depend on the path the API saw.
+    
+    Args:
+        job: Job to process
+        transcribe: Callable turning an audio path into text
+        session: Database session
+        model_version: Version of the model behind transcribe
+        segmented: transcribe is a SegmentedTranscriber; every finished
+            segment is committed as a partial transcript right away
+        store: Content store holding the uploaded audio
+    
+    Returns:
+        bool: False if the request no longer exists
+    """
+    audio = job.audio
+    if store is not None and job.audio_hash and store.exists(job.audio_hash):
+        audio = store.path(job.audio_hash)
+    transcript = None
+    if job.audio_hash and model_version:
+        transcript = find_cached_transcript(job.audio_hash, model_version, session)
+    if transcript is None:
+        if segmented:
+            transcript = transcribe(audio, lambda partial: save_segment(
+                job.request_id, partial.index, partial.start_s, partial.end_s, partial.text, session
+            ))
+        else:
+            transcript = transcribe(audio)
+        if job.audio_hash and model_version:
+            transcript_cache.put(job.audio_hash, model_version, transcript)
+    cost = job.duration * PRICE_PER_SECOND
+    return set_request_result(job.request_id, transcript, cost, session, model_version)
+
+def run_worker(
+    consumer: Consumer,
+    transcribe: Union[FileTranscriber, SegmentedTranscriber],
+    session_factory: Callable[[], Session],
+    stop: Optional[Event] = None,
+    poll_timeout: float = 1.0,
+    max_jobs: Optional[int] = None,
+    model_version: Optional[str] = None,
+    segmented: bool = False,
+    store: Optional[ContentStore] = None,
+    max_attempts: int = MAX_ATTEMPTS,
+    retry_delay: float = RETRY_DELAY
+) -> int:
+    """
+    Consume jobs until stop is set (or max_jobs are processed).
+    
+    A job is acked after its result is committed, so a crashed worker's jobs
+    are redelivered. A failing job is logged and queued again after a
+    growing delay, since the cause may be transient (database or storage
+    outage); after max_attempts it goes to the dead-letter queue.
+    
+    Args:
+        consumer: Consumer with the worker's prefetch
+        transcribe: Callable turning an audio path into text
+        session_factory: Creates a database session
+        stop: Event that ends the loop
+        poll_timeout: How long to wait for a job before checking stop (s)
+        max_jobs: Stop after this many jobs
+        model_version: Version of the model behind transcribe
+        segmented: transcribe publishes partial transcripts, see process_job
+        store: Content store holding the uploaded audio, see process_job
+        max_attempts: Attempts before a failing job is dead-lettered
+        retry_delay: Wait before queueing a failed job again, times its attempt number (s)
+    
+    Returns:
+        int: Number of processed jobs
+    """
+    processed = 0
+    while not (stop is not None and stop.is_set()) and (max_jobs is None or processed < max_jobs):
+        delivery = consumer.get(timeout=poll_timeout)
+        if delivery is None:
+            continue
+        try:
+            with session_factory() as session:
+                process_job(delivery.job, transcribe, session, model_version, segmented, store)
+            consumer.ack(delivery)
+        except Exception:
+            attempt = delivery.job.attempts + 1
+            logger.exception("Transcription of request %s failed (attempt %s of %s)", delivery.job.request_id, attempt, max_attempts)
+            if attempt < max_attempts:
+                time.sleep(retry_delay * attempt)
+                consumer.retry(delivery)
+            else:
+                consumer.dead_letter(delivery)
+        processed += 1
+    return processed
+
+def _worker_main(broker_url: str, transcriber_spec: str, prefetch: int, stop: Event, model_version: Optional[str]) -> None:
+    """Entry point of a worker process: everything is created after the process starts"""
+    from database.config import get_settings
+    from database.database import get_database_engine
+    from services.transcription.pipeline import SAMPLE_RATE, load_audio, load_transcriber, transcribe_in_segments
+    
+    transcriber = load_transcriber(transcriber_spec)
+    broker = connect_broker(broker_url)
+    consumer = broker.consumer(prefetch)
+    try:
+        run_worker(
+            consumer,
+            lambda audio, on_segment: transcribe_in_segments(load_audio(audio), SAMPLE_RATE, transcriber, on_segment),
+            lambda: Session(get_database_engine()),
+            stop,
+            model_version=model_version,
+            segmented=True,
+            store=get_content_store() if get_settings().AUDIO_STORE_DIR else None
+        )
+    finally:
+        consumer.close()
+        broker.close()
+
+class WorkerPool:
+    """
+    Worker processes consuming transcription jobs from a shared broker.
+    
+    With scheduled=True a dispatcher process moves jobs from the intake
+    queue (where the API must publish, connect_broker(url, INTAKE_QUEUE))
+    to the worker queue in FairDispatcher order: shortest jobs first,
+    fair share per user, aging. Workers should then use prefetch=1, since
+    prefetched jobs are no longer reordered.
+    
+    Attributes:
+        broker_url (str): AMQP URL every worker connects to
+        transcriber_spec (str): "package.module:factory" of the model
+        workers (int): Number of processes
+        prefetch (int): Unacked jobs per worker
+        model_version (Optional[str]): Version of the model, enables transcript reuse
+        scheduled (bool): Run the dispatcher stage
+        intake_prefetch (int): Jobs the dispatcher holds and reorders at a time
+        dispatcher_options (Dict[str, Any]): FairDispatcher arguments
+    """
+    def __init__(
+        self,
+        broker_url: str,
+        transcriber_spec: str,
+        workers: int = 2,
+        prefetch: int = 2,
+        model_version: Optional[str] = None,
+        scheduled: bool = False,
+        intake_prefetch: int = 1000,
+        dispatcher_options: Optional[Dict[str, Any]] = None
+    ) -> None:
+        if broker_url is None or broker_url.startswith("local://"):
+            raise ValueError("Worker processes need a shared broker, e.g. RabbitMQ")
+        self.broker_url = broker_url
+        self.transcriber_spec = transcriber_spec
+        self.workers = workers
+        self.prefetch = prefetch
+        self.model_version = model_version
+        self.scheduled = scheduled
+        self.intake_prefetch = intake_prefetch
+        self.dispatcher_options = dict(dispatcher_options or {})
+        self._stop = Event()
+        self._processes: List[Process] = []
+    
+    def start(self) -> None:
+        if self.scheduled:
+            process = Process(
+                target=_dispatcher_main,
+                args=(self.broker_url, self.workers, self.intake_prefetch, self._stop, self.dispatcher_options),
+                name="transcription-dispatcher",
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+        for index in range(self.workers):
+            process = Process(
+                target=_worker_main,
+                args=(self.broker_url, self.transcriber_spec, self.prefetch, self._stop, self.model_version),
+                name=f"transcription-worker-{index}",
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+    
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Let workers finish their current job and exit"""
+        self._stop.set()
+        for process in self._processes:
+            process.join(timeout)
+        self._processes = []
@@ -0,0 +1,275 @@
+from models.user import User
+from models.transaction import Transaction
+from models.hold import CreditHold, HoldStatus
+from sqlmodel import Session, select
+from sqlalchemy import Integer, insert, literal, update
+from datetime import datetime
+from typing import Optional
+from services.cache import UserCache, user_cache
+
+class InsufficientFundsError(ValueError):
+    """Raised when user's balance does not cover the requested amount"""
+
+_TRANSACTION_COLUMNS = ["user_id", "request_id", "transaction_size", "actual_balance", "created_at"]
+
+def _insert_transaction(source, size):
+    """
+    INSERT of a transaction row for every row of source.
+    
+    Args:
+        source: CTE with id (user id), request_id and actual_balance columns
+        size: Signed transaction size (negative for debits)
+    """
+    rows = select(
+        source.c.id,
+        source.c.request_id,
+        literal(size),
+        source.c.actual_balance,
+        literal(datetime.utcnow())
+    )
+    return insert(Transaction).from_select(_TRANSACTION_COLUMNS, rows).returning(*Transaction.__table__.columns)
+
+def _change_balance(user_id: int, amount: float, request_id: Optional[int], session: Session) -> Transaction:
+    """
+    Add amount to user's balance and record the transaction in one statement.
+    
+    Negative amounts only apply if the balance covers them; the
+    conditional UPDATE takes the user row lock just for this statement.
+    """
+    changed = update(User).where(User.id == user_id)
+    if amount < 0:
+        changed = changed.where(User.actual_balance >= -amount)
+    changed = (
+        changed.values(actual_balance=User.actual_balance + amount)
+        .returning(User.id, literal(request_id, Integer).label("request_id"), User.actual_balance)
+        .cte("changed")
+    )
+    statement = select(Transaction).from_statement(_insert_transaction(changed, amount))
+    transaction = session.exec(statement).first()
+    if transaction is None:
+        if amount < 0:
+            raise InsufficientFundsError(f"User {user_id} not found or balance is below {-amount}")
+        raise ValueError(f"User {user_id} not found")
+    return transaction
+
+def debit(
+    user_id: int,
+    cost: float,
+    session: Session,
+    request_id: Optional[int] = None,
+    cache: Optional[UserCache] = user_cache
+) -> Transaction:
+    """
+    Charge user immediately.
+    
+    Runs WITH changed AS (UPDATE user ... WHERE actual_balance >= cost
+    RETURNING ...) INSERT INTO transaction ... as a single statement, so
+    concurrent debits cannot overdraw the balance and need no explicit locks.
+    
+    Args:
+        user_id: User to charge
+        cost: Positive amount of credits
+        session: Database session
+        request_id: Request the charge is for
+        cache: User cache to invalidate
+    
+    Returns:
+        Transaction: Recorded transaction with the balance after the debit
+    
+    Raises:
+        InsufficientFundsError: If user is missing or balance is too low
+    """
+    if cost <= 0:
+        raise ValueError("Cost must be positive")
+    try:
+        transaction = _change_balance(user_id, -cost, request_id, session)
+        session.commit()
+        if cache is not None:
+            cache.invalidate(user_id)
+        return transaction
+    except Exception as e:
+        session.rollback()
+        raise
+
+def credit(user_id: int, amount: float, session: Session, cache: Optional[UserCache] = user_cache) -> Transaction:
+    """
+    Top up user's balance.
+    
+    Args:
+        user_id: User to top up
+        amount: Positive amount of credits
+        session: Database session
+        cache: User cache to invalidate
+    
+    Returns:
+        Transaction: Recorded transaction with the balance after the top-up
+    
+    Raises:
+        ValueError: If amount is not positive or user is missing
+    """
+    if amount <= 0:
+        raise ValueError("Amount must be positive")
+    try:
+        transaction = _change_balance(user_id, amount, None, session)
+        session.commit()
+        if cache is not None:
+            cache.invalidate(user_id)
+        return transaction
+    except Exception as e:
+        session.rollback()
+        raise
+
+def reserve(
+    user_id: int,
+    amount: float,
+    session: Session,
+    request_id: Optional[int] = None,
+    cache: Optional[UserCache] = user_cache
+) -> CreditHold:
+    """
+    Reserve credits for an in-flight transcription.
+    
+    The amount leaves the available balance immediately (conditional
+    UPDATE) and an open hold row is inserted in the same statement.
+    
+    Args:
+        user_id: User to reserve credits from
+        amount: Positive amount of credits, usually the estimated price
+        session: Database session
+        request_id: Request the credits are reserved for
+        cache: User cache to invalidate
+    
+    Returns:
+        CreditHold: Open hold
+    
+    Raises:
+        InsufficientFundsError: If user is missing or balance is too low
+    """
+    if amount <= 0:
+        raise ValueError("Amount must be positive")
+    try:
+        reserved = (
+            update(User)
+            .where(User.id == user_id, User.actual_balance >= amount)
+            .values(actual_balance=User.actual_balance - amount)
+            .returning(User.id)
+            .cte("reserved")
+        )
+        rows = select(
+            reserved.c.id,
+            literal(request_id, Integer),
+            literal(amount),
+            literal(HoldStatus.HELD.value),
+            literal(datetime.utcnow())
+        )
+        statement = (
+            insert(CreditHold)
+            .from_select(["user_id", "request_id", "amount", "status", "created_at"], rows)
+            .returning(*CreditHold.__table__.columns)
+        )
+        hold = session.exec(select(CreditHold).from_statement(statement)).first()
+        if hold is None:
+            raise InsufficientFundsError(f"User {user_id} not found or balance is below {amount}")
+        session.commit()
+        if cache is not None:
+            cache.invalidate(user_id)
+        return hold
+    except Exception as e:
+        session.rollback()
+        raise
+
+def settle(hold_id: int, cost: float, session: Session, cache: Optional[UserCache] = user_cache) -> Optional[Transaction]:
+    """
+    Close a hold charging the final cost and returning the rest of it.
+    
+    Closing the hold, refunding the difference and recording the
+    transaction run as one statement; the status check makes it safe to
+    retry, a hold can be settled only once. A cost of 0 returns the whole
+    amount without recording a transaction.
+    
+    Args:
+        hold_id: Open hold
+        cost: Final cost, from 0 to the held amount
+        session: Database session
+        cache: User cache to invalidate
+    
+    Returns:
+        Optional[Transaction]: Recorded charge with the balance after
+            settlement; None if cost is 0
+    
+    Raises:
+        ValueError: If the hold is missing, already closed or smaller than cost
+    """
+    if cost < 0:
+        raise ValueError("Cost must not be negative")
+    try:
+        closed = (
+            update(CreditHold)
+            .where(
+                CreditHold.id == hold_id,
+                CreditHold.status == HoldStatus.HELD.value,
+                CreditHold.amount >= cost
+            )
+            .values(status=HoldStatus.SETTLED.value)
+            .returning(CreditHold.user_id, CreditHold.request_id, CreditHold.amount)
+            .cte("closed")
+        )
+        refunded = (
+            update(User)
+            .where(User.id == closed.c.user_id)
+            .values(actual_balance=User.actual_balance + closed.c.amount - cost)
+        )
+        if cost > 0:
+            refunded = refunded.returning(User.id, closed.c.request_id, User.actual_balance).cte("refunded")
+            statement = select(Transaction).from_statement(_insert_transaction(refunded, -cost))
+            transaction = session.exec(statement).first()
+            user_id = transaction.user_id if transaction is not None else None
+        else:
+            row = session.execute(refunded.returning(User.id).add_cte(closed)).first()
+            transaction = None
+            user_id = row.id if row is not None else None
+        if user_id is None:
+            raise ValueError(f"Hold {hold_id} not found, already closed or smaller than {cost}")
+        session.commit()
+        if cache is not None:
+            cache.invalidate(user_id)
+        return transaction
+    except Exception as e:
+        session.rollback()
+        raise
+
+def release(hold_id: int, session: Session, cache: Optional[UserCache] = user_cache) -> bool:
+    """
+    Close a hold without charging, returning the whole amount.
+    
+    Args:
+        hold_id: Open hold
+        session: Database session
+        cache: User cache to invalidate
+    
+    Returns:
+        bool: True if released, False if the hold is missing or already closed
+    """
+    try:
+        closed = (
+            update(CreditHold)
+            .where(CreditHold.id == hold_id, CreditHold.status == HoldStatus.HELD.value)
+            .values(status=HoldStatus.RELEASED.value)
+            .returning(CreditHold.user_id, CreditHold.amount)
+            .cte("closed")
+        )
+        statement = (
+            update(User)
+            .where(User.id == closed.c.user_id)
+            .values(actual_balance=User.actual_balance + closed.c.amount)
+            .returning(User.id)
+            .add_cte(closed)
+        )
+        row = session.execute(statement).first()
+        session.commit()
+        if row is not None and cache is not None:
+            cache.invalidate(row.id)
+        return row is not None
+    except Exception as e:
+        session.rollback()
+        raise
@@ -0,0 +1,264 @@
+from models.request import Request
+from models.transcript import RequestTranscript
+from services.crud.pagination import MAX_PAGE_SIZE
+from sqlmodel import select
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+import math
+import re
+import threading
+
+SEARCH_CONFIG = "simple"  # text search configuration, e.g. "english" or "russian"
+
+_TOKEN = re.compile(r"\w+")
+
+@dataclass(frozen=True)
+class SearchHit:
+    """
+    One request matching a transcript search.
+    
+    Attributes:
+        request_id (int): Matching request
+        user_id (Optional[int]): Owner of the request
+        rank (float): Relevance, higher is better
+    """
+    request_id: int
+    user_id: Optional[int]
+    rank: float
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased words of text"""
+    return _TOKEN.findall(text.lower())
+
+def uses_postgres(session) -> bool:
+    """True if the session talks to PostgreSQL, where search runs on tsvector columns"""
+    return session.get_bind().dialect.name == "postgresql"
+
+class LocalSearchIndex:
+    """
+    In-memory inverted index with BM25 ranking.
+    
+    Stand-in for the PostgreSQL tsvector index on databases without full
+    text search (SQLite in tests). A query matches documents containing all
+    of its words.
+    
+    Attributes:
+        k1 (float): BM25 term frequency saturation
+        b (float): BM25 document length normalization
+    """
+    def __init__(self, k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._lengths: Dict[int, int] = {}
+        self._terms: Dict[int, List[str]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._lengths)
+    
+    def add(self, doc_id: int, text: str) -> None:
+        """Index text under doc_id, replacing an earlier version"""
+        counts: Dict[str, int] = defaultdict(int)
+        words = tokenize(text)
+        for word in words:
+            counts[word] += 1
+        with self._lock:
+            self._remove(doc_id)
+            for word, count in counts.items():
+                self._postings[word][doc_id] = count
+            self._terms[doc_id] = list(counts)
+            self._lengths[doc_id] = len(words)
+            self._total_length += len(words)
+    
+    def remove(self, doc_id: int) -> None:
+        """Drop doc_id from the index"""
+        with self._lock:
+            self._remove(doc_id)
+    
+    def clear(self) -> None:
+        """Drop every document"""
+        with self._lock:
+            self._postings.clear()
+            self._lengths.clear()
+            self._terms.clear()
+            self._total_length = 0
+    
+    def _remove(self, doc_id: int) -> None:
+        length = self._lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_length -= length
+        for word in self._terms.pop(doc_id):
+            postings = self._postings[word]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[word]
+    
+    def search(self, query: str) -> List[Tuple[int, float]]:
+        """
+        Rank documents containing every word of query.
+        
+        Args:
+            query: Words to look for
+        
+        Returns:
+            List[Tuple[int, float]]: (doc_id, score) pairs, best first
+        """
+        words = set(tokenize(query))
+        if not words:
+            return []
+        with self._lock:
+            postings = [self._postings.get(word, {}) for word in words]
+            if not all(postings):
+                return []
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates.intersection_update(posting)
+            documents = len(self._lengths)
+            average = self._total_length / documents if documents else 0.0
+            scores: Dict[int, float] = defaultdict(float)
+            for posting in postings:
+                idf = math.log(1 + (documents - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id in candidates:
+                    frequency = posting[doc_id]
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / (average or 1))
+                    scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+transcript_index = LocalSearchIndex()
+
+_PENDING = "search_index_pending"  # Session.info key of local index changes waiting for the commit
+
+def _pending(session) -> List[Tuple[LocalSearchIndex, Optional[int], Optional[str]]]:
+    session = getattr(session, "sync_session", session)
+    return session.info.setdefault(_PENDING, [])
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session) -> None:
+    for index, doc_id, text in session.info.pop(_PENDING, []):
+        if doc_id is None:
+            index.clear()
+        elif text is None:
+            index.remove(doc_id)
+        else:
+            index.add(doc_id, text)
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_pending(session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_PENDING, None)  # rolled back, or closed without committing
+
+def prepare_document(request_id: int, text: str, session, index: LocalSearchIndex = transcript_index):
+    """
+    Index a transcript that is being written.
+    
+    On PostgreSQL returns the to_tsvector() expression to store in
+    RequestTranscript.search_vector, so the GIN index is updated by the same
+    INSERT. Other databases get None and the text goes into the local index
+    when the session commits, so rolled back writes never become searchable.
+    
+    Args:
+        request_id: Transcribed request
+        text: Transcript
+        session: Database session the transcript is written with
+        index: Local index used without PostgreSQL
+    
+    Returns:
+        Value for RequestTranscript.search_vector
+    """
+    if uses_postgres(session):
+        return func.to_tsvector(SEARCH_CONFIG, text)
+    _pending(session).append((index, request_id, text))
+    return None
+
+def discard_documents(request_ids: Optional[Iterable[int]], session, index: LocalSearchIndex = transcript_index) -> None:
+    """
+    Drop the documents of requests being deleted once the session commits.
+    
+    Needed without PostgreSQL only, where deleted transcripts would
+    otherwise stay in the local index and, with reused ids, match requests
+    created later.
+    
+    Args:
+        request_ids: Deleted requests; None drops every document
+        session: Database session the requests are deleted with
+        index: Local index used without PostgreSQL
+    """
+    if uses_postgres(session):
+        return
+    pending = _pending(session)
+    if request_ids is None:
+        pending.append((index, None, None))
+    else:
+        pending.extend((index, request_id, None) for request_id in request_ids)
+
+def search_statement(query: str, user_id: Optional[int] = None, limit: int = 20, offset: int = 0):
+    """
+    SELECT of (request_id, user_id, rank) of transcripts matching query on PostgreSQL.
+    
+    The query uses web search syntax ("quoted phrases", -excluded, or);
+    matching goes through the GIN index on search_vector.
+    
+    Args:
+        query: Search query
+        user_id: Only requests of this user; None searches everyone's requests
+        limit: Page size
+        offset: Hits to skip
+    
+    Returns:
+        Select: Statement returning the page best first
+    """
+    ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+    rank = func.ts_rank_cd(RequestTranscript.search_vector, ts_query).label("rank")
+    statement = (
+        select(RequestTranscript.request_id, Request.user_id, rank)
+        .join(Request, Request.id == RequestTranscript.request_id)
+        .where(RequestTranscript.search_vector.op("@@")(ts_query))
+    )
+    if user_id is not None:
+        statement = statement.where(Request.user_id == user_id)
+    return statement.order_by(rank.desc(), RequestTranscript.request_id).limit(limit).offset(offset)
+
+def check_page(limit: int, offset: int) -> None:
+    """Validate search page bounds"""
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be from 1 to {MAX_PAGE_SIZE}")
+    if offset < 0:
+        raise ValueError("offset must not be negative")
+
+def local_hits(
+    ranked: List[Tuple[int, float]],
+    owners: Dict[int, Optional[int]],
+    user_id: Optional[int],
+    limit: int,
+    offset: int
+) -> List[SearchHit]:
+    """
+    Page of local index results that still exist and belong to user_id.
+    
+    Args:
+        ranked: Output of LocalSearchIndex.search
+        owners: user_id of every existing request among ranked
+        user_id: Only requests of this user; None keeps everyone's
+        limit: Page size
+        offset: Hits to skip
+    
+    Returns:
+        List[SearchHit]: Page of hits, best first
+    """
+    hits = [
+        SearchHit(request_id, owners[request_id], score)
+        for request_id, score in ranked
+        if request_id in owners and (user_id is None or owners[request_id] == user_id)
+    ]
+    return hits[offset:offset + limit]
+
+def owners_statement(request_ids: Iterable[int]):
+    """SELECT of (id, user_id) of the given requests"""
+    return select(Request.id, Request.user_id).where(Request.id.in_(list(request_ids)))
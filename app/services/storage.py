@@ -0,0 +1,163 @@
+from database.config import get_settings
+from dataclasses import dataclass
+from collections import OrderedDict
+from functools import lru_cache
+from typing import BinaryIO, Iterable, Optional, Tuple
+import hashlib
+import os
+import tempfile
+import threading
+
+CHUNK_SIZE = 1024 * 1024
+
+def new_hasher():
+    """Hash used for content addressing; matches audio.probe.file_digest"""
+    return hashlib.blake2b(digest_size=32)
+
+@dataclass(frozen=True)
+class StoredBlob:
+    """
+    Result of storing an upload.
+    
+    Attributes:
+        digest (str): Content hash (hex)
+        path (str): Where the blob is stored
+        size (int): Size in bytes
+        created (bool): False if the same content was already stored
+    """
+    digest: str
+    path: str
+    size: int
+    created: bool
+
+class ContentStore:
+    """
+    Stores every distinct blob once under a path derived from its hash.
+    
+    Layout is root/ab/cd/abcd... ; uploads are written to root/tmp and
+    renamed into place, so readers never see partial files.
+    
+    Attributes:
+        root (str): Storage directory
+    """
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self._tmp = os.path.join(root, "tmp")
+        os.makedirs(self._tmp, exist_ok=True)
+    
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+    
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+    
+    def open(self, digest: str) -> BinaryIO:
+        return open(self.path(digest), "rb")
+    
+    def temporary(self) -> Tuple[int, str]:
+        """Create a temporary file inside the store (same filesystem as the blobs)"""
+        return tempfile.mkstemp(dir=self._tmp)
+    
+    def commit(self, temporary_path: str, digest: str, size: int) -> StoredBlob:
+        """
+        Move a fully written temporary file to its content address.
+        
+        Args:
+            temporary_path: File created by temporary()
+            digest: Content hash of the file
+            size: Size of the file in bytes
+        
+        Returns:
+            StoredBlob: Stored blob; the temporary file is dropped if the content already exists
+        """
+        target = self.path(digest)
+        if os.path.exists(target):
+            os.remove(temporary_path)
+            return StoredBlob(digest, target, size, False)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(temporary_path, target)
+        return StoredBlob(digest, target, size, True)
+    
+    def put_stream(self, chunks: Iterable[bytes]) -> StoredBlob:
+        """
+        Store an upload given as chunks, hashing it while it is written.
+        
+        Args:
+            chunks: Upload content
+        
+        Returns:
+            StoredBlob: Stored blob
+        """
+        hasher = new_hasher()
+        size = 0
+        descriptor, temporary_path = self.temporary()
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                for chunk in chunks:
+                    hasher.update(chunk)
+                    file.write(chunk)
+                    size += len(chunk)
+            return self.commit(temporary_path, hasher.hexdigest(), size)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+    
+    def put_file(self, path: str) -> StoredBlob:
+        """Store a copy of the file at path"""
+        with open(path, "rb") as file:
+            return self.put_stream(iter(lambda: file.read(CHUNK_SIZE), b""))
+
+@lru_cache()
+def get_content_store() -> ContentStore:
+    """
+    ContentStore at settings.AUDIO_STORE_DIR, shared by the process.
+    
+    Raises:
+        ValueError: If AUDIO_STORE_DIR is not set
+    """
+    root = get_settings().AUDIO_STORE_DIR
+    if not root:
+        raise ValueError("AUDIO_STORE_DIR is not set")
+    return ContentStore(root)
+
+class TranscriptCache:
+    """
+    LRU of transcripts keyed by (audio hash, model version), bounded in characters.
+    
+    Attributes:
+        max_chars (int): Total transcript length kept in memory
+    """
+    def __init__(self, max_chars: int = 50_000_000) -> None:
+        self.max_chars = max_chars
+        self._entries: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, audio_hash: str, model_version: str) -> Optional[str]:
+        with self._lock:
+            transcript = self._entries.get((audio_hash, model_version))
+            if transcript is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end((audio_hash, model_version))
+            self.hits += 1
+            return transcript
+    
+    def put(self, audio_hash: str, model_version: str, transcript: str) -> None:
+        if len(transcript) > self.max_chars:
+            return
+        key = (audio_hash, model_version)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._chars -= len(previous)
+            self._entries[key] = transcript
+            self._chars += len(transcript)
+            while self._chars > self.max_chars:
+                _, evicted = self._entries.popitem(last=False)
+                self._chars -= len(evicted)
+
+transcript_cache = TranscriptCache()
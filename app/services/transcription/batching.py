@@ -0,0 +1,209 @@
+from concurrent.futures import Future, InvalidStateError
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+import threading
+import time
+import numpy as np
+
+BatchTranscriber = Callable[[List[np.ndarray], int], List[str]]
+
+class BatchScheduler:
+    """
+    Groups pending segments into batches for one model forward pass.
+    
+    Segments are bucketed by length, so padding a batch to its longest
+    member wastes little compute. A batch runs as soon as one bucket holds
+    max_batch_size segments, or when the oldest waiting segment has waited
+    max_wait_ms. Larger values give more throughput per core, smaller values
+    give lower latency.
+    
+    Batches only fill when segments are submitted concurrently, so a model
+    process should have one scheduler shared by all its callers. The
+    scheduler is itself a Transcriber: a factory passed to
+    pipeline.load_transcriber can return one, and the pipeline then submits
+    all segments of a recording (and of concurrent recordings) at once.
+    
+    Attributes:
+        infer_batch (BatchTranscriber): Model call taking (list of samples, sample_rate), returning texts
+        sample_rate (int): Sample rate of submitted segments (Hz)
+        max_batch_size (int): Segments per forward pass
+        max_wait_ms (float): Longest time a segment waits for its batch to fill
+        bucket_s (float): Width of a length bucket (s)
+        max_queue (int): Pending segments above which submit blocks
+    """
+    def __init__(
+        self,
+        infer_batch: BatchTranscriber,
+        sample_rate: int = 16000,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 20.0,
+        bucket_s: float = 5.0,
+        max_queue: int = 1024
+    ) -> None:
+        if max_batch_size < 1 or max_queue < max_batch_size:
+            raise ValueError("Expected 1 <= max_batch_size <= max_queue")
+        self.infer_batch = infer_batch
+        self.sample_rate = sample_rate
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.bucket_s = bucket_s
+        self.max_queue = max_queue
+        
+        self._buckets: Dict[int, Deque[Tuple[float, np.ndarray, Future]]] = {}
+        self._pending = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+        self._batches = 0
+        self._batched_segments = 0
+        self._padded_samples = 0
+        self._total_samples = 0
+        self._max_queue_depth = 0
+        self._wait_s = 0.0
+        
+        self._thread = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+        self._thread.start()
+    
+    def __enter__(self) -> "BatchScheduler":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def submit(self, samples: np.ndarray) -> "Future[str]":
+        """
+        Queue a segment for transcription.
+        
+        Blocks while max_queue segments are pending (backpressure).
+        
+        Args:
+            samples: Mono float32 samples at sample_rate
+        
+        Returns:
+            Future[str]: Transcript of the segment
+        """
+        future: "Future[str]" = Future()
+        bucket = int(len(samples) / self.sample_rate // self.bucket_s)
+        with self._condition:
+            while self._pending >= self.max_queue and not self._closed:
+                self._condition.wait()
+            if self._closed:
+                raise RuntimeError("Scheduler is closed")
+            self._buckets.setdefault(bucket, deque()).append((time.monotonic(), samples, future))
+            self._pending += 1
+            self._submitted += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._pending)
+            self._condition.notify_all()
+        return future
+    
+    def transcribe(self, samples: np.ndarray, sample_rate: Optional[int] = None) -> str:
+        """Transcribe one segment waiting for its batch; usable as a pipeline Transcriber"""
+        if sample_rate is not None and sample_rate != self.sample_rate:
+            raise ValueError(f"Expected {self.sample_rate} Hz samples")
+        return self.submit(samples).result()
+    
+    __call__ = transcribe
+    
+    def close(self) -> None:
+        """Run what is queued and stop the scheduler thread"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+    
+    def stats(self) -> Dict[str, float]:
+        """
+        Queue and batching metrics.
+        
+        Returns:
+            Dict[str, float]: queue_depth, max_queue_depth, submitted, completed,
+                failed, cancelled, batches, mean_batch_size, padding_ratio (share of padded
+                samples in executed batches), mean_wait_ms
+        """
+        with self._condition:
+            return {
+                "queue_depth": self._pending,
+                "max_queue_depth": self._max_queue_depth,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "cancelled": self._cancelled,
+                "batches": self._batches,
+                "mean_batch_size": self._batched_segments / self._batches if self._batches else 0.0,
+                "padding_ratio": self._padded_samples / self._total_samples if self._total_samples else 0.0,
+                "mean_wait_ms": 1000 * self._wait_s / self._batched_segments if self._batched_segments else 0.0,
+            }
+    
+    def _next_batch(self) -> List[Tuple[float, np.ndarray, Future]]:
+        """Wait until a batch is due and take it out of its bucket; empty list on shutdown"""
+        with self._condition:
+            while True:
+                if self._pending:
+                    full = [key for key, items in self._buckets.items() if len(items) >= self.max_batch_size]
+                    oldest = min(self._buckets, key=lambda key: self._buckets[key][0][0])
+                    waited = time.monotonic() - self._buckets[oldest][0][0]
+                    if full or self._closed or waited * 1000 >= self.max_wait_ms:
+                        key = full[0] if full else oldest
+                        items = self._buckets[key]
+                        batch = [items.popleft() for _ in range(min(self.max_batch_size, len(items)))]
+                        if not items:
+                            del self._buckets[key]
+                        self._pending -= len(batch)
+                        self._condition.notify_all()
+                        return batch
+                    self._condition.wait(self.max_wait_ms / 1000 - waited)
+                elif self._closed:
+                    return []
+                else:
+                    self._condition.wait()
+    
+    @staticmethod
+    def _resolve(future: Future, text: Optional[str] = None, error: Optional[BaseException] = None) -> bool:
+        """Set a result or exception unless the future is already done; True if it was set"""
+        try:
+            if error is None:
+                future.set_result(text)
+            else:
+                future.set_exception(error)
+            return True
+        except InvalidStateError:
+            return False
+    
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            # Futures cancelled by their callers while queued are dropped here;
+            # the others can no longer be cancelled
+            running = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if len(running) < len(batch):
+                with self._condition:
+                    self._cancelled += len(batch) - len(running)
+            batch = running
+            if not batch:
+                continue
+            started = time.monotonic()
+            segments = [samples for _, samples, _ in batch]
+            longest = max(len(samples) for samples in segments)
+            try:
+                texts = self.infer_batch(segments, self.sample_rate)
+                if len(texts) != len(batch):
+                    raise RuntimeError(f"infer_batch returned {len(texts)} texts for {len(batch)} segments")
+                failed = sum(not self._resolve(future, text) for (_, _, future), text in zip(batch, texts))
+            except Exception as e:
+                failed = len(batch)
+                for _, _, future in batch:
+                    self._resolve(future, error=e)
+            with self._condition:
+                self._batches += 1
+                self._batched_segments += len(batch)
+                self._completed += len(batch) - failed
+                self._failed += failed
+                self._total_samples += longest * len(batch)
+                self._padded_samples += sum(longest - len(samples) for samples in segments)
+                self._wait_s += sum(started - enqueued for enqueued, _, _ in batch)
@@ -0,0 +1,327 @@
+from models.request import Request
+from audio.segment import Segment, plan_segments
+from audio.preprocess import preprocess
+from services.crud.transcript import save_segment, save_transcript
+from services.transcription.batching import BatchScheduler
+from sqlmodel import Session
+from concurrent.futures import ProcessPoolExecutor
+from importlib import import_module
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional
+import re
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+Transcriber = Callable[[np.ndarray, int], str]
+
+def load_transcriber(spec: str) -> Transcriber:
+    """
+    Build a transcriber from a "package.module:factory" string.
+    
+    The factory is called without arguments and must return a callable
+    taking (samples, sample_rate) and returning text. It runs once per
+    worker process, so the model is loaded once per process.
+    
+    Args:
+        spec: Import path of the factory
+    
+    Returns:
+        Transcriber: Ready to use transcriber
+    """
+    module_name, _, factory_name = spec.partition(":")
+    if not module_name or not factory_name:
+        raise ValueError("Transcriber spec must look like 'package.module:factory'")
+    factory = getattr(import_module(module_name), factory_name)
+    return factory()
+
+def load_audio(path: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Decode audio file into normalized mono float32 samples at sample_rate.
+    
+    PCM WAV files are memory-mapped and converted block by block, other
+    formats are decoded with pydub and converted without extra copies.
+    """
+    return preprocess(path, target_rate=sample_rate)
+
+_worker_transcriber: Optional[Transcriber] = None
+
+def _init_worker(spec: str) -> None:
+    global _worker_transcriber
+    _worker_transcriber = load_transcriber(spec)
+
+def _texts(transcriber: Transcriber, segments: List[np.ndarray], sample_rate: int) -> Iterator[str]:
+    """
+    Texts of segments in order.
+    
+    A BatchScheduler gets all segments before the first result is awaited,
+    so they share batches; other transcribers run them one by one.
+    """
+    if isinstance(transcriber, BatchScheduler):
+        if sample_rate != transcriber.sample_rate:
+            raise ValueError(f"Expected {transcriber.sample_rate} Hz samples")
+        futures = [transcriber.submit(samples) for samples in segments]
+        for future in futures:
+            yield future.result()
+    else:
+        for samples in segments:
+            yield transcriber(samples, sample_rate)
+
+def _transcribe_segments(segments: List[np.ndarray], sample_rate: int) -> List[str]:
+    return list(_texts(_worker_transcriber, segments, sample_rate))
+
+_WORD = re.compile(r"\w+")
+
+def _normalize(word: str) -> str:
+    return "".join(_WORD.findall(word.lower()))
+
+class Stitcher:
+    """
+    Joins transcripts of consecutive overlapping segments as they arrive.
+    
+    For every next text the longest run of words that ends the transcript
+    so far and starts the next text (ignoring case and punctuation, at most
+    max_overlap_words) is kept only once.
+    
+    Attributes:
+        max_overlap_words (int): Longest overlap to look for
+        words (List[str]): Transcript so far
+    """
+    def __init__(self, max_overlap_words: int = 20) -> None:
+        self.max_overlap_words = max_overlap_words
+        self.words: List[str] = []
+    
+    def add(self, text: str) -> str:
+        """Append the next segment's text and return the words it added"""
+        following = text.split()
+        keys = [_normalize(word) for word in following]
+        tail = [_normalize(word) for word in self.words[-self.max_overlap_words:]]
+        overlap = 0
+        for size in range(min(len(tail), len(keys)), 0, -1):
+            if tail[-size:] == keys[:size]:
+                overlap = size
+                break
+        added = following[overlap:]
+        self.words.extend(added)
+        return " ".join(added)
+    
+    @property
+    def text(self) -> str:
+        return " ".join(self.words)
+
+def stitch(texts: List[str], max_overlap_words: int = 20) -> str:
+    """
+    Join transcripts of overlapping segments dropping the repeated words.
+    
+    Args:
+        texts: Transcripts of consecutive segments
+        max_overlap_words: Longest overlap to look for, see Stitcher
+    
+    Returns:
+        str: Joined transcript
+    """
+    stitcher = Stitcher(max_overlap_words)
+    for text in texts:
+        stitcher.add(text)
+    return stitcher.text
+
+@dataclass(frozen=True)
+class PartialTranscript:
+    """
+    Result of one finished segment, published before the whole recording is done.
+    
+    Attributes:
+        index (int): Position of the segment in the recording
+        start_s (float): Segment start (s)
+        end_s (float): Segment end (s)
+        text (str): Words the segment adds to the transcript (overlap removed)
+    """
+    index: int
+    start_s: float
+    end_s: float
+    text: str
+
+SegmentCallback = Callable[[PartialTranscript], None]
+
+def _partial(segment: Segment, sample_rate: int, text: str) -> PartialTranscript:
+    return PartialTranscript(segment.index, segment.start / sample_rate, segment.end / sample_rate, text)
+
+def transcribe_in_segments(
+    samples: np.ndarray,
+    sample_rate: int,
+    transcriber: Transcriber,
+    on_segment: Optional[SegmentCallback] = None,
+    target_segment_s: float = 30.0,
+    overlap_s: float = 1.0
+) -> str:
+    """
+    Transcribe a recording segment by segment in the current process.
+    
+    Used by queue workers, which already run one job per process; the first
+    text is ready after one segment instead of after the whole recording.
+    A BatchScheduler transcriber gets all segments at once and batches them.
+    
+    Args:
+        samples: Mono float32 samples
+        sample_rate: Sample rate (Hz)
+        transcriber: Model callable
+        on_segment: Called with every finished segment, in order
+        target_segment_s: Preferred segment length (s)
+        overlap_s: Overlap between neighbouring segments (s)
+    
+    Returns:
+        str: Stitched transcript
+    """
+    stitcher = Stitcher()
+    segments = plan_segments(
+        samples, sample_rate,
+        target_s=target_segment_s,
+        max_s=target_segment_s * 4 / 3,
+        overlap_s=overlap_s,
+        search_s=target_segment_s / 6
+    )
+    texts = _texts(transcriber, [samples[segment.start:segment.end] for segment in segments], sample_rate)
+    for segment, text in zip(segments, texts):
+        added = stitcher.add(text)
+        if on_segment is not None:
+            on_segment(_partial(segment, sample_rate, added))
+    return stitcher.text
+
+class TranscriptionPipeline:
+    """
+    Transcribes long recordings as overlapping segments on a process pool.
+    
+    Every worker process runs one task at a time, so with a batched model
+    (a factory returning a BatchScheduler) set segments_per_task to its
+    max_batch_size: each task then hands that many segments to the
+    process's scheduler at once.
+    
+    Attributes:
+        transcriber_spec (str): "package.module:factory" of the model, see load_transcriber
+        max_workers (Optional[int]): Worker processes, defaults to the number of CPUs
+        target_segment_s (float): Preferred segment length (s)
+        overlap_s (float): Overlap between neighbouring segments (s)
+        segments_per_task (int): Consecutive segments sent to a worker process together
+    """
+    def __init__(
+        self,
+        transcriber_spec: str,
+        max_workers: Optional[int] = None,
+        target_segment_s: float = 30.0,
+        overlap_s: float = 1.0,
+        segments_per_task: int = 1
+    ) -> None:
+        if segments_per_task < 1:
+            raise ValueError("segments_per_task must be positive")
+        self.transcriber_spec = transcriber_spec
+        self.max_workers = max_workers
+        self.target_segment_s = target_segment_s
+        self.overlap_s = overlap_s
+        self.segments_per_task = segments_per_task
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(transcriber_spec,)
+        )
+    
+    def __enter__(self) -> "TranscriptionPipeline":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        """Stop worker processes"""
+        self._executor.shutdown()
+    
+    def plan(self, samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> List[Segment]:
+        """Segments the recording will be split into"""
+        return plan_segments(
+            samples, sample_rate,
+            target_s=self.target_segment_s,
+            max_s=self.target_segment_s * 4 / 3,
+            overlap_s=self.overlap_s,
+            search_s=self.target_segment_s / 6
+        )
+    
+    def iter_partials(self, samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> Iterator[PartialTranscript]:
+        """
+        Transcribe all segments in parallel, yielding results in recording order.
+        
+        A segment is yielded as soon as it and every segment before it are
+        done, so the text can be shown while later segments are running.
+        
+        Args:
+            samples: Mono float32 samples
+            sample_rate: Sample rate (Hz)
+        
+        Yields:
+            PartialTranscript: Next segment's added words
+        """
+        segments = self.plan(samples, sample_rate)
+        tasks = [segments[start:start + self.segments_per_task] for start in range(0, len(segments), self.segments_per_task)]
+        futures = [
+            self._executor.submit(_transcribe_segments, [samples[segment.start:segment.end] for segment in task], sample_rate)
+            for task in tasks
+        ]
+        stitcher = Stitcher()
+        for task, future in zip(tasks, futures):
+            for segment, text in zip(task, future.result()):
+                yield _partial(segment, sample_rate, stitcher.add(text))
+    
+    def transcribe_samples(
+        self,
+        samples: np.ndarray,
+        sample_rate: int = SAMPLE_RATE,
+        on_segment: Optional[SegmentCallback] = None
+    ) -> str:
+        """
+        Transcribe mono samples, all segments in parallel.
+        
+        Args:
+            samples: Mono float32 samples
+            sample_rate: Sample rate (Hz)
+            on_segment: Called with every finished segment, in order
+        
+        Returns:
+            str: Stitched transcript
+        """
+        texts = []
+        for partial in self.iter_partials(samples, sample_rate):
+            if on_segment is not None:
+                on_segment(partial)
+            if partial.text:
+                texts.append(partial.text)
+        return " ".join(texts)
+    
+    def transcribe(self, path: str, on_segment: Optional[SegmentCallback] = None) -> str:
+        """Transcribe the audio file at path"""
+        return self.transcribe_samples(load_audio(path), on_segment=on_segment)
+    
+    def transcribe_request(
+        self,
+        request: Request,
+        session: Session,
+        on_segment: Optional[SegmentCallback] = None
+    ) -> Request:
+        """
+        Transcribe request's audio and store the result as its RequestTranscript.
+        
+        Every finished segment is committed as a TranscriptSegment right
+        away, so clients can stream the text while the rest is running.
+        
+        Args:
+            request: Request to transcribe
+            session: Database session
+            on_segment: Called with every finished segment after it is stored
+        
+        Returns:
+            Request: Transcribed request
+        """
+        def store(partial: PartialTranscript) -> None:
+            save_segment(request.id, partial.index, partial.start_s, partial.end_s, partial.text, session)
+            if on_segment is not None:
+                on_segment(partial)
+        
+        save_transcript(request.id, self.transcribe(request.audio, store), session)
+        return request
@@ -0,0 +1,108 @@
+from services.crud_async.transcript import get_segments, get_transcript, transcript_ready
+from sqlmodel.ext.asyncio.session import AsyncSession
+from dataclasses import dataclass, asdict
+from typing import AsyncIterator, Callable, Optional
+import asyncio
+import json
+import time
+
+SEGMENT_EVENT = "segment"
+DONE_EVENT = "done"
+TIMEOUT_EVENT = "timeout"
+
+@dataclass(frozen=True)
+class TranscriptEvent:
+    """
+    One message of a transcript stream.
+    
+    Attributes:
+        event (str): SEGMENT_EVENT, DONE_EVENT or TIMEOUT_EVENT
+        request_id (int): Transcribed request
+        index (Optional[int]): Segment position, None for the closing events
+        start_s (Optional[float]): Segment start (s)
+        end_s (Optional[float]): Segment end (s)
+        text (str): Words the segment adds to the transcript
+    """
+    event: str
+    request_id: int
+    index: Optional[int] = None
+    start_s: Optional[float] = None
+    end_s: Optional[float] = None
+    text: str = ""
+    
+    def to_json(self) -> str:
+        """Message body, e.g. for a WebSocket text frame"""
+        return json.dumps(asdict(self), ensure_ascii=False)
+    
+    def to_sse(self) -> str:
+        """Server-Sent Events frame; the id lets EventSource resume with Last-Event-ID"""
+        lines = [f"event: {self.event}"]
+        if self.index is not None:
+            lines.append(f"id: {self.index}")
+        lines.append(f"data: {self.to_json()}")
+        return "\n".join(lines) + "\n\n"
+
+async def stream_transcript(
+    request_id: int,
+    session_factory: Callable[[], AsyncSession],
+    after_index: Optional[int] = None,
+    poll_interval: float = 0.5,
+    timeout: Optional[float] = None
+) -> AsyncIterator[TranscriptEvent]:
+    """
+    Yield a request's partial transcripts as workers store them.
+    
+    Segments are read from the database, so it works with workers in other
+    processes or hosts. Every poll opens a short-lived session, no
+    connection is held while waiting. A request whose transcript was
+    reused from the cache has no segments and gets its text as a single
+    segment. The stream ends with a DONE_EVENT, or TIMEOUT_EVENT when
+    timeout runs out first.
+    
+    Args:
+        request_id: Request to follow
+        session_factory: Creates an async database session
+        after_index: Last segment the client already has (Last-Event-ID)
+        poll_interval: Pause between database polls (s)
+        timeout: Give up after this many seconds; None waits forever
+    
+    Yields:
+        TranscriptEvent: Next event
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    last_index = after_index
+    while True:
+        # Rows are read into memory and the session closed before yielding,
+        # so a slow consumer never holds a pooled connection
+        transcript = None
+        async with session_factory() as session:
+            # Readiness is checked first: segments committed before the
+            # final transcript are then guaranteed to be read below
+            ready = await transcript_ready(request_id, session)
+            segments = await get_segments(request_id, session, last_index)
+            if ready and last_index is None and not segments:
+                transcript = await get_transcript(request_id, session)
+        for segment in segments:
+            last_index = segment.index
+            yield TranscriptEvent(
+                SEGMENT_EVENT, request_id, segment.index, segment.start_s, segment.end_s, segment.text
+            )
+        if ready:
+            if last_index is None:
+                yield TranscriptEvent(SEGMENT_EVENT, request_id, 0, text=transcript or "")
+            yield TranscriptEvent(DONE_EVENT, request_id)
+            return
+        if deadline is not None and time.monotonic() >= deadline:
+            yield TranscriptEvent(TIMEOUT_EVENT, request_id)
+            return
+        await asyncio.sleep(poll_interval)
+
+async def sse_stream(events: AsyncIterator[TranscriptEvent]) -> AsyncIterator[str]:
+    """
+    Format events as Server-Sent Events.
+    
+    Pass the result to starlette's StreamingResponse with
+    media_type="text/event-stream".
+    """
+    async for event in events:
+        yield event.to_sse()
@@ -0,0 +1,55 @@
+import os
+import sys
+
+# Modules import each other from the app directory, as in the container
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.hold import CreditHold
+from models.request import Request
+from models.transaction import Transaction
+from models.transcript import RequestTranscript, TranscriptSegment
+from models.user import User
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+import pytest
+
+def _enforce_foreign_keys(connection, record) -> None:
+    connection.execute("PRAGMA foreign_keys=ON")
+
+@pytest.fixture
+def engine(tmp_path):
+    """SQLite file database enforcing foreign keys, like PostgreSQL"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    event.listen(engine, "connect", _enforce_foreign_keys)
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def session(engine):
+    with Session(engine) as session:
+        yield session
+
+@pytest.fixture
+def async_session_factory(engine, tmp_path):
+    """AsyncSession factory on the database of engine; use it inside asyncio.run"""
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    event.listen(async_engine.sync_engine, "connect", _enforce_foreign_keys)
+    yield lambda: AsyncSession(async_engine)
+    async_engine.sync_engine.dispose()
+
+@pytest.fixture
+def pg_session():
+    """Session on an empty schema of the PostgreSQL database at TEST_DATABASE_URL"""
+    url = os.environ.get("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set, PostgreSQL tests are skipped")
+    engine = create_engine(url)
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    SQLModel.metadata.drop_all(engine)
+    engine.dispose()
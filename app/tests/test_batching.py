@@ -0,0 +1,82 @@
+from services.transcription.batching import BatchScheduler
+from services.transcription.pipeline import TranscriptionPipeline, transcribe_in_segments
+import threading
+import time
+import numpy as np
+import pytest
+
+def _segment(seconds: float = 1.0) -> np.ndarray:
+    return np.zeros(int(16000 * seconds), dtype=np.float32)
+
+def test_cancelled_future_does_not_stop_the_scheduler():
+    release = threading.Event()
+    started = threading.Event()
+    
+    def infer_batch(segments, sample_rate):
+        started.set()
+        release.wait(5)
+        return [f"text {len(segments)}" for _ in segments]
+    
+    with BatchScheduler(infer_batch, max_batch_size=1, max_wait_ms=0) as scheduler:
+        running = scheduler.submit(_segment())
+        assert started.wait(5)
+        queued = scheduler.submit(_segment())
+        assert not running.cancel()  # already handed to the model
+        assert queued.cancel()
+        release.set()
+        assert running.result(5) == "text 1"
+        assert scheduler.submit(_segment()).result(5) == "text 1"
+        assert scheduler.stats()["cancelled"] == 1
+
+def test_short_batch_result_fails_every_future():
+    with BatchScheduler(lambda segments, sample_rate: ["only one"], max_batch_size=2, max_wait_ms=50) as scheduler:
+        futures = [scheduler.submit(_segment()) for _ in range(2)]
+        for future in futures:
+            with pytest.raises(RuntimeError, match="1 texts for 2 segments"):
+                future.result(5)
+        assert scheduler.submit(_segment()).result(5) == "only one"
+
+def _recording_infer_batch(sizes):
+    def infer_batch(segments, sample_rate):
+        sizes.append(len(segments))
+        return [f"word{len(segment) // sample_rate}" for segment in segments]
+    return infer_batch
+
+def test_concurrent_submissions_share_batches():
+    sizes = []
+    barrier = threading.Barrier(4)
+    with BatchScheduler(_recording_infer_batch(sizes), max_batch_size=4, max_wait_ms=5000) as scheduler:
+        def caller() -> None:
+            barrier.wait()
+            scheduler.transcribe(_segment())
+        
+        threads = [threading.Thread(target=caller) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        assert sizes == [4]
+        assert scheduler.stats()["mean_batch_size"] == 4
+
+RECORDING_S = 100
+SEGMENTS = 5  # of a RECORDING_S recording cut into ~21 s segments by plan_segments
+
+def test_segments_of_a_recording_are_batched():
+    sizes = []
+    with BatchScheduler(_recording_infer_batch(sizes), max_batch_size=SEGMENTS, max_wait_ms=5000, bucket_s=60) as scheduler:
+        partials = []
+        transcribe_in_segments(_segment(RECORDING_S), 16000, scheduler, partials.append, target_segment_s=25, overlap_s=0)
+    assert sizes == [SEGMENTS]
+    assert len(partials) == SEGMENTS
+
+def _scheduler_factory():
+    return BatchScheduler(_recording_infer_batch([]), max_batch_size=SEGMENTS, max_wait_ms=5000, bucket_s=60)
+
+def test_pipeline_hands_a_task_of_segments_to_the_process_scheduler():
+    with TranscriptionPipeline(
+        f"{__name__}:_scheduler_factory", max_workers=1, target_segment_s=25, overlap_s=0, segments_per_task=SEGMENTS
+    ) as pipeline:
+        started = time.monotonic()
+        partials = list(pipeline.iter_partials(_segment(RECORDING_S)))
+    assert len(partials) == SEGMENTS
+    assert time.monotonic() - started < 5  # one full batch, not a 5 s wait per segment
@@ -0,0 +1,54 @@
+from models.user import User
+from services.crud.bulk import iter_chunks
+from services.crud.user import create_users_bulk
+from services.crud_async.user import create_users_bulk as create_users_bulk_async
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import func, select
+import asyncio
+import pytest
+
+def _users(count: int, start: int = 0):
+    return [User(email=f"user{number}@example.com", password="password1") for number in range(start, start + count)]
+
+def _count_commits(session):
+    commits = []
+    
+    @event.listens_for(session, "after_commit")
+    def record(session) -> None:
+        commits.append(session)
+    
+    return commits
+
+def test_iter_chunks_splits_lazily():
+    assert [len(chunk) for chunk in iter_chunks(iter(range(7)), 3)] == [3, 3, 1]
+    with pytest.raises(ValueError):
+        next(iter_chunks([], 0))
+
+def test_bulk_insert_commits_once_per_chunk_and_assigns_ids(session):
+    commits = _count_commits(session)
+    users = _users(250)
+    assert create_users_bulk(users, session, chunk_size=100) == 250
+    assert len(commits) == 3
+    stored = dict(session.exec(select(User.email, User.id)).all())
+    assert all(stored[user.email] == user.id for user in users)
+
+def test_chunks_before_a_failure_stay_committed(session):
+    users = _users(100) + _users(1)  # the second chunk repeats a unique email
+    with pytest.raises(IntegrityError):
+        create_users_bulk(users, session, chunk_size=100)
+    assert session.exec(select(func.count()).select_from(User)).one() == 100
+
+def test_async_bulk_insert_assigns_ids(session, async_session_factory):
+    users = _users(30)
+    
+    async def insert() -> int:
+        async with async_session_factory() as async_session:
+            return await create_users_bulk_async(users, async_session, chunk_size=7)
+    
+    assert asyncio.run(insert()) == 30
+    assert sorted(user.id for user in users) == list(range(1, 31))
+
+def test_copy_loads_large_chunks(pg_session):
+    assert create_users_bulk(_users(50), pg_session, chunk_size=20, copy_threshold=20) == 50
+    assert pg_session.exec(select(func.count()).select_from(User)).one() == 50
@@ -0,0 +1,80 @@
+from models.user import User
+from services.cache import LocalCacheBackend, UserCache
+from services.crud.user import delete_user, get_user_identity, get_user_identity_by_email
+from services.ledger import credit, debit, release, reserve, settle
+from sqlalchemy import event
+import pytest
+
+def _user(session, balance: float = 10.0) -> int:
+    user = User(email="user@example.com", password="password1", actual_balance=balance)
+    session.add(user)
+    session.commit()
+    return user.id
+
+def _count_queries(session):
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+def test_identity_is_read_through(session):
+    cache = UserCache()
+    user_id = _user(session)
+    statements = _count_queries(session)
+    assert get_user_identity(user_id, session, cache).actual_balance == 10.0
+    assert get_user_identity(user_id, session, cache).actual_balance == 10.0
+    assert get_user_identity_by_email("USER@example.com", session, cache).id == user_id
+    assert len(statements) == 1
+    assert cache.stats()["misses"] == 1
+
+def test_delete_user_invalidates(session):
+    cache = UserCache()
+    user_id = _user(session)
+    get_user_identity(user_id, session, cache)
+    assert delete_user(user_id, session, cache)
+    assert get_user_identity(user_id, session, cache) is None
+    assert cache.invalidations == 1
+
+def test_invalidation_reaches_other_processes_through_the_shared_backend(session):
+    shared = LocalCacheBackend()
+    writer = UserCache(shared)
+    reader = UserCache(shared, local_ttl=0)
+    user_id = _user(session)
+    get_user_identity(user_id, session, writer)
+    assert reader.get(user_id).actual_balance == 10.0
+    assert reader.shared_hits == 1
+    writer.invalidate(user_id, "user@example.com")
+    assert reader.get(user_id) is None
+    assert reader.get_by_email("user@example.com") is None
+
+def test_email_entry_of_a_renamed_user_is_ignored(session):
+    cache = UserCache()
+    user_id = _user(session)
+    get_user_identity(user_id, session, cache)
+    user = session.get(User, user_id)
+    user.email = "renamed@example.com"
+    session.commit()
+    cache.invalidate(user_id)  # email omitted, the stale email entry stays
+    assert get_user_identity(user_id, session, cache).email == "renamed@example.com"
+    assert cache.get_by_email("user@example.com") is None
+
+def test_ledger_writes_invalidate_the_balance(pg_session):
+    cache = UserCache()
+    user_id = _user(pg_session)
+    
+    def balance() -> float:
+        return get_user_identity(user_id, pg_session, cache).actual_balance
+    
+    assert balance() == 10.0
+    credit(user_id, 5.0, pg_session, cache)
+    assert balance() == 15.0
+    debit(user_id, 3.0, pg_session, cache=cache)
+    assert balance() == 12.0
+    hold = reserve(user_id, 4.0, pg_session, cache=cache)
+    assert balance() == 8.0
+    settle(hold.id, 1.0, pg_session, cache)
+    assert balance() == 11.0
+    hold = reserve(user_id, 2.0, pg_session, cache=cache)
+    assert balance() == 9.0
+    assert release(hold.id, pg_session, cache)
+    assert balance() == 11.0
+    assert cache.invalidations == 6
@@ -0,0 +1,65 @@
+from models.request import Request
+from models.transcript import MAX_TRANSCRIPT_LENGTH, RequestTranscript
+from services import compression
+from services.compression import CODEC_GZIP, CODEC_NONE, CODEC_ZSTD, compress_text, decompress_text
+from services.crud.transcript import get_transcript, get_transcripts, save_transcript
+from services.search import transcript_index
+from sqlmodel import select
+import pytest
+
+LONG_TEXT = "привет мир, hello world " * 200
+
+@pytest.fixture(autouse=True)
+def clear_index():
+    transcript_index.clear()
+    yield
+    transcript_index.clear()
+
+@pytest.mark.parametrize("codec", [CODEC_GZIP, CODEC_ZSTD])
+def test_round_trip(codec):
+    if codec == CODEC_ZSTD and compression.zstandard is None:
+        pytest.skip("zstandard is not installed")
+    used, data = compress_text(LONG_TEXT, codec)
+    assert used == codec
+    assert len(data) < len(LONG_TEXT.encode("utf-8")) // 10
+    assert decompress_text(used, data) == LONG_TEXT
+
+def test_short_and_incompressible_texts_are_stored_as_is(monkeypatch):
+    assert compress_text("hello") == (CODEC_NONE, b"hello")
+    monkeypatch.setattr(compression, "MIN_COMPRESS_SIZE", 0)
+    codec, data = compress_text("hello", CODEC_GZIP)
+    assert codec == CODEC_NONE
+    assert decompress_text(codec, data) == "hello"
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        compress_text(LONG_TEXT, "lz4")
+    with pytest.raises(ValueError):
+        decompress_text("lz4", b"")
+
+def test_transcript_round_trip_through_the_database(session):
+    first = Request(audio="a.wav", duration=10, cost=1)
+    second = Request(audio="b.wav", duration=10, cost=1)
+    session.add_all([first, second])
+    session.commit()
+    save_transcript(first.id, LONG_TEXT, session)
+    save_transcript(second.id, "short", session)
+    row = session.exec(select(RequestTranscript).where(RequestTranscript.request_id == first.id)).one()
+    assert row.codec != CODEC_NONE
+    assert row.length == len(LONG_TEXT)
+    assert len(row.data) < len(LONG_TEXT)
+    assert get_transcript(first.id, session) == LONG_TEXT
+    assert get_transcripts([first.id, second.id, 99], session) == {first.id: LONG_TEXT, second.id: "short"}
+    assert get_transcript(99, session) is None
+
+def test_save_transcript_replaces_earlier_one(session):
+    request = Request(audio="a.wav", duration=10, cost=1)
+    session.add(request)
+    session.commit()
+    save_transcript(request.id, LONG_TEXT, session)
+    save_transcript(request.id, "second take", session)
+    assert get_transcript(request.id, session) == "second take"
+
+def test_transcript_length_is_bounded():
+    with pytest.raises(ValueError):
+        RequestTranscript.pack(1, "a" * (MAX_TRANSCRIPT_LENGTH + 1))
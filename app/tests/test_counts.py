@@ -0,0 +1,53 @@
+from models.request import Request
+from models.transaction import Transaction
+from models.user import User
+from services.crud.loading import LoadingProfile
+from services.crud.user import get_user_by_id, get_user_counts, get_users_with_counts
+from services.crud_async import user as async_user
+from sqlalchemy import event
+import asyncio
+
+def _users_with_history(session, history):
+    """Users with the given (requests, transactions) numbers, in id order"""
+    for number, (requests, transactions) in enumerate(history):
+        user = User(email=f"user{number}@example.com", password="password1", actual_balance=100)
+        session.add(user)
+        session.flush()
+        for _ in range(requests):
+            session.add(Request(audio="a.wav", duration=10, cost=1, user_id=user.id))
+        for _ in range(transactions):
+            session.add(Transaction(user_id=user.id, transaction_size=1, actual_balance=100))
+    session.commit()
+
+def test_counts_come_from_one_query(engine, session):
+    _users_with_history(session, [(2, 1), (0, 0), (3, 4)])
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    summaries = get_users_with_counts(session)
+    assert len(statements) == 1
+    assert [(summary.id, summary.requests_count, summary.transactions_count) for summary in summaries] == [
+        (1, 2, 1), (2, 0, 0), (3, 3, 4)
+    ]
+
+def test_counts_page(session):
+    _users_with_history(session, [(1, 0), (0, 1), (2, 2)])
+    summaries = get_users_with_counts(session, after_id=1, limit=1)
+    assert [(summary.id, summary.requests_count, summary.transactions_count) for summary in summaries] == [(2, 0, 1)]
+    assert len(get_users_with_counts(session, limit=None)) == 3
+
+def test_user_counts_match_loaded_lists(session):
+    _users_with_history(session, [(3, 2)])
+    user = get_user_by_id(1, session, LoadingProfile.WITH_HISTORY)
+    assert get_user_counts(1, session) == (user.requests_count, user.transactions_count) == (3, 2)
+    assert get_user_counts(2, session) is None
+
+def test_async_counts(session, async_session_factory):
+    _users_with_history(session, [(1, 2), (0, 0)])
+    
+    async def counts():
+        async with async_session_factory() as async_session:
+            summaries = await async_user.get_users_with_counts(async_session)
+            counts = await async_user.get_user_counts(1, async_session)
+            return [(summary.requests_count, summary.transactions_count) for summary in summaries], counts
+    
+    assert asyncio.run(counts()) == ([(1, 2), (0, 0)], (1, 2))
@@ -0,0 +1,84 @@
+from models.hold import CreditHold
+from models.request import Request
+from models.transaction import Transaction
+from models.transcript import RequestTranscript, TranscriptSegment
+from models.user import User
+from services.crud.request import delete_all_requests, delete_request
+from services.crud.user import delete_user
+from services.crud_async import request as async_request, user as async_user
+from sqlalchemy import event
+from sqlmodel import select
+from typing import List
+import asyncio
+
+def _user_with_held_request(session) -> Request:
+    user = User(email="user@example.com", password="password1", actual_balance=100)
+    session.add(user)
+    session.flush()
+    request = Request(audio="a.wav", duration=10, cost=2.5, user_id=user.id)
+    session.add(request)
+    session.flush()
+    session.add(CreditHold(user_id=user.id, request_id=request.id, amount=2.5))
+    session.commit()
+    return request
+
+def test_delete_request_keeps_its_credit_hold(session):
+    request = _user_with_held_request(session)
+    assert delete_request(request.id, session)
+    hold = session.exec(select(CreditHold)).one()
+    assert hold.request_id is None
+
+def test_delete_user_deletes_its_credit_holds(session):
+    request = _user_with_held_request(session)
+    assert delete_user(request.user_id, session, cache=None)
+    assert session.exec(select(CreditHold)).all() == []
+    assert session.exec(select(Request)).all() == []
+
+def test_async_deletes_handle_credit_holds(session, async_session_factory):
+    request = _user_with_held_request(session)
+    
+    async def delete():
+        async with async_session_factory() as async_session:
+            assert await async_request.delete_request(request.id, async_session)
+            assert await async_user.delete_user(request.user_id, async_session, cache=None)
+    
+    asyncio.run(delete())
+    session.expire_all()
+    assert session.exec(select(CreditHold)).all() == []
+
+def _requests_with_history(session, count: int) -> List[Request]:
+    user = User(email="history@example.com", password="password1", actual_balance=100)
+    session.add(user)
+    session.flush()
+    requests = []
+    for number in range(count):
+        request = Request(audio=f"{number}.wav", duration=10, cost=1, user_id=user.id)
+        session.add(request)
+        session.flush()
+        session.add(Transaction(user_id=user.id, request_id=request.id, transaction_size=-1, actual_balance=99 - number))
+        session.add(RequestTranscript.pack(request.id, "hello world"))
+        session.add(TranscriptSegment(request_id=request.id, index=0, start_s=0, end_s=10, text="hello world"))
+        requests.append(request)
+    session.commit()
+    return requests
+
+def test_delete_request_nullifies_transactions_and_cascades_transcripts(session):
+    deleted_id, kept_id = (request.id for request in _requests_with_history(session, 2))
+    assert delete_request(deleted_id, session)
+    session.expire_all()
+    assert sorted(session.exec(select(Transaction.request_id)).all(), key=str) == [kept_id, None]
+    assert session.exec(select(RequestTranscript.request_id)).all() == [kept_id]
+    assert session.exec(select(TranscriptSegment.request_id)).all() == [kept_id]
+    assert not delete_request(deleted_id, session)
+
+def test_delete_all_requests_in_batches(session):
+    _requests_with_history(session, 5)
+    commits = []
+    event.listen(session, "after_commit", commits.append)
+    assert delete_all_requests(session, batch_size=2) == 5
+    assert len(commits) == 4  # three batches and the final commit
+    session.expire_all()
+    assert session.exec(select(Request)).all() == []
+    assert session.exec(select(RequestTranscript)).all() == []
+    assert session.exec(select(TranscriptSegment)).all() == []
+    assert session.exec(select(Transaction.request_id)).all() == [None] * 5
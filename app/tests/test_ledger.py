@@ -0,0 +1,70 @@
+from models.hold import CreditHold, HoldStatus
+from models.transaction import Transaction
+from models.user import User
+from services.ledger import InsufficientFundsError, credit, debit, release, reserve, settle
+from sqlmodel import select
+import pytest
+
+# The ledger runs UPDATE ... RETURNING inside CTEs, which only PostgreSQL supports
+
+def _user(session, balance: float = 10.0) -> int:
+    user = User(email="user@example.com", password="password1", actual_balance=balance)
+    session.add(user)
+    session.commit()
+    return user.id
+
+def _balance(session, user_id: int) -> float:
+    session.expire_all()
+    return session.get(User, user_id).actual_balance
+
+def test_debit_records_a_signed_charge(pg_session):
+    user_id = _user(pg_session)
+    transaction = debit(user_id, 4.0, pg_session, cache=None)
+    assert (transaction.transaction_size, transaction.actual_balance) == (-4.0, 6.0)
+    assert Transaction.model_validate(transaction.model_dump()).transaction_size == -4.0
+    with pytest.raises(InsufficientFundsError):
+        debit(user_id, 7.0, pg_session, cache=None)
+    assert _balance(pg_session, user_id) == 6.0
+
+def test_credit_records_a_top_up(pg_session):
+    user_id = _user(pg_session)
+    transaction = credit(user_id, 5.0, pg_session, cache=None)
+    assert (transaction.transaction_size, transaction.actual_balance) == (5.0, 15.0)
+
+def test_reserve_takes_credits_until_the_hold_closes(pg_session):
+    user_id = _user(pg_session)
+    hold = reserve(user_id, 8.0, pg_session, cache=None)
+    assert hold.status == HoldStatus.HELD.value
+    assert _balance(pg_session, user_id) == 2.0
+    with pytest.raises(InsufficientFundsError):
+        reserve(user_id, 3.0, pg_session, cache=None)
+
+def test_settle_charges_the_cost_and_refunds_the_rest(pg_session):
+    user_id = _user(pg_session)
+    hold = reserve(user_id, 8.0, pg_session, cache=None)
+    transaction = settle(hold.id, 3.0, pg_session, cache=None)
+    assert (transaction.transaction_size, transaction.actual_balance) == (-3.0, 7.0)
+    assert pg_session.get(CreditHold, hold.id).status == HoldStatus.SETTLED.value
+
+def test_settle_twice_charges_once(pg_session):
+    user_id = _user(pg_session)
+    hold = reserve(user_id, 8.0, pg_session, cache=None)
+    settle(hold.id, 3.0, pg_session, cache=None)
+    with pytest.raises(ValueError):
+        settle(hold.id, 3.0, pg_session, cache=None)
+    assert _balance(pg_session, user_id) == 7.0
+    assert len(pg_session.exec(select(Transaction)).all()) == 1
+
+def test_settle_without_cost_records_no_transaction(pg_session):
+    user_id = _user(pg_session)
+    hold = reserve(user_id, 8.0, pg_session, cache=None)
+    assert settle(hold.id, 0, pg_session, cache=None) is None
+    assert _balance(pg_session, user_id) == 10.0
+    assert pg_session.exec(select(Transaction)).all() == []
+
+def test_release_returns_the_hold_once(pg_session):
+    user_id = _user(pg_session)
+    hold = reserve(user_id, 8.0, pg_session, cache=None)
+    assert release(hold.id, pg_session, cache=None)
+    assert not release(hold.id, pg_session, cache=None)
+    assert _balance(pg_session, user_id) == 10.0
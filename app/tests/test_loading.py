@@ -0,0 +1,61 @@
+from models.request import Request
+from models.transaction import Transaction
+from models.user import User
+from services.crud.loading import LoadingProfile
+from services.crud.request import get_request_by_id
+from services.crud.user import get_all_users, get_user_by_id
+from sqlalchemy.exc import InvalidRequestError
+from sqlmodel import select
+import pytest
+
+def _user_with_paid_request(session) -> int:
+    user = User(email="user@example.com", password="password1", actual_balance=10)
+    session.add(user)
+    session.flush()
+    transaction = Transaction(user_id=user.id, transaction_size=-1, actual_balance=9)
+    session.add(transaction)
+    session.flush()
+    request = Request(audio="a.wav", duration=10, cost=1, user_id=user.id, transaction_id=transaction.id)
+    session.add(request)
+    session.flush()
+    transaction.request_id = request.id
+    session.commit()
+    user_id = user.id
+    session.expunge_all()
+    return user_id
+
+def test_unloaded_relationship_raises_instead_of_querying(session):
+    user_id = _user_with_paid_request(session)
+    user = session.get(User, user_id)
+    with pytest.raises(InvalidRequestError):
+        user.requests
+
+def test_summary_loads_no_relationships(session):
+    user_id = _user_with_paid_request(session)
+    user = get_user_by_id(user_id, session, LoadingProfile.SUMMARY)
+    with pytest.raises(InvalidRequestError):
+        user.transactions
+    request_id = session.exec(select(Request.id)).one()
+    request = get_request_by_id(request_id, session, LoadingProfile.SUMMARY)
+    with pytest.raises(InvalidRequestError):
+        request.user
+
+def test_with_history_loads_one_level(session):
+    user_id = _user_with_paid_request(session)
+    user = get_user_by_id(user_id, session, LoadingProfile.WITH_HISTORY)
+    assert [request.audio for request in user.requests] == ["a.wav"]
+    assert [transaction.transaction_size for transaction in user.transactions] == [-1]
+    with pytest.raises(InvalidRequestError):
+        user.requests[0].transaction
+    assert get_request_by_id(user.requests[0].id, session, LoadingProfile.WITH_HISTORY).user is user
+
+def test_full_loads_request_transaction_links(session):
+    _user_with_paid_request(session)
+    [user] = get_all_users(session, LoadingProfile.FULL)
+    assert user.requests[0].transaction is user.transactions[0]
+    assert user.transactions[0].request is user.requests[0]
+
+def test_profile_accepts_its_value(session):
+    user_id = _user_with_paid_request(session)
+    user = get_user_by_id(user_id, session, "with_history")
+    assert len(user.requests) == 1
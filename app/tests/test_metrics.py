@@ -0,0 +1,82 @@
+from database.metrics import MetricsRegistry, instrument_engine, instrumented, merge_snapshots, registry, render
+from models.user import User
+from services.crud.user import get_all_users
+from services.crud.loading import LoadingProfile
+import json
+import pytest
+
+def _registry() -> MetricsRegistry:
+    metrics = MetricsRegistry()
+    metrics.counter("jobs_total", "Finished jobs", ("queue",)).inc(("audio",), 2)
+    metrics.histogram("job_seconds", "Job duration", buckets=(1, 5)).observe(1)
+    return metrics
+
+def _samples(snapshot, name):
+    return {(sample_name, tuple(sorted(labels.items()))): value for sample_name, labels, value in snapshot[name]["samples"]}
+
+def test_render_uses_the_text_exposition_format():
+    assert render(_registry().snapshot()) == (
+        "# HELP job_seconds Job duration\n"
+        "# TYPE job_seconds histogram\n"
+        'job_seconds_bucket{le="1"} 1\n'
+        'job_seconds_bucket{le="5"} 1\n'
+        'job_seconds_bucket{le="+Inf"} 1\n'
+        "job_seconds_sum 1\n"
+        "job_seconds_count 1\n"
+        "# HELP jobs_total Finished jobs\n"
+        "# TYPE jobs_total counter\n"
+        'jobs_total{queue="audio"} 2\n'
+    )
+
+def test_render_escapes_label_values():
+    metrics = MetricsRegistry()
+    metrics.counter("errors_total", "Errors", ("message",)).inc(('say "hi"\\\n',), 0.5)
+    assert 'errors_total{message="say \\"hi\\"\\\\\\n"} 0.5\n' in render(metrics.snapshot())
+
+def test_merge_sums_samples_of_all_processes():
+    first, second = _registry(), _registry()
+    second.counter("queue_depth", "Queued jobs").inc(amount=3)
+    # snapshots travel between processes as JSON
+    merged = merge_snapshots(json.loads(json.dumps(metrics.snapshot())) for metrics in (first, second))
+    assert _samples(merged, "jobs_total") == {("jobs_total", (("queue", "audio"),)): 4}
+    assert _samples(merged, "job_seconds")[("job_seconds_count", ())] == 2
+    assert _samples(merged, "job_seconds")[("job_seconds_bucket", (("le", "+Inf"),))] == 2
+    assert _samples(merged, "queue_depth") == {("queue_depth", ()): 3}
+
+def test_duplicate_metric_is_rejected():
+    metrics = _registry()
+    with pytest.raises(ValueError):
+        metrics.counter("jobs_total", "Again")
+
+def test_collectors_are_read_on_every_snapshot():
+    metrics = MetricsRegistry()
+    depth = iter([1, 2])
+    metrics.add_collector(lambda: {"depth": {"type": "gauge", "help": "Depth", "samples": [["depth", {}, next(depth)]]}})
+    assert metrics.snapshot()["depth"]["samples"] == [["depth", {}, 1]]
+    assert metrics.snapshot()["depth"]["samples"] == [["depth", {}, 2]]
+
+def test_instrumented_calls_record_statements(engine, session):
+    instrument_engine(engine)
+    registry.clear()
+    session.add(User(email="user@example.com", password="password1"))
+    session.commit()
+    get_all_users(session, LoadingProfile.WITH_HISTORY)
+    snapshot = registry.snapshot()
+    function = (("function", "crud.user.get_all_users"),)
+    assert _samples(snapshot, "crud_call_duration_seconds")[("crud_call_duration_seconds_count", function)] == 1
+    # the users and one selectin query per collection
+    assert _samples(snapshot, "crud_statements_per_call")[("crud_statements_per_call_sum", function)] == 3
+    assert _samples(snapshot, "db_statement_duration_seconds")[
+        ("db_statement_duration_seconds_count", (("operation", "SELECT"),))
+    ] == 3
+
+def test_failed_calls_are_counted():
+    registry.clear()
+    
+    @instrumented
+    def broken():
+        raise RuntimeError("boom")
+    
+    with pytest.raises(RuntimeError):
+        broken()
+    assert list(_samples(registry.snapshot(), "crud_call_errors_total").values()) == [1]
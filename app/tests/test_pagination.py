@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+from models.request import Request
+from models.user import User
+from services.crud.pagination import MAX_PAGE_SIZE
+from services.crud.request import get_requests_page, iter_requests
+from services.crud.user import get_users_page, iter_users
+import pytest
+
+START = datetime(2024, 1, 1)
+
+def _users(session, count: int):
+    for number in range(count):
+        session.add(User(
+            email=f"user{number}@example.com", password="password1",
+            created_at=START + timedelta(hours=number)
+        ))
+    session.commit()
+
+def test_pages_cover_every_row_once(session):
+    _users(session, 7)
+    pages = []
+    after_id = None
+    while True:
+        page = get_users_page(session, after_id=after_id, limit=3)
+        if not page:
+            break
+        pages.append([user.id for user in page])
+        after_id = page[-1].id
+    assert pages == [[1, 2, 3], [4, 5, 6], [7]]
+
+def test_page_after_last_row_is_empty(session):
+    _users(session, 3)
+    assert [user.id for user in get_users_page(session, after_id=2, limit=3)] == [3]
+    assert get_users_page(session, after_id=3, limit=3) == []
+
+def test_created_window_is_half_open(session):
+    _users(session, 5)
+    page = get_users_page(session, created_from=START + timedelta(hours=1), created_to=START + timedelta(hours=3))
+    assert [user.id for user in page] == [2, 3]
+    assert [user.id for user in iter_users(session, batch_size=2, created_from=START + timedelta(hours=3))] == [4, 5]
+
+def test_requests_page_filters_by_user(session):
+    _users(session, 2)
+    for number in range(6):
+        session.add(Request(audio=f"{number}.wav", duration=10, cost=1, user_id=number % 2 + 1))
+    session.commit()
+    page = get_requests_page(session, after_id=2, limit=2, user_id=2)
+    assert [request.id for request in page] == [4, 6]
+    assert [request.id for request in iter_requests(session, batch_size=1, user_id=1)] == [1, 3, 5]
+
+@pytest.mark.parametrize("limit", [0, MAX_PAGE_SIZE + 1])
+def test_page_size_is_bounded(session, limit):
+    with pytest.raises(ValueError):
+        get_users_page(session, limit=limit)
@@ -0,0 +1,18 @@
+from database.pool import pool_sizing
+from types import SimpleNamespace
+
+def _settings(**overrides):
+    values = dict(DB_POOL_SIZE=None, DB_POOL_CONCURRENCY=20, DB_MAX_OVERFLOW=10, DB_CONNECTION_BUDGET=None, DB_POOL_WORKERS=1)
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+def test_sync_and_async_engines_share_the_process_budget():
+    settings = _settings(DB_CONNECTION_BUDGET=44, DB_POOL_WORKERS=4)
+    sync_size, sync_overflow = pool_sizing(settings)
+    async_size, async_overflow = pool_sizing(settings, async_driver=True)
+    assert sync_size + sync_overflow + async_size + async_overflow == 44 // 4
+    assert (sync_size, async_size) == (6, 5)
+
+def test_without_budget_each_engine_keeps_its_own_size():
+    settings = _settings()
+    assert pool_sizing(settings) == pool_sizing(settings, async_driver=True) == (20, 10)
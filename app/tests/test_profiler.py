@@ -0,0 +1,64 @@
+from database.profiler import QueryBudgetExceeded, QueryProfiler, _original_get, assert_max_queries, statement_shape
+from models.request import Request
+from models.user import User
+from services.crud.loading import LoadingProfile
+from services.crud.user import get_all_users, get_user_by_id
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlmodel import Session
+import gc
+import pytest
+
+def _users(session, count: int = 3):
+    for number in range(count):
+        user = User(email=f"user{number}@example.com", password="password1")
+        session.add(user)
+        session.flush()
+        session.add(Request(audio="a.wav", duration=10, cost=2.5, user_id=user.id))
+    session.commit()
+    session.expunge_all()
+
+def test_statement_shape_collapses_parameter_lists():
+    assert statement_shape("SELECT * FROM user WHERE id IN (?, ?, ?)") == statement_shape("SELECT * FROM user WHERE id IN (?)")
+
+def test_query_per_row_exceeds_the_repeat_budget(session):
+    _users(session)
+    users = get_all_users(session, LoadingProfile.SUMMARY)
+    with pytest.raises(QueryBudgetExceeded, match="ran 3 times"):
+        with assert_max_queries(session, max_queries=10, max_repeats=1):
+            for user in users:
+                get_user_by_id(user.id, session, LoadingProfile.SUMMARY)
+
+def test_batched_read_stays_within_budget(session):
+    _users(session)
+    with assert_max_queries(session, max_queries=3, max_repeats=1) as profiler:
+        get_all_users(session)
+    assert profiler.by_operation() == {"crud.user.get_all_users": 3}
+
+def test_unread_eager_load_is_reported(session):
+    _users(session)
+    with QueryProfiler(session) as profiler:
+        users = get_all_users(session)
+        emails = [user.email for user in users]
+        assert sum(len(user.transactions) for user in users) == 0
+    unused = {load.entity: (load.loaded, load.unused) for load in profiler.unused_loads()}
+    assert unused["User.requests"] == (3, 3)
+    assert "User.transactions" not in unused and "User" not in unused
+    assert len(emails) == 3
+
+def test_attribute_tracking_ends_with_the_profile(engine, session):
+    _users(session)
+    with Session(engine) as other:
+        with QueryProfiler(session) as profiler:
+            assert InstrumentedAttribute.__get__ is not _original_get
+            emails = [user.email for user in get_all_users(other)]  # another session's rows are ignored
+        assert InstrumentedAttribute.__get__ is _original_get
+    assert len(emails) == 3
+    assert profiler.count == 0 and profiler.unused_loads() == []
+
+def test_dropped_instances_are_not_kept_alive(session):
+    _users(session)
+    with QueryProfiler(session) as profiler:
+        get_all_users(session, LoadingProfile.SUMMARY)
+        session.expunge_all()
+        gc.collect()
+    assert {load.entity: load.unused for load in profiler.unused_loads()} == {"User": 3}
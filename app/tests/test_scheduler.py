@@ -0,0 +1,49 @@
+from services.jobs.broker import LocalBroker, TranscriptionJob
+from services.jobs.scheduler import FairDispatcher, run_dispatcher
+import threading
+
+def _job(request_id: int, user_id: int, duration: float) -> TranscriptionJob:
+    return TranscriptionJob(request_id, user_id, f"{request_id}.wav", duration)
+
+def test_dispatcher_stage_feeds_workers_in_dispatcher_order():
+    intake, outlet = LocalBroker(), LocalBroker()
+    for request_id in range(1, 6):
+        intake.publish(_job(request_id, 1, 600.0))  # one user's batch of long files
+    intake.publish(_job(6, 2, 600.0))
+    intake.publish(_job(7, 3, 10.0))
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=run_dispatcher,
+        args=(intake.consumer(prefetch=100), outlet, FairDispatcher(), 1, stop, 0.01)
+    )
+    thread.start()
+    worker = outlet.consumer()
+    order = []
+    try:
+        while len(order) < 7:
+            delivery = worker.get(timeout=5)
+            assert delivery is not None
+            order.append(delivery.job.request_id)
+            worker.ack(delivery)
+    finally:
+        stop.set()
+        thread.join()
+    assert order[0] in (1, 7)  # the first job may be forwarded before the rest arrive
+    assert order.index(7) <= 1  # short job first
+    assert order.index(6) < 4  # the second user does not wait for the whole batch
+    assert intake.qsize() == 0
+
+def test_user_clocks_reset_when_idle():
+    dispatcher = FairDispatcher()
+    for user_id in range(1000):
+        dispatcher.put(_job(user_id, user_id, 600.0))
+        dispatcher.get(block=False)
+    assert dispatcher.stats()["queued"]["users"] <= 64
+
+def test_user_clocks_stay_bounded_under_backlog():
+    dispatcher = FairDispatcher()
+    dispatcher.put(_job(0, 0, 600.0))
+    for user_id in range(1, 1000):
+        dispatcher.put(_job(user_id, user_id, 600.0))
+        dispatcher.get(block=False)
+    assert dispatcher.stats()["queued"]["users"] <= 2 * dispatcher.qsize() + 65
@@ -0,0 +1,40 @@
+from models.request import Request
+from models.transaction import Transaction
+from models.user import User
+from services.crud.request import delete_request
+from services.crud.transcript import save_transcript, search_transcripts, write_transcript
+from services.search import transcript_index
+from sqlmodel import Session, SQLModel, create_engine
+import pytest
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    transcript_index.clear()
+    with Session(engine) as session:
+        yield session
+    transcript_index.clear()
+    engine.dispose()
+
+def _request(session: Session) -> int:
+    request = Request(audio="a.wav", duration=10, cost=2.5)
+    session.add(request)
+    session.commit()
+    return request.id
+
+def test_rolled_back_transcript_is_not_searchable(session):
+    request_id = _request(session)
+    write_transcript(request_id, "hello world", session)
+    session.rollback()
+    assert search_transcripts("hello", session) == []
+    save_transcript(request_id, "hello world", session)
+    assert [hit.request_id for hit in search_transcripts("hello", session)] == [request_id]
+
+def test_deleted_transcript_does_not_match_a_reused_id(session):
+    request_id = _request(session)
+    save_transcript(request_id, "hello world", session)
+    assert delete_request(request_id, session)
+    assert len(transcript_index) == 0
+    assert _request(session) == request_id
+    assert search_transcripts("hello", session) == []
@@ -0,0 +1,28 @@
+from audio.sniff import sniff_mime
+
+def _ogg_page(packet: bytes, bos: bool = True) -> bytes:
+    header = b"OggS\x00" + bytes([0x02 if bos else 0x00]) + bytes(20) + bytes([1, len(packet)])
+    return header + packet
+
+def _webm(*codec_ids: bytes) -> bytes:
+    tracks = b"".join(b"\xae\x80\x86" + bytes([0x80 | len(codec)]) + codec for codec in codec_ids)
+    return b"\x1a\x45\xdf\xa3\x9f\x42\x82\x84webm" + bytes(16) + b"\x16\x54\xae\x6b" + tracks
+
+def test_ftyp_only_audio_brands_are_audio():
+    assert sniff_mime(b"\0\0\0\x20ftypM4A " + bytes(40), use_libmagic=False) == "audio/mp4"
+    assert sniff_mime(b"\0\0\0\x20ftypisom" + bytes(40), use_libmagic=False) is None
+
+def test_ogg_is_audio_only_when_every_stream_is():
+    opus = _ogg_page(b"OpusHead" + bytes(11))
+    vorbis = _ogg_page(b"\x01vorbis" + bytes(22))
+    theora = _ogg_page(b"\x80theora" + bytes(34))
+    data = _ogg_page(bytes(20), bos=False)
+    assert sniff_mime(opus + data, use_libmagic=False) == "audio/ogg"
+    assert sniff_mime(vorbis + data, use_libmagic=False) == "audio/ogg"
+    assert sniff_mime(theora + data, use_libmagic=False) is None
+    assert sniff_mime(vorbis + theora + data, use_libmagic=False) is None
+
+def test_webm_is_audio_only_without_video_tracks():
+    assert sniff_mime(_webm(b"A_OPUS"), use_libmagic=False) == "audio/webm"
+    assert sniff_mime(_webm(b"V_VP9"), use_libmagic=False) is None
+    assert sniff_mime(_webm(b"V_VP8", b"A_VORBIS"), use_libmagic=False) is None
@@ -0,0 +1,98 @@
+from models.request import Request
+from services.crud.transcript import get_transcript
+from services.jobs.broker import LocalBroker, RabbitMQBroker, TranscriptionJob
+from services.jobs.worker import run_worker
+from sqlmodel import Session
+from types import SimpleNamespace
+import sys
+
+def _job(session) -> TranscriptionJob:
+    request = Request(audio="a.wav", duration=10, cost=0)
+    session.add(request)
+    session.commit()
+    return TranscriptionJob.from_request(request)
+
+def test_failed_job_is_retried(engine, session):
+    broker = LocalBroker()
+    job = _job(session)
+    broker.publish(job)
+    calls = []
+    
+    def transcribe(audio: str) -> str:
+        calls.append(audio)
+        if len(calls) == 1:
+            raise OSError("storage is unavailable")
+        return "hello"
+    
+    run_worker(broker.consumer(), transcribe, lambda: Session(engine), poll_timeout=0.01, max_jobs=2, retry_delay=0)
+    assert len(calls) == 2
+    assert get_transcript(job.request_id, session) == "hello"
+    assert broker.dead_letters == [] and broker.qsize() == 0
+
+def test_job_failing_every_attempt_is_dead_lettered(engine, session):
+    broker = LocalBroker()
+    job = _job(session)
+    broker.publish(job)
+    
+    def transcribe(audio: str) -> str:
+        raise ValueError("not decodable")
+    
+    run_worker(broker.consumer(), transcribe, lambda: Session(engine), poll_timeout=0.01, max_jobs=3, max_attempts=3, retry_delay=0)
+    assert [dead.request_id for dead in broker.dead_letters] == [job.request_id]
+    assert broker.dead_letters[0].attempts == 2
+    assert broker.qsize() == 0
+
+def test_attempts_survive_serialization():
+    job = TranscriptionJob(1, 2, "a.wav", 10.0, attempts=2)
+    assert TranscriptionJob.from_bytes(job.to_bytes()) == job
+    legacy = b'{"request_id": 1, "user_id": 2, "audio": "a.wav", "duration": 10.0, "audio_hash": null}'
+    assert TranscriptionJob.from_bytes(legacy).attempts == 0
+
+class _StreamLostError(Exception):
+    pass
+
+class _FakeChannel:
+    def __init__(self, connection) -> None:
+        self.connection = connection
+    
+    def queue_declare(self, **kwargs) -> None:
+        pass
+    
+    def confirm_delivery(self) -> None:
+        pass
+    
+    def basic_publish(self, **kwargs) -> None:
+        if not self.connection.is_open:
+            raise _StreamLostError("Stream connection lost")
+        self.connection.published.append(kwargs["body"])
+
+class _FakeConnection:
+    opened = []
+    
+    def __init__(self, parameters) -> None:
+        self.is_open = True
+        self.published = []
+        _FakeConnection.opened.append(self)
+    
+    def channel(self) -> _FakeChannel:
+        return _FakeChannel(self)
+    
+    def close(self) -> None:
+        self.is_open = False
+
+def test_rabbitmq_publish_reconnects_after_the_connection_was_lost(monkeypatch):
+    errors = SimpleNamespace(
+        AMQPError=Exception, AMQPConnectionError=ConnectionError,
+        StreamLostError=_StreamLostError, ChannelWrongStateError=RuntimeError
+    )
+    fake_pika = SimpleNamespace(
+        BlockingConnection=_FakeConnection, URLParameters=lambda url: url,
+        BasicProperties=lambda **kwargs: kwargs, exceptions=errors
+    )
+    monkeypatch.setitem(sys.modules, "pika", fake_pika)
+    monkeypatch.setattr(_FakeConnection, "opened", [])
+    broker = RabbitMQBroker("amqp://rabbitmq")
+    _FakeConnection.opened[0].is_open = False  # dropped by the server while idle
+    broker.publish(TranscriptionJob(1, 2, "a.wav", 10.0))
+    assert len(_FakeConnection.opened) == 2
+    assert len(_FakeConnection.opened[1].published) == 1
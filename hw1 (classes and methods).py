@@ -4,6 +4,17 @@ from pydub import AudioSegment
 import re
 import magic
 import math
+import threading
+
+SNIFF_SIZE = 4096
+
+_magic_handles = threading.local()
+
+def _get_magic() -> magic.Magic:
+    """Возвращает объект libmagic текущего потока (создается один раз на поток)"""
+    if not hasattr(_magic_handles, 'mime'):
+        _magic_handles.mime = magic.Magic(mime=True)
+    return _magic_handles.mime
 
 
 @dataclass
@@ -60,8 +71,9 @@ class Request:
         self._validate_request()
 
     def _validate_request(self) -> None:
-        mime = magic.Magic(mime=True)
-        file_type = mime.from_file(audio)
+        with open(self.audio, 'rb') as file:
+            head = file.read(SNIFF_SIZE)
+        file_type = _get_magic().from_buffer(head)
         if 'audio' not in file_type:
             raise ValueError("Invalid request format. Please upload audio")
         